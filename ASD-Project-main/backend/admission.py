@@ -0,0 +1,447 @@
+"""
+Admission control for expensive endpoints.
+
+One client looping on the PDF report endpoint can keep every CPU busy with
+ReportLab renders, and ``/api/assess`` then waits behind them.
+``AdmissionMiddleware`` guards the routes listed in ``DEFAULT_POLICIES`` in
+two ways:
+
+* a token bucket per client and route, which answers ``429`` when the client
+  has used up its burst. The client is the ``X-API-Key`` header when it is
+  one of the keys in ``API_KEYS`` (comma-separated), otherwise the remote
+  address; unknown keys are ignored, so a client can't get a fresh bucket by
+  sending a new key. Behind a reverse proxy the server must trust
+  the proxy's ``X-Forwarded-For`` (``FORWARDED_ALLOW_IPS``, see
+  ``gunicorn.conf.py``); otherwise every user shares the proxy's bucket.
+* a concurrency limit per route. Extra requests queue, but only while the
+  expected wait stays under ``ADMISSION_LATENCY_TARGET`` seconds. Past that
+  point they get ``503`` instead of queueing.
+
+Both responses carry ``Retry-After``. Policies marked ``in_handler`` are
+skipped by the middleware. Their endpoint applies them with
+``AdmissionController.guard`` around the expensive part only. The report
+endpoint does this, so a ``304`` or an already rendered PDF is never limited.
+
+Concurrency limits apply per process, because each worker renders with its
+own threads. The buckets are kept in ``RATE_LIMIT_STORE_URL`` so that all
+workers share them:
+
+    memory (default)                 per process
+    sqlite:////var/tmp/asd.sqlite3   local SQLite file shared by workers on the host
+    redis://localhost:6379/0         Redis, for workers on several hosts
+
+Limits can be overridden per route with ``ADMISSION_LIMITS``, for example
+``report=2:0.5:5,assess=16:5:20`` (concurrency:rate per second:burst).
+Set ``ADMISSION_CONTROL=0`` to disable the middleware. Shared stores are
+queried in a small dedicated thread pool, never on the event loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Queueing allowed before a request is shed, in seconds
+DEFAULT_LATENCY_TARGET = 2.0
+# Initial guess of a request's service time, before any has completed
+INITIAL_SERVICE_TIME = 0.5
+# Weight of the latest sample in the service time average
+SERVICE_TIME_ALPHA = 0.2
+# Buckets kept by the in-memory store; the least recently used are dropped
+MAX_MEMORY_BUCKETS = 100_000
+# Threads querying a shared (SQLite or Redis) bucket store
+STORE_WORKERS = 4
+API_KEY_HEADER = b'x-api-key'
+
+
+def _key_digest(key: bytes) -> str:
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+# Keys that identify a client (partners sharing one address); others are ignored
+API_KEY_DIGESTS = frozenset(
+    _key_digest(key.strip().encode()) for key in os.environ.get('API_KEYS', '').split(',') if key.strip()
+)
+
+
+class RoutePolicy:
+    """Limits for the requests whose method and path match."""
+
+    __slots__ = ('name', 'method', 'pattern', 'concurrency', 'rate', 'burst', 'in_handler')
+
+    def __init__(self, name: str, method: str, pattern: str, concurrency: int, rate: float, burst: float,
+                 in_handler: bool = False):
+        if concurrency < 1 or rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid limits for {name}: concurrency={concurrency}, rate={rate}, burst={burst}")
+        self.name = name
+        self.method = method
+        self.pattern = re.compile(pattern)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        # Applied by the endpoint with AdmissionController.guard instead of the middleware
+        self.in_handler = in_handler
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self.pattern.match(path) is not None
+
+
+DEFAULT_POLICIES = [
+    RoutePolicy('report', 'GET', r'^/api/assessments/[^/]+/report$', concurrency=2, rate=0.5, burst=5,
+                in_handler=True),
+    RoutePolicy('export', 'GET', r'^/api/assessments/export$', concurrency=2, rate=0.1, burst=2),
+    RoutePolicy('assess', 'POST', r'^/api/assess$', concurrency=16, rate=5, burst=20),
+]
+
+
+def parse_limits(spec: str, policies: List[RoutePolicy]) -> List[RoutePolicy]:
+    """Apply ``name=concurrency:rate:burst`` overrides to a copy of ``policies``."""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, values = item.partition('=')
+        try:
+            concurrency, rate, burst = values.split(':')
+            overrides[name.strip()] = (int(concurrency), float(rate), float(burst))
+        except ValueError:
+            raise ValueError(f"Invalid ADMISSION_LIMITS entry {item!r}, expected name=concurrency:rate:burst")
+    unknown = set(overrides) - {policy.name for policy in policies}
+    if unknown:
+        raise ValueError(f"ADMISSION_LIMITS names unknown routes: {', '.join(sorted(unknown))}")
+    return [
+        RoutePolicy(policy.name, policy.method, policy.pattern.pattern, *overrides[policy.name],
+                    in_handler=policy.in_handler)
+        if policy.name in overrides else policy
+        for policy in policies
+    ]
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> Tuple[float, float]:
+    """Take one token from a bucket; returns (tokens left, seconds to wait or 0 when taken)."""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets in this process."""
+
+    def __init__(self, max_buckets: int = MAX_MEMORY_BUCKETS):
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._max_buckets = max_buckets
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens, wait = _refill(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_buckets ('
+                     'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        # Wall clock, since the buckets are compared across processes
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            tokens, wait = _refill(tokens, updated, now, rate, burst)
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+# Same arithmetic as _refill, run atomically on the server with the server's clock
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, for workers spread over several hosts."""
+
+    def __init__(self, url: str, prefix: str = 'asd:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_STORE_URL uses redis:// but the 'redis' package is not installed")
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+        self._prefix = prefix
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        return float(self._take(keys=[self._prefix + key], args=[rate, burst]))
+
+
+def create_bucket_store(url: Optional[str] = None):
+    """Create the bucket store configured by ``url`` or ``RATE_LIMIT_STORE_URL``."""
+    if url is None:
+        url = os.environ.get('RATE_LIMIT_STORE_URL', 'memory')
+    if not url or url == 'memory':
+        return MemoryBucketStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteBucketStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBucketStore(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORE_URL: {url}")
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Rejected(Exception):
+    """A request refused by admission control: 429 (rate limited) or 503 (shed)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {'Retry-After': str(max(1, math.ceil(self.retry_after)))}
+
+
+class ConcurrencyLimit:
+    """Bounded concurrency for one route, shedding requests that would queue too long."""
+
+    def __init__(self, limit: int, latency_target: float):
+        self.limit = limit
+        self.latency_target = latency_target
+        self.active = 0
+        self.waiting = 0
+        self.service_time = INITIAL_SERVICE_TIME
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def expected_wait(self) -> float:
+        """Seconds a request arriving now would queue, from the average service time."""
+        if self.active < self.limit:
+            return 0.0
+        return math.ceil((self.waiting + 1) / self.limit) * self.service_time
+
+    async def acquire(self):
+        expected = self.expected_wait()
+        if expected > self.latency_target:
+            raise Overloaded(expected)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.latency_target)
+        except asyncio.TimeoutError:
+            raise Overloaded(self.service_time)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self, elapsed: float):
+        self.active -= 1
+        self.service_time += SERVICE_TIME_ALPHA * (elapsed - self.service_time)
+        self._semaphore.release()
+
+
+class AdmissionController:
+    """Policies, shared buckets and per-route state used by ``AdmissionMiddleware``."""
+
+    def __init__(self, policies: List[RoutePolicy], store, latency_target: float = DEFAULT_LATENCY_TARGET):
+        self.policies = policies
+        self.store = store
+        self.latency_target = latency_target
+        self._limits: Dict[str, ConcurrencyLimit] = {}
+        self._counters = {policy.name: {'admitted': 0, 'rate_limited': 0, 'shed': 0} for policy in policies}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def policy_for(self, method: str, path: str) -> Optional[RoutePolicy]:
+        for policy in self.policies:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    def policy_named(self, name: str) -> Optional[RoutePolicy]:
+        for policy in self.policies:
+            if policy.name == name:
+                return policy
+        return None
+
+    def limit_for(self, policy: RoutePolicy) -> ConcurrencyLimit:
+        # Created on first use, inside the running event loop
+        limit = self._limits.get(policy.name)
+        if limit is None:
+            limit = self._limits[policy.name] = ConcurrencyLimit(policy.concurrency, self.latency_target)
+        return limit
+
+    async def take_token(self, policy: RoutePolicy, client: str) -> float:
+        key = f"{policy.name}:{client}"
+        try:
+            if isinstance(self.store, MemoryBucketStore):
+                return self.store.take(key, policy.rate, policy.burst)
+            # A shared store is file or network I/O (and may wait on a lock)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=STORE_WORKERS, thread_name_prefix='ratelimit')
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.store.take, key, policy.rate, policy.burst
+            )
+        except Exception as e:
+            # An unreachable shared store must not take the API down with it
+            logger.warning(f"Rate limit store failed, admitting request: {type(e).__name__}: {e}")
+            return 0.0
+
+    def count(self, policy: RoutePolicy, outcome: str):
+        self._counters[policy.name][outcome] += 1
+
+    async def admit(self, policy: RoutePolicy, client: str) -> ConcurrencyLimit:
+        """Take a token and a concurrency slot (release it on the returned limit); raises Rejected."""
+        wait = await self.take_token(policy, client)
+        if wait > 0:
+            self.count(policy, 'rate_limited')
+            raise Rejected(429, 'Too many requests', wait)
+        limit = self.limit_for(policy)
+        try:
+            await limit.acquire()
+        except Overloaded as e:
+            self.count(policy, 'shed')
+            logger.warning(f"⚠️ Shedding {policy.name} request: {e}")
+            raise Rejected(503, 'Server is busy', e.retry_after)
+        self.count(policy, 'admitted')
+        return limit
+
+    @asynccontextmanager
+    async def guard(self, name: str, scope) -> AsyncIterator[None]:
+        """Apply the policy ``name`` to the enclosed work, from inside an endpoint; raises Rejected."""
+        policy = self.policy_named(name)
+        if policy is None:
+            yield
+            return
+        limit = await self.admit(policy, client_key(scope))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            limit.release(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        routes = {}
+        for policy in self.policies:
+            limit = self._limits.get(policy.name)
+            routes[policy.name] = dict(
+                self._counters[policy.name],
+                concurrency=policy.concurrency,
+                active=limit.active if limit else 0,
+                waiting=limit.waiting if limit else 0,
+                service_time_ms=limit.service_time * 1000 if limit else None,
+            )
+        return {'latency_target': self.latency_target, 'routes': routes}
+
+
+def create_admission_controller() -> AdmissionController:
+    """Build the controller from ADMISSION_CONTROL / ADMISSION_LIMITS / ADMISSION_LATENCY_TARGET / RATE_LIMIT_STORE_URL."""
+    if os.environ.get('ADMISSION_CONTROL', '1') == '0':
+        return AdmissionController([], MemoryBucketStore())
+    return AdmissionController(
+        parse_limits(os.environ.get('ADMISSION_LIMITS', ''), DEFAULT_POLICIES),
+        create_bucket_store(),
+        latency_target=float(os.environ.get('ADMISSION_LATENCY_TARGET', str(DEFAULT_LATENCY_TARGET))),
+    )
+
+
+def client_key(scope) -> str:
+    """Rate limit identity: a hash of the API key when it is a known one, otherwise the remote address."""
+    if API_KEY_DIGESTS:
+        for name, value in scope.get('headers', ()):
+            if name == API_KEY_HEADER:
+                digest = _key_digest(value.strip())
+                if digest in API_KEY_DIGESTS:
+                    return 'key:' + digest
+                break
+    client = scope.get('client')
+    return 'ip:' + (client[0] if client else 'unknown')
+
+
+def _rejection(rejected: Rejected) -> JSONResponse:
+    return JSONResponse({'detail': rejected.detail}, status_code=rejected.status_code, headers=rejected.headers)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an ``AdmissionController`` to matching HTTP requests."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        policy = None
+        if scope['type'] == 'http':
+            policy = self.controller.policy_for(scope['method'], scope['path'])
+        if policy is None or policy.in_handler:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            limit = await self.controller.admit(policy, client_key(scope))
+        except Rejected as e:
+            await _rejection(e)(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - started)
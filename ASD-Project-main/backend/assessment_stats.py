@@ -0,0 +1,170 @@
+"""
+Aggregate statistics over stored assessments.
+
+Two interchangeable implementations produce the same response shape:
+
+* ``stats_pipeline`` pushes the group-bys into a single MongoDB ``$facet``
+  aggregation so only the aggregated numbers leave the database.
+* ``stats_from_store`` / ``stats_from_assessments`` compute them with
+  vectorized NumPy over the in-memory assessment cache (demo mode).
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+AQ_KEYS = [f'a{i}_score' for i in range(1, 11)]
+
+# Age bands as [lower, upper) boundaries; ages outside them are reported as "Unknown"
+AGE_BAND_BOUNDARIES = [0, 4, 8, 12, 18, 200]
+AGE_BAND_LABELS = ['0-3', '4-7', '8-11', '12-17', '18+']
+UNKNOWN_BAND = 'Unknown'
+
+
+def _round(value):
+    return None if value is None else round(float(value), 6)
+
+
+def stats_pipeline() -> List[Dict[str, Any]]:
+    """MongoDB aggregation pipeline computing every statistic in one round trip."""
+    group_probability = {'count': {'$sum': 1}, 'average_probability': {'$avg': '$probability'}}
+    return [
+        {'$facet': {
+            'totals': [
+                {'$group': {'_id': None, **group_probability}},
+            ],
+            'risk_levels': [
+                {'$group': {'_id': '$risk_level', 'count': {'$sum': 1}}},
+            ],
+            'by_age_band': [
+                {'$bucket': {
+                    'groupBy': '$demographic.age',
+                    'boundaries': AGE_BAND_BOUNDARIES,
+                    'default': UNKNOWN_BAND,
+                    'output': group_probability,
+                }},
+            ],
+            'by_country': [
+                {'$group': {'_id': '$demographic.country', **group_probability}},
+                {'$sort': {'count': -1, '_id': 1}},
+            ],
+            'aq_positive_rates': [
+                {'$group': {'_id': None, **{
+                    key: {'$avg': {'$cond': [{'$eq': [f'$behavioral.{key}', 1]}, 1, 0]}}
+                    for key in AQ_KEYS
+                }}},
+            ],
+        }},
+    ]
+
+
+def format_pipeline_result(facets: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the ``$facet`` output of ``stats_pipeline`` into the API response shape."""
+    totals = facets['totals'][0] if facets['totals'] else {'count': 0, 'average_probability': None}
+    band_labels = dict(zip(AGE_BAND_BOUNDARIES, AGE_BAND_LABELS))
+    rates = facets['aq_positive_rates'][0] if facets['aq_positive_rates'] else {}
+    return {
+        'total': totals['count'],
+        'average_probability': _round(totals['average_probability']),
+        'risk_levels': {str(row['_id']): row['count'] for row in facets['risk_levels']},
+        'by_age_band': [
+            {
+                'band': band_labels.get(row['_id'], UNKNOWN_BAND),
+                'count': row['count'],
+                'average_probability': _round(row['average_probability']),
+            }
+            for row in facets['by_age_band']
+        ],
+        'by_country': [
+            {
+                'country': str(row['_id']),
+                'count': row['count'],
+                'average_probability': _round(row['average_probability']),
+            }
+            for row in facets['by_country']
+        ],
+        'aq_positive_rates': {key: _round(rates.get(key)) for key in AQ_KEYS} if rates else {},
+    }
+
+
+def _grouped(codes: np.ndarray, labels: List[str], probability: np.ndarray, key: str):
+    """Count and average probability per integer code, as a list of response rows."""
+    if len(codes) == 0:
+        return []
+    counts = np.bincount(codes, minlength=len(labels))
+    sums = np.bincount(codes, weights=probability, minlength=len(labels))
+    rows = [
+        {key: labels[code], 'count': int(counts[code]), 'average_probability': _round(sums[code] / counts[code])}
+        for code in np.flatnonzero(counts)
+    ]
+    return rows
+
+
+def _stats_from_arrays(risk_codes, risk_labels, ages, country_codes, country_labels,
+                       probability, aq_bits) -> Dict[str, Any]:
+    """Shared NumPy implementation over already factorized columns."""
+    total = len(probability)
+    if total == 0:
+        return {
+            'total': 0, 'average_probability': None, 'risk_levels': {},
+            'by_age_band': [], 'by_country': [], 'aq_positive_rates': {},
+        }
+
+    risk_counts = np.bincount(risk_codes, minlength=len(risk_labels))
+
+    band_labels = AGE_BAND_LABELS + [UNKNOWN_BAND]
+    bands = np.digitize(ages, AGE_BAND_BOUNDARIES) - 1
+    bands[(bands < 0) | (bands >= len(AGE_BAND_LABELS))] = len(AGE_BAND_LABELS)
+
+    by_country = _grouped(country_codes, country_labels, probability, 'country')
+    by_country.sort(key=lambda row: (-row['count'], row['country']))
+
+    positive = (aq_bits[:, None].astype(np.uint16) >> np.arange(len(AQ_KEYS), dtype=np.uint16)) & 1
+    rates = positive.mean(axis=0)
+
+    return {
+        'total': total,
+        'average_probability': _round(probability.mean()),
+        'risk_levels': {risk_labels[code]: int(risk_counts[code]) for code in np.flatnonzero(risk_counts)},
+        'by_age_band': _grouped(bands, band_labels, probability, 'band'),
+        'by_country': by_country,
+        'aq_positive_rates': {key: _round(rate) for key, rate in zip(AQ_KEYS, rates)},
+    }
+
+
+def _pack_aq(behavioral: Dict[str, Any]) -> int:
+    return sum(1 << bit for bit, key in enumerate(AQ_KEYS) if behavioral.get(key) == 1)
+
+
+def stats_from_assessments(assessments: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute statistics over plain assessment dicts."""
+    assessments = list(assessments)
+    risk_labels, risk_codes = np.unique(
+        np.array([str(a.get('risk_level')) for a in assessments], dtype=object), return_inverse=True
+    )
+    country_labels, country_codes = np.unique(
+        np.array([str(a.get('demographic', {}).get('country')) for a in assessments], dtype=object),
+        return_inverse=True
+    )
+    ages = np.array([a.get('demographic', {}).get('age', -1) for a in assessments], dtype=np.int64)
+    probability = np.array([a.get('probability', 0.0) for a in assessments], dtype=np.float64)
+    aq_bits = np.array([_pack_aq(a.get('behavioral', {})) for a in assessments], dtype=np.uint16)
+    return _stats_from_arrays(risk_codes.ravel(), list(risk_labels), ages, country_codes.ravel(),
+                              list(country_labels), probability, aq_bits)
+
+
+def stats_from_store(store) -> Dict[str, Any]:
+    """Compute statistics over a ``CompactAssessmentStore`` using its packed columns."""
+    overflow = store.overflow_values()
+    if overflow:
+        # Rare entries kept outside the packed layout; fall back to the generic path
+        return stats_from_assessments(store.values())
+
+    columns = store.columns()
+    risk_values, risk_codes = np.unique(columns['risk_level'], return_inverse=True)
+    country_values, country_codes = np.unique(columns['country'], return_inverse=True)
+    return _stats_from_arrays(
+        risk_codes.ravel(), store.decode('risk_level', risk_values),
+        columns['age'].astype(np.int64), country_codes.ravel(), store.decode('country', country_values),
+        columns['probability'], columns['aq_bits'],
+    )
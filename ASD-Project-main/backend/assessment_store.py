@@ -0,0 +1,385 @@
+"""
+Compact in-memory assessment store.
+
+Drop-in replacement for the ``Dict[str, dict]`` assessment cache. Instead of
+keeping one nested dict (plus a datetime) per assessment, rows are packed:
+
+* the ten AQ-10 answers are bit-packed into one ``uint16``
+* binary demographics and the prediction share one ``uint8`` flag field
+* age / ethnicity are fixed-width ints; country, respondent and risk level
+  are interned into small code tables
+* probability, confidence and timestamp live in NumPy columns
+* optional scalar fields (calibrated probability, model version, inference
+  time) get a column each plus two bits in ``optional_state`` recording
+  whether the key is present and whether it is None
+* per-feature contributions (``feature_contributions``) fill one row of a
+  float64 matrix instead of a 15-key dict
+
+Dicts (and ``AssessmentResult`` objects) are only rebuilt when an entry is
+read. Entries that don't fit the packed layout (e.g. an AQ answer other than
+0/1) are kept as plain dicts so nothing is ever lost.
+"""
+
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+AQ_KEYS = tuple(f'a{i}_score' for i in range(1, 11))
+DEMOGRAPHIC_KEYS = ('name', 'age', 'gender', 'country', 'jaundice',
+                    'family_history', 'respondent', 'ethnicity')
+BASE_KEYS = frozenset(('id', 'timestamp', 'demographic', 'behavioral', 'image_filename',
+                       'prediction', 'probability', 'confidence', 'risk_level'))
+EXPLANATION_FIELDS = ('base_probability', 'feature_contributions')
+CONTRIBUTION_KEYS = AQ_KEYS + ('age', 'gender', 'ethnicity', 'jaundice', 'family_history')
+
+# Bit positions in the per-row flag field
+FLAG_GENDER = 1 << 0
+FLAG_JAUNDICE = 1 << 1
+FLAG_FAMILY_HISTORY = 1 << 2
+FLAG_PREDICTION = 1 << 3
+FLAG_NO_ETHNICITY = 1 << 4
+FLAG_EXPLAINED = 1 << 5
+FLAG_NO_EXPLANATION = 1 << 6
+
+# Optional top-level fields packed into columns: field -> type of non-None values.
+# Bits 2*i and 2*i+1 of ``optional_state`` mark field i as present / not None.
+OPTIONAL_FIELDS = {
+    'calibrated_probability': float,
+    'model_version': str,
+    'inference_ms': float,
+}
+
+INT16_MIN, INT16_MAX = -(1 << 15), (1 << 15) - 1
+
+# Fixed-width NumPy columns and their dtypes
+COLUMNS = {
+    'aq_bits': np.uint16,
+    'flags': np.uint8,
+    'age': np.int16,
+    'ethnicity': np.int16,
+    'country': np.uint32,
+    'respondent': np.uint32,
+    'risk_level': np.uint8,
+    'probability': np.float64,
+    'confidence': np.float64,
+    'calibrated_probability': np.float64,
+    'model_version': np.uint32,
+    'inference_ms': np.float64,
+    'optional_state': np.uint8,
+    'base_probability': np.float64,
+    'timestamp_us': np.int64,
+    'live': np.bool_,
+}
+
+
+class _StringTable:
+    """Interns repeated strings (countries, respondents, risk levels) as small int codes."""
+
+    __slots__ = ('codes', 'values')
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def _is_bit(value) -> bool:
+    return type(value) is int and value in (0, 1)
+
+
+def _fits_int16(value) -> bool:
+    return type(value) is int and INT16_MIN <= value <= INT16_MAX
+
+
+def _explanation_flag(assessment: Dict[str, Any]) -> Optional[int]:
+    """Flag for packing the explanation fields, 0 if absent, or None if they don't fit."""
+    present = [field in assessment for field in EXPLANATION_FIELDS]
+    if not any(present):
+        return 0
+    if not all(present):
+        return None
+    base, contributions = (assessment[field] for field in EXPLANATION_FIELDS)
+    if base is None and contributions is None:
+        return FLAG_NO_EXPLANATION
+    if (type(base) is float and isinstance(contributions, dict)
+            and len(contributions) == len(CONTRIBUTION_KEYS)
+            and all(type(contributions.get(key)) is float for key in CONTRIBUTION_KEYS)):
+        return FLAG_EXPLAINED
+    return None
+
+
+def _timestamp_to_us(value) -> Optional[int]:
+    """Microseconds since epoch for UTC datetimes, or None if that would lose information."""
+    if not isinstance(value, datetime) or value.utcoffset() != timedelta(0):
+        return None
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+class AssessmentRecord:
+    """Lightweight view of one stored row; converts to a dict or model only on demand."""
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'CompactAssessmentStore', row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def id(self) -> str:
+        return self._store._ids[self._row]
+
+    @property
+    def probability(self) -> float:
+        return float(self._store._columns['probability'][self._row])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._store._row_to_dict(self._row)
+
+    def to_result(self, model_cls):
+        """Build ``model_cls`` (e.g. AssessmentResult) without re-validating trusted data."""
+        return model_cls.model_construct(**self.to_dict())
+
+
+class CompactAssessmentStore(MutableMapping):
+    """Mapping of assessment id -> assessment dict backed by packed columns."""
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(int(capacity), 1)
+        self._size = 0
+        self._columns = {name: np.zeros(self._capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        # Allocated when the first explained assessment is stored
+        self._contributions: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._names: List[Optional[str]] = []
+        self._images: List[Optional[str]] = []
+        self._extras: List[Optional[dict]] = []
+        self._index: Dict[str, int] = {}
+        self._overflow: Dict[str, dict] = {}
+        self._countries = _StringTable()
+        self._respondents = _StringTable()
+        self._risk_levels = _StringTable()
+        self._model_versions = _StringTable()
+
+    # Mapping interface
+
+    def __len__(self) -> int:
+        return len(self._index) + len(self._overflow)
+
+    def __iter__(self):
+        yield from list(self._index)
+        yield from list(self._overflow)
+
+    def __contains__(self, assessment_id) -> bool:
+        return assessment_id in self._index or assessment_id in self._overflow
+
+    def __getitem__(self, assessment_id: str) -> Dict[str, Any]:
+        row = self._index.get(assessment_id)
+        if row is not None:
+            return self._row_to_dict(row)
+        return self._overflow[assessment_id]
+
+    def __setitem__(self, assessment_id: str, assessment: Dict[str, Any]):
+        if assessment_id in self:
+            del self[assessment_id]
+        if not self._append(assessment_id, assessment):
+            self._overflow[assessment_id] = assessment
+
+    def __delitem__(self, assessment_id: str):
+        row = self._index.pop(assessment_id, None)
+        if row is None:
+            del self._overflow[assessment_id]
+            return
+        # Rows are tombstoned rather than compacted so existing row numbers stay valid
+        self._columns['live'][row] = False
+        self._ids[row] = self._names[row] = self._images[row] = self._extras[row] = None
+
+    # Compact access
+
+    def record(self, assessment_id: str) -> Optional[AssessmentRecord]:
+        """Return a lazy view of a packed entry (None for missing or overflow entries)."""
+        row = self._index.get(assessment_id)
+        return AssessmentRecord(self, row) if row is not None else None
+
+    def get_result(self, assessment_id: str, model_cls):
+        """Rebuild a stored entry as ``model_cls`` without re-validating it."""
+        return model_cls.model_construct(**self[assessment_id])
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Views of the packed columns for live rows, for vectorized aggregation."""
+        live = self._columns['live'][:self._size]
+        return {name: column[:self._size][live] for name, column in self._columns.items()}
+
+    def overflow_values(self) -> List[Dict[str, Any]]:
+        """Entries kept as plain dicts because they didn't fit the packed layout."""
+        return list(self._overflow.values())
+
+    def image_filenames(self) -> Set[str]:
+        """Upload names referenced by stored entries, without rebuilding the dicts."""
+        names = {name for name in self._images if name}
+        names.update(entry['image_filename'] for entry in self._overflow.values() if entry.get('image_filename'))
+        return names
+
+    def decode(self, table: str, codes: np.ndarray) -> List[str]:
+        """Map interned codes from ``columns()`` back to strings."""
+        values = {'country': self._countries, 'respondent': self._respondents,
+                  'risk_level': self._risk_levels, 'model_version': self._model_versions}[table].values
+        return [values[code] for code in codes]
+
+    # Packing
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        if self._contributions is not None:
+            contributions = np.zeros((self._capacity, len(CONTRIBUTION_KEYS)))
+            contributions[:self._size] = self._contributions[:self._size]
+            self._contributions = contributions
+
+    def _append(self, assessment_id: str, assessment: Dict[str, Any]) -> bool:
+        """Pack an assessment into a new row; return False if it doesn't fit the layout."""
+        demographic = assessment.get('demographic')
+        behavioral = assessment.get('behavioral')
+        if not isinstance(demographic, dict) or not isinstance(behavioral, dict):
+            return False
+        if set(behavioral) != set(AQ_KEYS) or set(demographic) != set(DEMOGRAPHIC_KEYS):
+            return False
+        if not all(_is_bit(behavioral[key]) for key in AQ_KEYS):
+            return False
+
+        ethnicity = demographic['ethnicity']
+        timestamp_us = _timestamp_to_us(assessment.get('timestamp'))
+        if (timestamp_us is None
+                or not all(_is_bit(demographic[key]) for key in ('gender', 'jaundice', 'family_history'))
+                or not _is_bit(assessment.get('prediction'))
+                or not _fits_int16(demographic['age'])
+                or not (ethnicity is None or _fits_int16(ethnicity))
+                or not isinstance(demographic['name'], str)
+                or not isinstance(demographic['country'], str)
+                or not isinstance(demographic['respondent'], str)
+                or not isinstance(assessment.get('risk_level'), str)
+                or type(assessment.get('probability')) is not float
+                or type(assessment.get('confidence')) is not float):
+            return False
+
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        columns = self._columns
+
+        aq_bits = 0
+        for bit, key in enumerate(AQ_KEYS):
+            aq_bits |= behavioral[key] << bit
+        flags = 0
+        if demographic['gender']:
+            flags |= FLAG_GENDER
+        if demographic['jaundice']:
+            flags |= FLAG_JAUNDICE
+        if demographic['family_history']:
+            flags |= FLAG_FAMILY_HISTORY
+        if assessment['prediction']:
+            flags |= FLAG_PREDICTION
+        if ethnicity is None:
+            flags |= FLAG_NO_ETHNICITY
+        optional_state = 0
+        packed_optional = []
+        for i, (field, value_type) in enumerate(OPTIONAL_FIELDS.items()):
+            if field not in assessment:
+                continue
+            value = assessment[field]
+            if value is None:
+                optional_state |= 1 << (2 * i)
+            elif type(value) is value_type:
+                optional_state |= 3 << (2 * i)
+                columns[field][row] = self._model_versions.encode(value) if value_type is str else value
+            else:
+                continue
+            packed_optional.append(field)
+        columns['optional_state'][row] = optional_state
+        explanation_flag = _explanation_flag(assessment)
+        if explanation_flag is not None:
+            flags |= explanation_flag
+        if explanation_flag == FLAG_EXPLAINED:
+            contributions = assessment['feature_contributions']
+            columns['base_probability'][row] = assessment['base_probability']
+            if self._contributions is None:
+                self._contributions = np.zeros((self._capacity, len(CONTRIBUTION_KEYS)))
+            self._contributions[row] = [contributions[key] for key in CONTRIBUTION_KEYS]
+
+        columns['aq_bits'][row] = aq_bits
+        columns['flags'][row] = flags
+        columns['age'][row] = demographic['age']
+        columns['ethnicity'][row] = ethnicity or 0
+        columns['country'][row] = self._countries.encode(demographic['country'])
+        columns['respondent'][row] = self._respondents.encode(demographic['respondent'])
+        columns['risk_level'][row] = self._risk_levels.encode(assessment['risk_level'])
+        columns['probability'][row] = assessment['probability']
+        columns['confidence'][row] = assessment['confidence']
+        columns['timestamp_us'][row] = timestamp_us
+        columns['live'][row] = True
+
+        packed = BASE_KEYS if not explanation_flag else BASE_KEYS.union(EXPLANATION_FIELDS)
+        extra = {k: v for k, v in assessment.items() if k not in packed and k not in packed_optional}
+        self._ids.append(assessment_id)
+        self._names.append(demographic['name'])
+        self._images.append(assessment.get('image_filename'))
+        self._extras.append(extra or None)
+        self._index[assessment_id] = row
+        self._size += 1
+        return True
+
+    def _row_to_dict(self, row: int) -> Dict[str, Any]:
+        columns = self._columns
+        aq_bits = int(columns['aq_bits'][row])
+        flags = int(columns['flags'][row])
+        result = {
+            'id': self._ids[row],
+            'timestamp': EPOCH + timedelta(microseconds=int(columns['timestamp_us'][row])),
+            'demographic': {
+                'name': self._names[row],
+                'age': int(columns['age'][row]),
+                'gender': int(bool(flags & FLAG_GENDER)),
+                'country': self._countries.values[columns['country'][row]],
+                'jaundice': int(bool(flags & FLAG_JAUNDICE)),
+                'family_history': int(bool(flags & FLAG_FAMILY_HISTORY)),
+                'respondent': self._respondents.values[columns['respondent'][row]],
+                'ethnicity': None if flags & FLAG_NO_ETHNICITY else int(columns['ethnicity'][row]),
+            },
+            'behavioral': {key: (aq_bits >> bit) & 1 for bit, key in enumerate(AQ_KEYS)},
+            'image_filename': self._images[row],
+            'prediction': int(bool(flags & FLAG_PREDICTION)),
+            'probability': float(columns['probability'][row]),
+            'confidence': float(columns['confidence'][row]),
+            'risk_level': self._risk_levels.values[columns['risk_level'][row]],
+        }
+        optional_state = int(columns['optional_state'][row])
+        if optional_state:
+            for i, (field, value_type) in enumerate(OPTIONAL_FIELDS.items()):
+                state = (optional_state >> (2 * i)) & 3
+                if state == 1:
+                    result[field] = None
+                elif state == 3:
+                    value = columns[field][row]
+                    result[field] = self._model_versions.values[value] if value_type is str else float(value)
+        if flags & FLAG_EXPLAINED:
+            result['base_probability'] = float(columns['base_probability'][row])
+            result['feature_contributions'] = dict(zip(CONTRIBUTION_KEYS, self._contributions[row].tolist()))
+        elif flags & FLAG_NO_EXPLANATION:
+            result['base_probability'] = result['feature_contributions'] = None
+        extra = self._extras[row]
+        if extra:
+            result.update(extra)
+        return result
@@ -0,0 +1,266 @@
+"""
+Offline scoring of questionnaire spreadsheets.
+
+Reads a CSV shaped like ``Autism_Data_processed.csv`` in chunks and scores
+each chunk with one vectorized ``predict_proba`` call, using the same model
+files, calibration and risk thresholds as ``predict_asd``. The input columns
+are written back out with ``probability``, ``calibrated_probability``,
+``confidence``, ``prediction`` and ``risk_level`` appended.
+
+    python -m backend.bulk_score screenings.csv --output scored.csv
+    python -m backend.bulk_score screenings.csv --output scored.csv --workers 4 --store
+
+Large files are scored on several processes; chunks are written in input
+order and only a few are in flight at once, so memory stays bounded.
+``--store`` also saves every scored row as an assessment with ``insert_many``.
+Each row is first validated with the API's ``AssessmentRequest`` (0/1
+answers, age up to 120, known ethnicity codes). Rows that fail are scored in
+the output but not stored, and are reported with their line number.
+Rows with a missing questionnaire answer or demographic are passed through
+unscored. A missing ``ethnicity`` is treated as 0, like the API does.
+Non-integer values (an age of 4.5) are scored with the pickled model, since
+the compact one only takes integers.
+
+Input files may hold patient data, so they are not written to the binary
+dataset cache unless ``--cache`` is given.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+
+try:
+    from . import ml_model
+    from .calibration import RISK_LEVELS, RISK_THRESHOLDS
+    from .dataset import iter_frames
+    from .input_models import AssessmentRequest
+    from .model_registry import production_version_name
+except ImportError:
+    import ml_model
+    from calibration import RISK_LEVELS, RISK_THRESHOLDS
+    from dataset import iter_frames
+    from input_models import AssessmentRequest
+    from model_registry import production_version_name
+
+logger = logging.getLogger(__name__)
+
+SCORE_COLUMNS = ['probability', 'calibrated_probability', 'confidence', 'prediction', 'risk_level']
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Below this many rows per worker the process pool costs more than it saves
+MIN_ROWS_PER_WORKER = 2000
+
+
+def score_frame(frame: pd.DataFrame, thresholds=None) -> pd.DataFrame:
+    """Score every complete row of ``frame``; returns only the ``SCORE_COLUMNS``."""
+    if thresholds is None:
+        thresholds = RISK_THRESHOLDS
+    missing = [column for column in ml_model.FEATURE_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+
+    features = frame[ml_model.FEATURE_COLUMNS].astype(np.float64)
+    features['ethnicity'] = features['ethnicity'].fillna(0.0)
+    complete = features.notna().all(axis=1).to_numpy()
+
+    scores = pd.DataFrame(index=frame.index, columns=SCORE_COLUMNS, dtype=object)
+    if complete.any():
+        probability = ml_model.predict_proba(features.to_numpy()[complete])
+        calibrated = ml_model.get_calibrator().transform(probability)
+        levels = np.searchsorted(np.asarray(thresholds, dtype=np.float64), calibrated, side='right')
+        scores.loc[complete, 'probability'] = probability
+        scores.loc[complete, 'calibrated_probability'] = calibrated
+        scores.loc[complete, 'confidence'] = np.maximum(probability, 1.0 - probability)
+        scores.loc[complete, 'prediction'] = (probability > 0.5).astype(int)
+        scores.loc[complete, 'risk_level'] = np.asarray(RISK_LEVELS, dtype=object)[levels]
+    return scores
+
+
+def _score_chunk(frame: pd.DataFrame, thresholds) -> pd.DataFrame:
+    return pd.concat([frame, score_frame(frame, thresholds)], axis=1)
+
+
+def _worker_init():
+    # Load (memory-map) the model once per worker instead of once per chunk
+    ml_model.warm_model()
+
+
+def score_chunks(chunks: Iterator[pd.DataFrame], workers: int = 1, thresholds=None) -> Iterator[pd.DataFrame]:
+    """Scored chunks in input order, using ``workers`` processes when more than one."""
+    if thresholds is None:
+        thresholds = RISK_THRESHOLDS
+    if workers <= 1:
+        ml_model.warm_model()
+        for chunk in chunks:
+            yield _score_chunk(chunk, thresholds)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk, thresholds))
+            # Keep at most two chunks per worker in memory
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _number(value):
+    """A CSV number as the API would receive it: whole numbers as int, anything else unchanged."""
+    if pd.isna(value):
+        return None
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _str(value, default: str) -> str:
+    return default if pd.isna(value) else str(value)
+
+
+def _request(row: Dict[str, Any], source: str) -> Dict[str, Any]:
+    return {
+        'demographic': {
+            'name': _str(row.get('name'), source),
+            'age': _number(row['age']),
+            'gender': _number(row['gender']),
+            'country': _str(row.get('contry_of_res'), ''),
+            'jaundice': _number(row['jundice']),
+            'family_history': _number(row['austim']),
+            'respondent': _str(row.get('relation'), ''),
+            'ethnicity': _number(row['ethnicity']),
+        },
+        'behavioral': {f'a{i}_score': _number(row[f'A{i}_Score']) for i in range(1, 11)},
+    }
+
+
+def assessment_documents(scored: pd.DataFrame, model_version: str,
+                         source: str) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+    """Assessment documents, shaped like the API's, for the scored rows of a chunk.
+
+    Returns the documents and the rows that failed validation, as
+    ``(line number in the CSV, reason)``.
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    documents, rejected = [], []
+    scored_rows = scored[scored['probability'].notna()]
+    for index, row in zip(scored_rows.index, scored_rows.to_dict('records')):
+        try:
+            request = AssessmentRequest.model_validate(_request(row, source))
+        except ValidationError as e:
+            reasons = '; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            # Line 1 is the header
+            rejected.append((int(index) + 2, reasons))
+            continue
+        documents.append({
+            'id': str(uuid.uuid4()),
+            'timestamp': timestamp,
+            **request.model_dump(),
+            'prediction': int(row['prediction']),
+            'probability': float(row['probability']),
+            'calibrated_probability': float(row['calibrated_probability']),
+            'confidence': float(row['confidence']),
+            'risk_level': row['risk_level'],
+            'model_version': model_version,
+        })
+    return documents, rejected
+
+
+def default_workers(path) -> int:
+    """One process per core for large files, a single process for small ones."""
+    try:
+        with open(path, 'rb') as f:
+            rows = sum(1 for _ in f) - 1
+    except OSError:
+        return 1
+    return max(1, min(os.cpu_count() or 1, rows // MIN_ROWS_PER_WORKER))
+
+
+def bulk_score(csv_path, output_path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               workers: Optional[int] = None, database=None, use_cache: bool = False) -> Dict[str, int]:
+    """Score ``csv_path`` into ``output_path``; optionally insert the results into ``database``.
+
+    With ``use_cache`` an all-numeric CSV is read through the typed dataset
+    cache, so scoring the same file again skips parsing it. The cache is a
+    lasting copy of the input, so it is off by default.
+    """
+    if workers is None:
+        workers = default_workers(csv_path)
+    model_version = production_version_name()
+    source = f"Bulk import {os.path.basename(str(csv_path))}"
+    counts = {'rows': 0, 'scored': 0, 'stored': 0, 'rejected': 0}
+    loop = asyncio.new_event_loop() if database is not None else None
+
+    tmp_path = f"{output_path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            if use_cache:
+                chunks = iter_frames(csv_path, chunk_size)
+            else:
+                chunks = pd.read_csv(csv_path, chunksize=chunk_size)
+            for i, scored in enumerate(score_chunks(chunks, workers)):
+                scored.to_csv(f, header=i == 0, index=False)
+                counts['rows'] += len(scored)
+                counts['scored'] += int(scored['probability'].notna().sum())
+                if loop is not None:
+                    documents, rejected = assessment_documents(scored, model_version, source)
+                    for line, reason in rejected:
+                        logger.warning(f"Line {line} not stored: {reason}")
+                    counts['rejected'] += len(rejected)
+                    if documents:
+                        loop.run_until_complete(database.assessments.insert_many(documents))
+                        counts['stored'] += len(documents)
+        os.replace(tmp_path, output_path)
+    finally:
+        if loop is not None:
+            loop.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+
+    try:
+        from .storage import add_database_arguments, open_database
+    except ImportError:
+        from storage import add_database_arguments, open_database
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Score a CSV of questionnaire rows offline")
+    parser.add_argument('csv')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Scoring processes (default: one per core for large files)')
+    parser.add_argument('--store', action='store_true', help='Also save the scored rows as assessments')
+    parser.add_argument('--cache', action='store_true',
+                        help='Keep a binary copy of the CSV in the dataset cache to speed up rescoring it')
+    add_database_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    database = open_database(args) if args.store else None
+    counts = bulk_score(args.csv, args.output, args.chunk_size, args.workers, database, use_cache=args.cache)
+    print(f"Scored {counts['scored']} of {counts['rows']} rows into {args.output}")
+    if args.store:
+        print(f"Stored {counts['stored']} assessments, rejected {counts['rejected']} invalid rows")
+
+
+if __name__ == '__main__':
+    main()
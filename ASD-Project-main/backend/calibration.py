@@ -0,0 +1,228 @@
+"""
+Probability calibration and risk levels for the questionnaire model.
+
+RandomForest probabilities are vote fractions and are not well calibrated:
+a raw 0.3 does not mean a 30% ASD rate. During training, a Platt (sigmoid) or
+isotonic mapping is fitted on out-of-fold predictions from the
+training split and stored as a monotone piecewise-linear lookup table in
+``models/calibration.json``. At inference the table is applied with a binary
+search, so calibrating a prediction costs O(log n) in the table size.
+
+Risk levels are cut from the calibrated probability. The cutoffs default to
+0.3 / 0.6 and can be set per deployment with ``RISK_THRESHOLDS=0.25,0.55``.
+
+    python -m backend.calibration   # fit for the current model, update questionnaire_metrics.json
+"""
+
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+RISK_LEVELS = ('Low', 'Moderate', 'High')
+DEFAULT_RISK_THRESHOLDS = '0.3,0.6'
+
+# Platt scaling by default: with a few hundred training rows isotonic regression
+# overfits its steps (test Brier 0.017 vs 0.012 for sigmoid on this dataset)
+DEFAULT_METHOD = 'sigmoid'
+
+# Points in the lookup table for a Platt (sigmoid) fit
+SIGMOID_TABLE_SIZE = 201
+
+CALIBRATION_BINS = 10
+
+
+def parse_risk_thresholds(value: str) -> Tuple[float, float]:
+    """Parse ``"low,high"`` cutoffs; both must be strictly increasing and inside (0, 1)."""
+    try:
+        thresholds = tuple(float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError(f"RISK_THRESHOLDS must be two comma-separated numbers, got {value!r}")
+    if len(thresholds) != 2 or not 0.0 < thresholds[0] < thresholds[1] < 1.0:
+        raise ValueError(f"RISK_THRESHOLDS must satisfy 0 < low < high < 1, got {value!r}")
+    return thresholds
+
+
+RISK_THRESHOLDS = parse_risk_thresholds(os.environ.get('RISK_THRESHOLDS', DEFAULT_RISK_THRESHOLDS))
+
+
+def risk_level(probability: float, thresholds: Optional[Sequence[float]] = None) -> str:
+    """Low below the first cutoff, High at or above the second, Moderate in between."""
+    if thresholds is None:
+        thresholds = RISK_THRESHOLDS
+    return RISK_LEVELS[bisect.bisect_right(thresholds, probability)]
+
+
+class CalibrationTable:
+    """Monotone piecewise-linear map from raw to calibrated probability."""
+
+    def __init__(self, x: Sequence[float], y: Sequence[float], metadata: Optional[Dict[str, Any]] = None):
+        self.x = [float(v) for v in x]
+        self.y = [float(v) for v in y]
+        self.metadata = metadata or {}
+        if len(self.x) != len(self.y) or not self.x:
+            raise ValueError("Calibration table needs matching, non-empty x and y")
+        if any(b < a for a, b in zip(self.x, self.x[1:])) or any(b < a for a, b in zip(self.y, self.y[1:])):
+            raise ValueError("Calibration table must be non-decreasing")
+
+    @classmethod
+    def identity(cls) -> 'CalibrationTable':
+        return cls([0.0, 1.0], [0.0, 1.0], {'method': 'identity'})
+
+    @property
+    def method(self) -> str:
+        return self.metadata.get('method', 'identity')
+
+    def __call__(self, probability: float) -> float:
+        x, y = self.x, self.y
+        i = bisect.bisect_right(x, probability)
+        if i == 0:
+            return y[0]
+        if i == len(x):
+            return y[-1]
+        x0, x1 = x[i - 1], x[i]
+        if x1 == x0:
+            return y[i]
+        return y[i - 1] + (probability - x0) * (y[i] - y[i - 1]) / (x1 - x0)
+
+    def transform(self, probabilities) -> np.ndarray:
+        """Vectorized version of calling the table on each probability."""
+        return np.interp(np.asarray(probabilities, dtype=np.float64), self.x, self.y)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.metadata, x=self.x, y=self.y)
+
+
+def fit_calibration(raw: np.ndarray, y: np.ndarray, method: str = DEFAULT_METHOD) -> CalibrationTable:
+    """Fit a calibration table on raw probabilities ``raw`` and 0/1 labels ``y``."""
+    raw = np.asarray(raw, dtype=np.float64)
+    y = np.asarray(y)
+    if method == 'isotonic':
+        from sklearn.isotonic import IsotonicRegression
+
+        isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(raw, y)
+        x_points, y_points = isotonic.X_thresholds_, isotonic.y_thresholds_
+    elif method == 'sigmoid':
+        from sklearn.linear_model import LogisticRegression
+
+        platt = LogisticRegression(C=1e6).fit(raw.reshape(-1, 1), y)
+        x_points = np.linspace(0.0, 1.0, SIGMOID_TABLE_SIZE)
+        y_points = platt.predict_proba(x_points.reshape(-1, 1))[:, 1]
+    else:
+        raise ValueError(f"Unknown calibration method: {method}")
+    return CalibrationTable(x_points, y_points, {'method': method, 'fitted_on': int(len(raw))})
+
+
+def out_of_fold_probabilities(model, X_train: np.ndarray, y_train: np.ndarray,
+                              folds: int = 5, random_state: int = 42) -> np.ndarray:
+    """Raw probabilities for the training rows from models that never saw them."""
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    return cross_val_predict(clone(model), X_train, y_train, cv=cv, method='predict_proba')[:, 1]
+
+
+def calibration_report(raw: np.ndarray, calibrated: np.ndarray, y: np.ndarray,
+                       method: str, n_bins: int = CALIBRATION_BINS) -> Dict[str, Any]:
+    """Calibration curves and Brier scores before and after calibration (test split)."""
+    from sklearn.calibration import calibration_curve
+    from sklearn.metrics import brier_score_loss
+
+    def _curve(probabilities):
+        prob_true, prob_pred = calibration_curve(y, probabilities, n_bins=n_bins, strategy='uniform')
+        return {
+            'prob_true': prob_true.tolist(),
+            'prob_pred': prob_pred.tolist(),
+            'brier_score': float(brier_score_loss(y, probabilities)),
+        }
+
+    return {
+        'method': method,
+        'n_bins': n_bins,
+        'risk_thresholds': list(RISK_THRESHOLDS),
+        'raw': _curve(raw),
+        'calibrated': _curve(calibrated),
+    }
+
+
+def save_calibration(table: CalibrationTable, path) -> Path:
+    """Write the lookup table atomically."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(table.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_calibration(path) -> CalibrationTable:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    x, y = data.pop('x'), data.pop('y')
+    return CalibrationTable(x, y, data)
+
+
+def update_metrics_file(metrics_path, report: Dict[str, Any]):
+    """Store the calibration report under ``calibration`` in the metrics JSON."""
+    metrics_path = Path(metrics_path)
+    metrics = {}
+    if metrics_path.exists():
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+    metrics['calibration'] = report
+    tmp_path = metrics_path.with_name(metrics_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(tmp_path, metrics_path)
+
+
+def calibrate_model(model, X_train, y_train, X_test, y_test, method: str = DEFAULT_METHOD):
+    """Fit the calibration table for a trained model and report it on the test split."""
+    table = fit_calibration(out_of_fold_probabilities(model, X_train, y_train), y_train, method)
+    raw_test = model.predict_proba(X_test)[:, 1]
+    report = calibration_report(raw_test, table.transform(raw_test), y_test, method)
+    return table, report
+
+
+def main(argv: Optional[list] = None):
+    import argparse
+
+    from sklearn.model_selection import train_test_split
+
+    try:
+        from . import ml_model
+        from .dataset import load_frame
+    except ImportError:
+        import ml_model
+        from dataset import load_frame
+
+    parser = argparse.ArgumentParser(description="Fit probability calibration for the questionnaire model")
+    parser.add_argument('--method', choices=('isotonic', 'sigmoid'), default=DEFAULT_METHOD)
+    parser.add_argument('--csv', default=str(ml_model.DATASET_PATH))
+    parser.add_argument('--metrics', default=str(ml_model.MODELS_DIR / 'questionnaire_metrics.json'))
+    args = parser.parse_args(argv)
+
+    model, scaler = ml_model.load_model()
+    df = load_frame(args.csv)
+    # Same split as train_model, so the test rows were never used for fitting
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[ml_model.FEATURE_COLUMNS], df['Class/ASD'], test_size=0.2, random_state=42
+    )
+    table, report = calibrate_model(
+        model, scaler.transform(X_train), y_train.to_numpy(),
+        scaler.transform(X_test), y_test.to_numpy(), args.method
+    )
+    table.metadata['source_fingerprint'] = ml_model.model_fingerprint()
+    save_calibration(table, ml_model.CALIBRATION_PATH)
+    update_metrics_file(args.metrics, report)
+    print(f"Saved {ml_model.CALIBRATION_PATH} ({args.method}, {len(table.x)} points)")
+    print(f"Test Brier score {report['raw']['brier_score']:.4f} raw -> "
+          f"{report['calibrated']['brier_score']:.4f} calibrated")
+
+
+if __name__ == '__main__':
+    main()
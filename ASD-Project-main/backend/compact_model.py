@@ -0,0 +1,271 @@
+"""
+Compact, memory-mappable format for the RandomForest questionnaire model.
+
+All trees are flattened into one ``.npy`` file holding a structured array of
+shape ``(n_trees, max_nodes)``. Each node stores its split feature, threshold,
+children and the ASD-class probability. A small JSON sidecar holds the metadata.
+
+Every questionnaire feature is integer-valued (0/1 answers, age, codes), so
+the scaler can be folded into the thresholds without losing anything: each
+split ``(x - mean) / scale <= t`` is replaced by ``x <= k``, where ``k`` is
+the largest integer that sklearn's own float32 comparison sends left.
+Thresholds are therefore stored as int16 in raw feature units, and
+inference needs neither the scaler nor sklearn.
+
+The file is loaded with ``np.load(mmap_mode='r')``, so every worker maps the
+same pages instead of unpickling its own copy of 100 tree objects.
+
+    python -m backend.compact_model   # export from the .pkl files and check parity
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+NODE_DTYPE = np.dtype([
+    ('feature', '<i2'),
+    ('threshold', '<i2'),
+    ('left', '<i2'),
+    ('right', '<i2'),
+    ('value', '<f8'),
+])
+
+INT16_MIN, INT16_MAX = np.iinfo(np.int16).min, np.iinfo(np.int16).max
+
+FORMAT_VERSION = 1
+
+
+class CompactForest:
+    """RandomForest inference over flattened node arrays (raw, unscaled features)."""
+
+    def __init__(self, nodes: np.ndarray, metadata: Dict[str, Any]):
+        self.nodes = nodes
+        self.metadata = metadata
+        self.feature_names = metadata['feature_names']
+        self.max_depth = metadata['max_depth']
+        self.n_trees = nodes.shape[0]
+        self._tree_index = np.arange(self.n_trees)
+
+    def _as_int_features(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {X.shape[1]}")
+        if not np.array_equal(X, np.floor(X)):
+            raise ValueError("The compact model only accepts integer-valued features")
+        # Values beyond the int16 range compare the same way against every threshold
+        return np.clip(X, INT16_MIN, INT16_MAX).astype(np.int16)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index reached in every tree, shape ``(n_rows, n_trees)``."""
+        X = self._as_int_features(X)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        trees = self._tree_index[np.newaxis, :]
+        feature, threshold = self.nodes['feature'], self.nodes['threshold']
+        left, right = self.nodes['left'], self.nodes['right']
+
+        node = np.zeros((X.shape[0], self.n_trees), dtype=np.intp)
+        # Leaves point to themselves, so walking max_depth steps lands every tree on its leaf
+        for _ in range(self.max_depth):
+            go_left = X[rows, feature[trees, node]] <= threshold[trees, node]
+            node = np.where(go_left, left[trees, node], right[trees, node])
+        return node
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Probability of the ASD class for each row."""
+        leaves = self.apply(X)
+        return self.nodes['value'][self._tree_index[np.newaxis, :], leaves].mean(axis=1)
+
+    def explain(self, X) -> Tuple[np.ndarray, float, np.ndarray]:
+        """Probabilities plus per-feature contributions, from the same walk down the trees.
+
+        Uses the Saabas decomposition: every split moves the node probability
+        from parent to child, and that change is credited to the split feature.
+        For each row ``probability == base + contributions.sum()``, where
+        ``base`` is the mean root probability (the training-set ASD rate).
+        """
+        X = self._as_int_features(X)
+        n_rows, n_features = X.shape
+        rows = np.arange(n_rows)[:, np.newaxis]
+        trees = self._tree_index[np.newaxis, :]
+        feature, threshold = self.nodes['feature'], self.nodes['threshold']
+        left, right, value = self.nodes['left'], self.nodes['right'], self.nodes['value']
+        # Flat (row, feature) slots so each step is a single bincount
+        slots = rows * n_features
+
+        node = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+        totals = np.zeros(n_rows * n_features)
+        for _ in range(self.max_depth):
+            split_feature = feature[trees, node]
+            go_left = X[rows, split_feature] <= threshold[trees, node]
+            child = np.where(go_left, left[trees, node], right[trees, node])
+            # Leaves point to themselves, so finished trees add zero
+            delta = value[trees, child] - value[trees, node]
+            totals += np.bincount((slots + split_feature).ravel(), weights=delta.ravel(),
+                                  minlength=n_rows * n_features)
+            node = child
+
+        probabilities = value[trees, node].mean(axis=1)
+        base = float(value[:, 0].mean())
+        return probabilities, base, totals.reshape(n_rows, n_features) / self.n_trees
+
+
+def _sklearn_goes_left(value: int, threshold: float, mean: float, scale: float) -> bool:
+    """The split test sklearn performs for a raw value: standardize in float64, compare in float32."""
+    return np.float32((np.float64(value) - mean) / scale) <= threshold
+
+
+def _raw_threshold(threshold: float, mean: float, scale: float) -> int:
+    """Largest integer raw value that goes left at a split on a standardized feature."""
+    candidate = int(np.floor(threshold * scale + mean))
+    # Rounding can move the boundary by one; settle it with sklearn's own comparison
+    while not _sklearn_goes_left(candidate, threshold, mean, scale):
+        candidate -= 1
+    while _sklearn_goes_left(candidate + 1, threshold, mean, scale):
+        candidate += 1
+    if not INT16_MIN <= candidate <= INT16_MAX:
+        raise ValueError(f"Threshold {threshold * scale + mean} does not fit in int16")
+    return candidate
+
+
+def build_compact_forest(model, scaler, feature_names) -> CompactForest:
+    """Flatten a fitted binary RandomForestClassifier (+ StandardScaler) into a CompactForest."""
+    if list(model.classes_) != [0, 1]:
+        raise ValueError(f"Expected binary classes [0, 1], got {list(model.classes_)}")
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(len(feature_names))
+    scale = scaler.scale_ if scaler.with_std else np.ones(len(feature_names))
+
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    max_nodes = max(tree.node_count for tree in trees)
+    if max_nodes > INT16_MAX:
+        raise ValueError(f"Trees with {max_nodes} nodes do not fit the int16 node layout")
+    nodes = np.zeros((len(trees), max_nodes), dtype=NODE_DTYPE)
+
+    for t, tree in enumerate(trees):
+        n = tree.node_count
+        index = np.arange(n)
+        is_leaf = tree.children_left[:n] == -1
+        # Per-node class fractions; normalize in case the tree stores raw counts
+        counts = tree.value[:n, 0, :]
+        nodes['value'][t, :n] = counts[:, 1] / counts.sum(axis=1)
+        nodes['left'][t, :n] = np.where(is_leaf, index, tree.children_left[:n])
+        nodes['right'][t, :n] = np.where(is_leaf, index, tree.children_right[:n])
+        nodes['feature'][t, :n] = np.where(is_leaf, 0, tree.feature[:n])
+        for i in np.flatnonzero(~is_leaf):
+            feature = tree.feature[i]
+            nodes['threshold'][t, i] = _raw_threshold(tree.threshold[i], mean[feature], scale[feature])
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'feature_names': list(feature_names),
+        'n_trees': len(trees),
+        'max_nodes': int(max_nodes),
+        'max_depth': int(max(tree.max_depth for tree in trees)),
+    }
+    return CompactForest(nodes, metadata)
+
+
+def save_compact_model(forest: CompactForest, path) -> Path:
+    """Write the node array and its JSON sidecar; both are replaced atomically."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(forest.nodes))
+    os.replace(tmp_path, path)
+    meta_path = path.with_suffix('.json')
+    with open(meta_path.with_name(meta_path.name + '.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(forest.metadata, f, indent=2)
+    os.replace(meta_path.with_name(meta_path.name + '.tmp'), meta_path)
+    return path
+
+
+def load_compact_model(path, mmap: bool = True) -> CompactForest:
+    """Load a compact model; with ``mmap`` the node array is shared between processes."""
+    path = Path(path)
+    with open(path.with_suffix('.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format: {metadata.get('format_version')}")
+    nodes = np.load(path, mmap_mode='r' if mmap else None)
+    if nodes.dtype != NODE_DTYPE:
+        raise ValueError(f"Unexpected node dtype {nodes.dtype}")
+    return CompactForest(nodes, metadata)
+
+
+def check_parity(forest: CompactForest, model, scaler, X, tolerance: float = 1e-9) -> Dict[str, Any]:
+    """Compare compact and sklearn predictions on raw feature rows ``X``."""
+    X = np.asarray(X, dtype=np.float64)
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    actual = forest.predict_proba(X)
+    max_difference = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    return {
+        'rows': int(len(X)),
+        'max_probability_difference': max_difference,
+        'predictions_match': bool(np.array_equal(expected > 0.5, actual > 0.5)),
+        'ok': max_difference <= tolerance,
+    }
+
+
+def check_metrics_parity(forest: CompactForest, csv_path, metrics_path,
+                         test_size: float = 0.2, random_state: int = 42) -> Dict[str, Any]:
+    """Recompute test accuracy with the compact model and compare it to the recorded metrics."""
+    from sklearn.model_selection import train_test_split
+
+    try:
+        from .dataset import feature_matrix
+    except ImportError:
+        from dataset import feature_matrix
+
+    X, y = feature_matrix(csv_path, forest.feature_names)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    accuracy = float(np.mean((forest.predict_proba(X_test) > 0.5).astype(int) == y_test))
+
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        recorded = json.load(f)['test_metrics']['accuracy']
+    return {'accuracy': accuracy, 'recorded_accuracy': recorded, 'ok': abs(accuracy - recorded) < 1e-12}
+
+
+def main(argv: Optional[list] = None):
+    import argparse
+
+    try:
+        from . import ml_model
+        from .dataset import feature_matrix
+    except ImportError:
+        import ml_model
+        from dataset import feature_matrix
+
+    parser = argparse.ArgumentParser(description="Export the questionnaire model to the compact format")
+    parser.add_argument('--output', default=str(ml_model.COMPACT_MODEL_PATH))
+    parser.add_argument('--csv', default=str(ml_model.DATASET_PATH))
+    parser.add_argument('--metrics', default=str(ml_model.MODELS_DIR / 'questionnaire_metrics.json'))
+    args = parser.parse_args(argv)
+
+    model, scaler = ml_model.load_model()
+    forest = build_compact_forest(model, scaler, ml_model.FEATURE_COLUMNS)
+
+    X, _ = feature_matrix(args.csv, ml_model.FEATURE_COLUMNS)
+    parity = check_parity(forest, model, scaler, X)
+    print(f"Prediction parity on {parity['rows']} rows: max |dp| = {parity['max_probability_difference']:.3g}, "
+          f"predictions match: {parity['predictions_match']}")
+    if not parity['ok'] or not parity['predictions_match']:
+        raise SystemExit("Compact model does not match the sklearn model; not saved")
+
+    forest.metadata['source_fingerprint'] = ml_model.model_fingerprint()
+    save_compact_model(forest, args.output)
+    saved = load_compact_model(args.output)
+    if Path(args.metrics).exists():
+        metrics = check_metrics_parity(saved, args.csv, args.metrics)
+        print(f"Test accuracy {metrics['accuracy']:.6f} (recorded {metrics['recorded_accuracy']:.6f})")
+        if not metrics['ok']:
+            raise SystemExit("Compact model accuracy differs from questionnaire_metrics.json")
+    size = Path(args.output).stat().st_size
+    print(f"Saved {args.output} ({size / 1024:.0f} KiB, {forest.n_trees} trees, {forest.metadata['max_nodes']} max nodes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Typed, memory-mapped cache of the training CSV.
+
+``pd.read_csv`` re-parses ``Autism_Data_processed.csv`` on every training run,
+experiment and benchmark, and infers float64/int64 for columns that only hold
+0/1 answers and small codes. ``load_dataset`` converts a CSV once into a
+structured ``.npy`` file using the smallest integer type that holds each
+column (uint8 for the answers and codes here, 21 bytes per row instead of
+168). Later calls memory-map that file.
+
+The cache lives in ``data/.cache/`` (``DATASET_CACHE_DIR``) and records the
+size, mtime and SHA-256 of its source CSV. It is rebuilt when the CSV's
+contents change, and a touched but unchanged CSV keeps its cache.
+
+Conversion reads the CSV in chunks, so it also works for files that do not fit
+in memory. Only numeric columns can be cached; ``load_dataset`` raises
+``ValueError`` for anything else, and callers fall back to reading the CSV.
+
+    python -m backend.dataset                 # build or check the cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATASET_CACHE_DIR = Path(os.environ.get('DATASET_CACHE_DIR', Path(__file__).parent / 'data' / '.cache'))
+
+# Bump when the cache layout changes so old caches are rebuilt
+CACHE_FORMAT = 1
+
+CONVERT_CHUNK_SIZE = 100_000
+
+# Candidate integer types, smallest first
+_INTEGER_TYPES = (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_paths(csv_path, cache_dir=None):
+    """``(data, metadata)`` cache file paths for ``csv_path``."""
+    csv_path = Path(csv_path)
+    cache_dir = Path(cache_dir) if cache_dir is not None else DATASET_CACHE_DIR
+    tag = hashlib.sha256(str(csv_path.resolve()).encode('utf-8')).hexdigest()[:8]
+    stem = f"{csv_path.stem}-{tag}"
+    return cache_dir / f"{stem}.npy", cache_dir / f"{stem}.json"
+
+
+def _column_dtype(stats: Dict[str, Any]) -> np.dtype:
+    if stats['integral'] and not stats['nan']:
+        for candidate in _INTEGER_TYPES:
+            info = np.iinfo(candidate)
+            if info.min <= stats['min'] and stats['max'] <= info.max:
+                return np.dtype(candidate)
+    return np.dtype(np.float64)
+
+
+def infer_dtype(csv_path, chunk_size: int = CONVERT_CHUNK_SIZE) -> Tuple[np.dtype, int]:
+    """Structured dtype with the smallest type that holds every value of each column, and the row count."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        rows += len(chunk)
+        for column in chunk.columns:
+            values = chunk[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                raise ValueError(f"Column {column!r} is not numeric and cannot be cached")
+            column_stats = stats.setdefault(column, {'min': 0, 'max': 0, 'integral': True, 'nan': False})
+            finite = values.dropna().to_numpy(dtype=np.float64)
+            column_stats['nan'] |= len(finite) < len(values)
+            if len(finite):
+                column_stats['min'] = min(column_stats['min'], finite.min())
+                column_stats['max'] = max(column_stats['max'], finite.max())
+                column_stats['integral'] &= bool(np.all(finite == np.round(finite)))
+    if not stats:
+        raise ValueError(f"{csv_path} has no columns")
+    return np.dtype([(column, _column_dtype(column_stats)) for column, column_stats in stats.items()]), rows
+
+
+def convert(csv_path, data_path, chunk_size: int = CONVERT_CHUNK_SIZE) -> np.dtype:
+    """Write ``csv_path`` to ``data_path`` as a structured ``.npy`` array, chunk by chunk."""
+    dtype, rows = infer_dtype(csv_path, chunk_size)
+    data_path = Path(data_path)
+    tmp_path = data_path.with_name(data_path.name + f'.{os.getpid()}.tmp')
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(rows,))
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        end = start + len(chunk)
+        for column in dtype.names:
+            out[column][start:end] = chunk[column].to_numpy()
+        start = end
+    out.flush()
+    del out
+    os.replace(tmp_path, data_path)
+    return dtype
+
+
+def _read_metadata(meta_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_metadata(meta_path: Path, metadata: Dict[str, Any]):
+    tmp_path = meta_path.with_name(meta_path.name + f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def _is_current(metadata: Optional[Dict[str, Any]], csv_path: Path, data_path: Path, meta_path: Path) -> bool:
+    if metadata is None or metadata.get('format') != CACHE_FORMAT or not data_path.exists():
+        return False
+    stat = csv_path.stat()
+    if (metadata.get('size'), metadata.get('mtime_ns')) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    if metadata.get('size') != stat.st_size or metadata.get('sha256') != _sha256(csv_path):
+        return False
+    # Touched but unchanged: remember the new mtime so the hash isn't recomputed next time
+    metadata.update(mtime_ns=stat.st_mtime_ns)
+    _write_metadata(meta_path, metadata)
+    return True
+
+
+def load_dataset(csv_path, cache_dir=None, mmap: bool = True) -> np.ndarray:
+    """The CSV as a structured array, memory-mapped from the cache (built if missing or stale)."""
+    csv_path = Path(csv_path)
+    data_path, meta_path = cache_paths(csv_path, cache_dir)
+    if not _is_current(_read_metadata(meta_path), csv_path, data_path, meta_path):
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        stat = csv_path.stat()
+        digest = _sha256(csv_path)
+        dtype = convert(csv_path, data_path)
+        _write_metadata(meta_path, {
+            'format': CACHE_FORMAT,
+            'source': str(csv_path.resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'columns': {name: dtype[name].str for name in dtype.names},
+        })
+    return np.load(data_path, mmap_mode='r' if mmap else None)
+
+
+def load_frame(csv_path, columns: Optional[Sequence[str]] = None, cache_dir=None) -> pd.DataFrame:
+    """DataFrame with the cached column types, or ``pd.read_csv`` if the CSV can't be cached."""
+    try:
+        data = load_dataset(csv_path, cache_dir)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Dataset cache not used for {csv_path}: {e}")
+        return pd.read_csv(csv_path, usecols=columns)
+    names = list(columns) if columns is not None else list(data.dtype.names)
+    return pd.DataFrame({name: np.asarray(data[name]) for name in names}, columns=names)
+
+
+def iter_frames(csv_path, chunk_size: int, cache_dir=None) -> Iterator[pd.DataFrame]:
+    """Chunks of the CSV as DataFrames, sliced from the cache when it can be built."""
+    try:
+        data = load_dataset(csv_path, cache_dir)
+    except (OSError, ValueError):
+        yield from pd.read_csv(csv_path, chunksize=chunk_size)
+        return
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        yield pd.DataFrame({name: np.asarray(block[name]) for name in data.dtype.names},
+                           index=pd.RangeIndex(start, start + len(block)))
+
+
+def feature_matrix(csv_path, columns: Sequence[str], target: str = 'Class/ASD', cache_dir=None):
+    """``(X, y)`` as float64 features and integer labels."""
+    frame = load_frame(csv_path, list(columns) + [target], cache_dir)
+    return frame[list(columns)].to_numpy(dtype=np.float64), frame[target].to_numpy()
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or check the typed dataset cache")
+    parser.add_argument('csv', nargs='?', default=str(Path(__file__).parent / 'data' / 'Autism_Data_processed.csv'))
+    args = parser.parse_args(argv)
+
+    data = load_dataset(args.csv)
+    data_path, _ = cache_paths(args.csv)
+    print(f"{data_path}: {len(data)} rows, {data.dtype.itemsize} bytes per row")
+    for name in data.dtype.names:
+        print(f"  {name}: {data.dtype[name]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Event-loop lag monitoring and an on-demand sampling profiler.
+
+``LoopMonitor`` runs a heartbeat task that sleeps ``LOOP_MONITOR_INTERVAL``
+seconds (default 0.1) and records how late it wakes up. That delay is the
+event-loop lag every request sees. A watchdog thread watches the heartbeat.
+When the loop has not come back for ``SLOW_CALLBACK_MS`` (default 250), it
+takes the loop thread's current stack and logs it once per stall. The stack
+shows the handler that is blocking, such as a synchronous model call or a
+file write. Code that holds the GIL for the whole stall (some C extensions)
+delays the sample until it lets go.
+
+``sample_stacks`` samples thread stacks at ``hz`` for a number of seconds. It
+returns them in the collapsed ("folded") format read by flamegraph.pl,
+speedscope and similar tools. The server exposes it at
+``GET /api/debug/profile`` only when ``PROFILER_ENABLED=1``.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_INTERVAL = float(os.environ.get('LOOP_MONITOR_INTERVAL', '0.1'))
+SLOW_CALLBACK_THRESHOLD = float(os.environ.get('SLOW_CALLBACK_MS', '250')) / 1000
+# Lag samples kept for percentiles (one minute at the default interval)
+LAG_WINDOW = 600
+# Frames kept in a logged stall stack
+STALL_STACK_LIMIT = 30
+PROFILER_MAX_SECONDS = 60.0
+PROFILER_MAX_HZ = 1000
+
+
+class LoopMonitor:
+    """Heartbeat-based lag measurement with a watchdog that logs stacks of blocked loops."""
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._lag_ms = deque(maxlen=LAG_WINDOW)
+        self.max_lag_ms = 0.0
+        self.stalls = 0
+        self.last_stall: Optional[Dict[str, Any]] = None
+        self.loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None or self.interval <= 0:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join(timeout=1)
+        self._watchdog = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag_ms = max(0.0, now - expected) * 1000
+            self._lag_ms.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+            heartbeat = self._heartbeat
+            # The next beat is due one interval after the last one
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and reported != heartbeat:
+                reported = heartbeat
+                self._report_stall(blocked)
+
+    def _report_stall(self, blocked: float):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=STALL_STACK_LIMIT)) if frame is not None else ''
+        self.stalls += 1
+        self.last_stall = {'blocked_ms': round(blocked * 1000, 1), 'at': time.time(), 'stack': stack}
+        logger.warning(f"⚠️ Event loop blocked for {blocked * 1000:.0f} ms (still running), loop thread stack:\n{stack}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self._lag_ms)
+
+        def percentile(q: float) -> Optional[float]:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+        return {
+            'running': self._task is not None,
+            'interval_ms': self.interval * 1000,
+            'threshold_ms': self.threshold * 1000,
+            'lag_ms': {'p50': percentile(0.5), 'p99': percentile(0.99), 'max_recent': samples[-1] if samples else None,
+                       'max': self.max_lag_ms},
+            'stalls': self.stalls,
+            'last_stall': self.last_stall,
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, hz: int, thread_ids: Optional[Iterable[int]] = None) -> Counter:
+    """Sample the stacks of ``thread_ids`` (default: every other thread); collapsed stack -> sample count."""
+    wanted = set(thread_ids) if thread_ids is not None else None
+    me = threading.get_ident()
+    period = 1.0 / hz
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (wanted is not None and ident not in wanted):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            counts[';'.join(reversed(labels))] += 1
+        time.sleep(period)
+    return counts
+
+
+def collapsed(counts: Counter) -> str:
+    """Folded-stack text: one ``frame;frame;frame count`` line per distinct stack."""
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,298 @@
+"""
+Streaming export of assessments in the layout of ``Autism_Data_processed.csv``.
+
+Assessments are read from the database cursor in batches and each batch is
+written out as CSV rows or one Parquet row group before the next is fetched,
+so memory use stays constant however large the collection is.
+
+    GET /api/assessments/export?format=csv
+    python -m backend.export --format parquet --output assessments.parquet
+
+Columns follow the training CSV: AQ answers map to ``A1_Score``..``A10_Score``,
+``jaundice`` to ``jundice``, ``family_history`` to ``austim`` and the AQ total
+to ``result``. ``contry_of_res`` and ``relation`` hold the country and
+respondent as entered, because the label encoding used in the training CSV is
+not part of this repository. ``used_app_before``, ``age_desc`` and ``Class/ASD``
+are unknown for screenings and are left empty; the model's output follows in
+extra columns after ``Class/ASD``. Parquet needs ``pyarrow``.
+"""
+
+import asyncio
+import csv
+import io
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+DATASET_COLUMNS = [
+    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
+    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score',
+    'age', 'gender', 'ethnicity', 'jundice', 'austim', 'contry_of_res',
+    'used_app_before', 'result', 'age_desc', 'relation', 'Class/ASD'
+]
+METADATA_COLUMNS = [
+    'assessment_id', 'timestamp', 'prediction', 'probability',
+    'calibrated_probability', 'risk_level', 'model_version'
+]
+COLUMNS = DATASET_COLUMNS + METADATA_COLUMNS
+
+DEFAULT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def assessment_to_row(assessment: Dict[str, Any]) -> Tuple:
+    """One export row, in ``COLUMNS`` order, from a stored assessment document."""
+    demographic = assessment.get('demographic') or {}
+    behavioral = assessment.get('behavioral') or {}
+    answers = [behavioral.get(f'a{i}_score') for i in range(1, 11)]
+    known = [answer for answer in answers if answer is not None]
+    return (
+        *(float(answer) if answer is not None else None for answer in answers),
+        demographic.get('age'),
+        demographic.get('gender'),
+        demographic.get('ethnicity'),
+        demographic.get('jaundice'),
+        demographic.get('family_history'),
+        demographic.get('country'),
+        None,
+        float(sum(known)) if len(known) == 10 else None,
+        None,
+        demographic.get('respondent'),
+        None,
+        assessment.get('id'),
+        _timestamp(assessment.get('timestamp')),
+        assessment.get('prediction'),
+        assessment.get('probability'),
+        assessment.get('calibrated_probability'),
+        assessment.get('risk_level'),
+        assessment.get('model_version'),
+    )
+
+
+async def database_batches(database, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[List[Tuple]]:
+    """Export rows from ``database.assessments`` (Motor or SQLite), one cursor batch at a time."""
+    cursor = database.assessments.find({}, {'_id': 0}).batch_size(batch_size)
+    batch = []
+    async for assessment in cursor:
+        batch.append(assessment_to_row(assessment))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def cache_batches(cache, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[List[Tuple]]:
+    """Export rows from the assessment cache; entries are rebuilt one at a time."""
+    if hasattr(cache, 'get_many_async'):
+        # A shared cache is read one batch per round trip, in the executor
+        assessment_ids = await cache.ids_async()
+        for start in range(0, len(assessment_ids), batch_size):
+            batch = [assessment_to_row(a) for a in await cache.get_many_async(assessment_ids[start:start + batch_size])]
+            if batch:
+                yield batch
+        return
+    batch = []
+    for assessment_id in list(cache):
+        assessment = cache.get(assessment_id)
+        if assessment is None:
+            continue
+        batch.append(assessment_to_row(assessment))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+            # Let other requests run between batches of a large in-memory export
+            await asyncio.sleep(0)
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+async def csv_chunks(batches: AsyncIterator[List[Tuple]]) -> AsyncIterator[bytes]:
+    """Header, then one CSV chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue().encode('utf-8')
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export needs the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def parquet_schema():
+    pa, _ = _require_pyarrow()
+    string_columns = {'contry_of_res', 'relation', 'assessment_id', 'risk_level', 'model_version'}
+    float_columns = {'result', 'probability', 'calibrated_probability'}
+    fields = []
+    for column in COLUMNS:
+        if column.startswith('A') and column.endswith('_Score') or column in float_columns:
+            fields.append(pa.field(column, pa.float64()))
+        elif column in string_columns:
+            fields.append(pa.field(column, pa.string()))
+        elif column == 'timestamp':
+            fields.append(pa.field(column, pa.timestamp('us', tz='UTC')))
+        else:
+            fields.append(pa.field(column, pa.int64()))
+    return pa.schema(fields)
+
+
+class _ChunkSink:
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def parquet_chunks(batches: AsyncIterator[List[Tuple]]) -> AsyncIterator[bytes]:
+    """One Parquet row group per batch, streamed as it is written."""
+    pa, pq = _require_pyarrow()
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        async for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(batches: AsyncIterator[List[Tuple]], format: str) -> AsyncIterator[bytes]:
+    if format == 'csv':
+        return csv_chunks(batches)
+    if format == 'parquet':
+        _require_pyarrow()
+        return parquet_chunks(batches)
+    raise ValueError(f"Unsupported export format: {format}")
+
+
+async def _prepend(first: Optional[List[Tuple]], rest: AsyncIterator[List[Tuple]]) -> AsyncIterator[List[Tuple]]:
+    if first is None:
+        return
+    yield first
+    async for batch in rest:
+        yield batch
+
+
+async def open_batches(database, cache, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[List[Tuple]]:
+    """Batches from the database, or from the cache if the database can't be read.
+
+    The first batch is fetched eagerly so a dead database is detected before
+    any response bytes are sent.
+    """
+    if database is not None:
+        batches = database_batches(database, batch_size)
+        try:
+            first = await batches.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except Exception:
+            if cache is None:
+                raise
+            return cache_batches(cache, batch_size)
+        return _prepend(first, batches)
+    return cache_batches(cache if cache is not None else {}, batch_size)
+
+
+async def export_to_file(database, path: str, format: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write the export to ``path`` incrementally; returns the number of rows."""
+    rows = 0
+
+    async def counted(batches):
+        nonlocal rows
+        async for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        async for chunk in export_chunks(counted(database_batches(database, batch_size)), format):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    import argparse
+    from pathlib import Path
+
+    from dotenv import load_dotenv
+
+    try:
+        from .storage import add_database_arguments, open_database
+    except ImportError:
+        from storage import add_database_arguments, open_database
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Export assessments in the training dataset layout")
+    parser.add_argument('--format', choices=sorted(MEDIA_TYPES), default='csv')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    add_database_arguments(parser)
+    args = parser.parse_args(argv)
+
+    database = open_database(args)
+    rows = asyncio.run(export_to_file(database, args.output, args.format, args.batch_size))
+    print(f"Exported {rows} assessments to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
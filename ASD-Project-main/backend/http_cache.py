@@ -0,0 +1,304 @@
+"""
+HTTP response compression and conditional GETs.
+
+``CompressionMiddleware`` compresses compressible responses (JSON, text, CSV)
+with Brotli or gzip. It picks the best encoding the client accepts and skips
+bodies shorter than ``minimum_size``. Brotli is used only when the optional
+``brotli`` package is installed. Streamed responses are compressed chunk by
+chunk. Server-Sent Events, already-encoded bodies and partial content are
+passed through untouched. A compressed body is not byte-identical to the
+original, so its ETag is weakened (``W/"..."``), as nginx does.
+
+The helpers below answer ``If-None-Match`` / ``If-Modified-Since`` with
+``304 Not Modified`` from validators that are cheap to compute: a file's stat
+for reports and uploads, or the id of an immutable assessment. The body is
+never read for a 304. Files can also be served by byte range (``206``). Full
+files use the ASGI ``pathsend`` extension and ranges use ``zerocopysend``
+when the server offers them. Otherwise the file is read in chunks.
+"""
+
+import os
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_ENCODINGS = ('br', 'gzip')
+# Bodies shorter than this are sent as is; compression would not pay for itself
+DEFAULT_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+# Brotli quality 4-5 compresses better than gzip -6 at a similar speed
+BROTLI_QUALITY = 4
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml', 'application/x-ndjson')
+# Streams that must reach the client as soon as each message is written
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+def available_encodings(encodings: Sequence[str]) -> tuple:
+    """The configured encodings this process can produce, in preference order."""
+    supported = {'gzip'} | ({'br'} if brotli is not None else set())
+    return tuple(encoding for encoding in encodings if encoding in supported)
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """First of ``encodings`` that an Accept-Encoding header allows, or None."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    __slots__ = ('_compress', '_flush')
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._flush = compressor.compress, compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+def _compressible(headers: Headers, status: int) -> bool:
+    content_type = headers.get('content-type', '')
+    return (
+        status not in (204, 206, 304)
+        and 'content-encoding' not in headers
+        and 'no-transform' not in headers.get('cache-control', '')
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+    )
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the best encoding the client accepts."""
+
+    def __init__(self, app, encodings: Sequence[str] = DEFAULT_ENCODINGS, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope['type'] == 'http' and scope['method'] != 'HEAD' and self.encodings:
+            encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    """``send`` wrapper that holds the response start until the first body chunk decides the encoding."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            self.start = message
+            headers = Headers(raw=message['headers'])
+            if not _compressible(headers, message['status']):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start['headers'])
+            headers.add_vary_header('Accept-Encoding')
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding)
+            headers['Content-Encoding'] = self.encoding
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                headers['ETag'] = f'W/{etag}'
+            body = self.compressor.compress(body)
+            if not more_body:
+                body += self.compressor.finish()
+                headers['Content-Length'] = str(len(body))
+            elif 'content-length' in headers:
+                del headers['Content-Length']
+            await self.send(self.start)
+        else:
+            body = self.compressor.compress(body)
+            if not more_body:
+                body += self.compressor.finish()
+        if body or not more_body:
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (which may list several tags or '*') against an ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+def is_not_modified(request_headers, etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether a GET can be answered with 304. If-None-Match takes precedence over If-Modified-Since."""
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[float], cache_control: str) -> Dict[str, str]:
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if last_modified is not None:
+        headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong ETag for a file that is only ever replaced whole (os.replace), never rewritten in place."""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (first, last) byte positions of a single-range Range header; None to send the whole file."""
+    unit, _, spec = range_header.partition('=')
+    # Multiple ranges would need multipart/byteranges; sending the whole file is allowed instead
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, separator, last = spec.strip().partition('-')
+    if not separator:
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start is None:
+        # Suffix range: the last ``end`` bytes
+        if end is None:
+            return None
+        if end <= 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(0, size - end), size - 1
+    if end is None:
+        end = size - 1
+    elif start > end:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: float) -> bool:
+    """Whether a Range may be honoured under If-Range (strong ETag or exact date match)."""
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    try:
+        return int(parsedate_to_datetime(if_range).timestamp()) == int(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+class FileRangeResponse(FileResponse):
+    """``206 Partial Content`` with bytes ``start``..``end`` (inclusive) of a file."""
+
+    def __init__(self, path, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers['Content-Range'] = f'bytes {start}-{end}/{stat_result.st_size}'
+        self.headers['Content-Length'] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        remaining = self.end - self.start + 1
+        if scope['method'].upper() == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        elif 'http.response.zerocopysend' in scope.get('extensions', {}):
+            with open(self.path, 'rb') as file:
+                await send({'type': 'http.response.zerocopysend', 'file': file,
+                            'offset': self.start, 'count': remaining, 'more_body': False})
+        else:
+            async with await anyio.open_file(self.path, mode='rb') as file:
+                await file.seek(self.start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    # A file truncated under us ends the body early rather than hanging
+                    remaining = remaining - len(chunk) if chunk else 0
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+
+
+def cached_file_response(request_headers, path, media_type: str, cache_control: str,
+                         filename: Optional[str] = None, ranges: bool = False) -> Response:
+    """Serve ``path`` with ETag/Last-Modified, or 304 without opening it. Raises FileNotFoundError.
+
+    With ``ranges``, a single-range ``Range`` header is answered with 206 (or 416).
+    """
+    stat = os.stat(path)
+    headers = validator_headers(file_etag(stat), stat.st_mtime, cache_control)
+    if is_not_modified(request_headers, headers['ETag'], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    if ranges:
+        headers['Accept-Ranges'] = 'bytes'
+        range_header = request_headers.get('range')
+        if range_header and if_range_matches(request_headers.get('if-range'), headers['ETag'], stat.st_mtime):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, 'Content-Range': f'bytes */{stat.st_size}'})
+            if byte_range is not None:
+                return FileRangeResponse(path, *byte_range, stat_result=stat, media_type=media_type,
+                                         filename=filename, headers=headers)
+    return FileResponse(path, media_type=media_type, filename=filename, headers=headers, stat_result=stat)
@@ -0,0 +1,57 @@
+"""
+Validated input for an assessment.
+
+Used by ``POST /api/assess`` and by ``bulk_score --store``, so a spreadsheet
+row is held to the same bounds as a form submitted through the API. Answers
+and yes/no fields are 0/1 and, like the codes, must be integers (strict:
+"1", 1.0 and true are rejected rather than coerced).
+"""
+
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+MAX_AGE = 120
+# Ethnicity codes in the training data
+ETHNICITY_CODES = 12
+MAX_TEXT_LENGTH = 200
+
+
+class DemographicData(BaseModel):
+    name: str = Field(max_length=MAX_TEXT_LENGTH)
+    age: int = Field(strict=True, ge=0, le=MAX_AGE)
+    gender: int = Field(strict=True, ge=0, le=1)
+    country: str = Field(max_length=MAX_TEXT_LENGTH)
+    jaundice: int = Field(strict=True, ge=0, le=1)
+    family_history: int = Field(strict=True, ge=0, le=1)
+    respondent: str = Field(max_length=MAX_TEXT_LENGTH)
+    ethnicity: Optional[int] = Field(default=None, strict=True, ge=0, lt=ETHNICITY_CODES)
+
+
+class BehavioralData(BaseModel):
+    a1_score: int = Field(strict=True, ge=0, le=1)
+    a2_score: int = Field(strict=True, ge=0, le=1)
+    a3_score: int = Field(strict=True, ge=0, le=1)
+    a4_score: int = Field(strict=True, ge=0, le=1)
+    a5_score: int = Field(strict=True, ge=0, le=1)
+    a6_score: int = Field(strict=True, ge=0, le=1)
+    a7_score: int = Field(strict=True, ge=0, le=1)
+    a8_score: int = Field(strict=True, ge=0, le=1)
+    a9_score: int = Field(strict=True, ge=0, le=1)
+    a10_score: int = Field(strict=True, ge=0, le=1)
+
+
+class AssessmentRequest(BaseModel):
+    demographic: DemographicData
+    behavioral: BehavioralData
+    image_filename: Optional[str] = Field(default=None, max_length=MAX_TEXT_LENGTH)
+
+    def feature_row(self) -> np.ndarray:
+        """The model's input row (FEATURE_COLUMNS order), straight from the validated fields"""
+        b, d = self.behavioral, self.demographic
+        return np.array([[
+            b.a1_score, b.a2_score, b.a3_score, b.a4_score, b.a5_score,
+            b.a6_score, b.a7_score, b.a8_score, b.a9_score, b.a10_score,
+            d.age, d.gender, d.ethnicity or 0, d.jaundice, d.family_history
+        ]], dtype=np.float64)
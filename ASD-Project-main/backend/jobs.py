@@ -0,0 +1,333 @@
+"""
+Durable background jobs with progress notifications.
+
+``POST /api/assess?mode=async`` enqueues an assessment instead of scoring it
+inline. A small pool of worker coroutines in each server process claims jobs
+from a local SQLite queue and runs them as a pipeline of stages (score,
+persist, render the PDF). After each stage the job's state is checkpointed, so
+clients can follow progress and a restarted worker resumes at the stage that
+was interrupted instead of starting over.
+
+* Claims are leases: a job whose worker died is picked up again once its lease
+  expires, and gives up after ``MAX_ATTEMPTS`` claims.
+* A graceful shutdown puts its running jobs back in the queue immediately.
+* Every change bumps the job's ``seq``, which is what the long-poll
+  (``?since=``) and Server-Sent Events (``Last-Event-ID``) endpoints resume
+  from. Waiters in the process running the job are woken at once. Waiters in
+  other processes see the change within ``POLL_INTERVAL``.
+* Finished and failed jobs hold the full assessment payload. ``prune`` deletes
+  them ``JOB_TTL_HOURS`` (default 24) after they ended; the retention sweep
+  calls it.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+TERMINAL_STATUSES = ('done', 'failed')
+
+# Seconds a claimed job stays reserved for its worker; extended at every stage
+LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+
+# Claims (including after a crash) before a job is marked failed
+MAX_ATTEMPTS = 3
+
+# How often idle workers and cross-process waiters re-check the queue
+POLL_INTERVAL = 0.5
+
+# Finished and failed jobs are kept this long, then pruned
+JOB_TTL = float(os.environ.get('JOB_TTL_HOURS', '24')) * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    stages_done INTEGER NOT NULL DEFAULT 0,
+    stage_count INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+_COLUMNS = ('id', 'kind', 'status', 'stage', 'stages_done', 'stage_count', 'payload', 'state',
+            'error', 'attempts', 'seq', 'lease_owner', 'lease_until', 'created_at', 'updated_at')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _row(values: Optional[Tuple]) -> Optional[Dict[str, Any]]:
+    if values is None:
+        return None
+    job = dict(zip(_COLUMNS, values))
+    job['payload'] = json.loads(job['payload'])
+    job['state'] = json.loads(job['state']) if job['state'] is not None else None
+    return job
+
+
+def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """What the API returns for a job: no payload or lease details."""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['stages_done'] / job['stage_count'] if job['stage_count'] else 1.0,
+        'result': job['state'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'seq': job['seq'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+
+
+class JobQueue:
+    """Jobs table in a SQLite file; every method is safe to call from several processes."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self.connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the calling thread (re-opened after a fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _select(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return _row(self.connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._select(job_id)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], stage_count: int,
+                job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or str(uuid.uuid4())
+        now = _now()
+        self.connection().execute(
+            "INSERT INTO jobs (id, kind, status, stage_count, payload, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, kind, stage_count, json.dumps(payload), now, now)
+        )
+        return self._select(job_id)
+
+    def claim(self, owner: str, kinds: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job: queued, or running under an expired lease."""
+        conn = self.connection()
+        placeholders = ', '.join('?' for _ in kinds)
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                found = conn.execute(
+                    f"SELECT id, attempts FROM jobs WHERE kind IN ({placeholders}) AND "
+                    "(status = 'queued' OR (status = 'running' AND lease_until < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (*kinds, now)
+                ).fetchone()
+                if found is None:
+                    conn.execute('COMMIT')
+                    return None
+                job_id, attempts = found
+                if attempts >= MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, seq = seq + 1, lease_owner = NULL, "
+                        "updated_at = ? WHERE id = ?",
+                        (f"Gave up after {attempts} attempts", _now(), job_id)
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, seq = seq + 1, "
+                    "lease_owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (owner, now + LEASE_SECONDS, _now(), job_id)
+                )
+                conn.execute('COMMIT')
+                return self._select(job_id)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _update(self, job_id: str, owner: str, assignments: str, params: Tuple) -> bool:
+        cursor = self.connection().execute(
+            f"UPDATE jobs SET {assignments}, seq = seq + 1, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (*params, _now(), job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def start_stage(self, job_id: str, owner: str, stage: str) -> bool:
+        return self._update(job_id, owner, "stage = ?, lease_until = ?", (stage, time.time() + LEASE_SECONDS))
+
+    def checkpoint(self, job_id: str, owner: str, stages_done: int, state: Any) -> bool:
+        """Record a finished stage; False if the lease was lost to another worker."""
+        return self._update(job_id, owner, "stages_done = ?, state = ?, lease_until = ?",
+                            (stages_done, json.dumps(state), time.time() + LEASE_SECONDS))
+
+    def finish(self, job_id: str, owner: str) -> bool:
+        return self._update(job_id, owner, "status = 'done', stage = NULL, lease_owner = NULL", ())
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        return self._update(job_id, owner, "status = 'failed', error = ?, lease_owner = NULL", (error,))
+
+    def release(self, owner: str) -> int:
+        """Put the owner's running jobs back in the queue, keeping their progress."""
+        cursor = self.connection().execute(
+            "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_until = NULL, "
+            "attempts = MAX(attempts - 1, 0), seq = seq + 1, updated_at = ? "
+            "WHERE lease_owner = ? AND status = 'running'",
+            (_now(), owner)
+        )
+        return cursor.rowcount
+
+    def prune(self, ttl: float = JOB_TTL) -> int:
+        """Delete finished and failed jobs that ended more than ``ttl`` seconds ago; returns how many."""
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ttl)).isoformat()
+        cursor = self.connection().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(self.connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+
+# A stage takes the job id, its payload and the state left by the previous stage, and returns the new state
+Stage = Callable[[str, Dict[str, Any], Any], Awaitable[Any]]
+
+
+class JobRunner:
+    """Worker coroutines that run queued jobs through their kind's stages."""
+
+    def __init__(self, queue: JobQueue, pipelines: Dict[str, List[Tuple[str, Stage]]], workers: int = 2):
+        self.queue = queue
+        self.pipelines = pipelines
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def start(self):
+        """Start the workers on the running event loop (no-op if already started there)."""
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._call(self.queue.release, self.owner)
+
+    async def _notify(self):
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def submit(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> Dict[str, Any]:
+        if kind not in self.pipelines:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        job = await self._call(self.queue.enqueue, kind, payload, len(self.pipelines[kind]), job_id)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.queue.get, job_id)
+
+    async def wait(self, job_id: str, since: int = -1, timeout: float = 30.0) -> Optional[Dict[str, Any]]:
+        """The job once its ``seq`` is past ``since`` or it has finished, or as it is after ``timeout``."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['seq'] > since or job['status'] in TERMINAL_STATUSES or remaining <= 0:
+                return job
+            if self._changed is None:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+                continue
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(self._changed.wait(), min(POLL_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        kinds = list(self.pipelines)
+        while True:
+            job = await self._call(self.queue.claim, self.owner, kinds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._notify()
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        stages = self.pipelines[job['kind']]
+        state = job['state']
+        try:
+            for index in range(job['stages_done'], len(stages)):
+                name, stage = stages[index]
+                if not await self._call(self.queue.start_stage, job['id'], self.owner, name):
+                    return
+                await self._notify()
+                state = await stage(job['id'], job['payload'], state)
+                if not await self._call(self.queue.checkpoint, job['id'], self.owner, index + 1, state):
+                    return
+                await self._notify()
+            await self._call(self.queue.finish, job['id'], self.owner)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._call(self.queue.fail, job['id'], self.owner, f"{type(e).__name__}: {e}")
+        await self._notify()
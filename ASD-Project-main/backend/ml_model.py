@@ -1,86 +1,277 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 import joblib
+import hashlib
 import os
 from pathlib import Path
 
+try:
+    from .compact_model import build_compact_forest, save_compact_model, load_compact_model, check_parity
+except ImportError:
+    from compact_model import build_compact_forest, save_compact_model, load_compact_model, check_parity
+
+try:
+    from .dataset import load_frame
+except ImportError:
+    from dataset import load_frame
+
+try:
+    from .calibration import CalibrationTable, calibrate_model, load_calibration, save_calibration, update_metrics_file
+except ImportError:
+    from calibration import CalibrationTable, calibrate_model, load_calibration, save_calibration, update_metrics_file
+
 MODELS_DIR = Path(__file__).parent / 'models'
 MODELS_DIR.mkdir(exist_ok=True)
 
 MODEL_PATH = MODELS_DIR / 'asd_classifier.pkl'
 SCALER_PATH = MODELS_DIR / 'scaler.pkl'
+COMPACT_MODEL_PATH = MODELS_DIR / 'asd_classifier_compact.npy'
+CALIBRATION_PATH = MODELS_DIR / 'calibration.json'
+METRICS_PATH = MODELS_DIR / 'questionnaire_metrics.json'
+DATASET_PATH = Path(__file__).parent / 'data' / 'Autism_Data_processed.csv'
+
+# Features: A1-A10 scores and demographic data, in model column order
+FEATURE_COLUMNS = [
+    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
+    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score',
+    'age', 'gender', 'ethnicity', 'jundice', 'austim'
+]
+
+# Names reported for each model feature in explanations (the API's field names)
+EXPLANATION_KEYS = (
+    'a1_score', 'a2_score', 'a3_score', 'a4_score', 'a5_score',
+    'a6_score', 'a7_score', 'a8_score', 'a9_score', 'a10_score',
+    'age', 'gender', 'ethnicity', 'jaundice', 'family_history'
+)
+
+# Per-answer contributions are added to every prediction unless EXPLAIN_PREDICTIONS=0
+EXPLAIN_PREDICTIONS = os.environ.get('EXPLAIN_PREDICTIONS', '1') != '0'
+
+# "auto" uses the compact model file when it was exported from the current .pkl,
+# "compact" requires it, and "sklearn" always uses the pickled estimator
+MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'auto').lower()
+
+# Loaded models shared by every prediction in this process. Loading them
+# before workers fork lets them share the same pages copy-on-write.
+_model_cache = {}
+
+def train_model(csv_path: str, models_dir=None, n_estimators: int = 100, max_depth: int = 10,
+                random_state: int = 42):
+    """Train the ASD classification model (into ``models_dir`` for a candidate version)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    df = load_frame(csv_path)
 
-def train_model(csv_path: str):
-    """Train the ASD classification model"""
-    df = pd.read_csv(csv_path)
-    
-    # Features: A1-A10 scores and demographic data
-    feature_columns = [
-        'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
-        'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score',
-        'age', 'gender', 'ethnicity', 'jundice', 'austim'
-    ]
-    
-    X = df[feature_columns]
+    X = df[FEATURE_COLUMNS]
     y = df['Class/ASD']
-    
+
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
+
     # Scale features
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
-    
+
     # Train Random Forest Classifier
-    model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=random_state)
     model.fit(X_train_scaled, y_train)
-    
+
     # Evaluate
     train_score = model.score(X_train_scaled, y_train)
     test_score = model.score(X_test_scaled, y_test)
-    
+
     print(f"Training Accuracy: {train_score:.4f}")
     print(f"Testing Accuracy: {test_score:.4f}")
-    
+
     # Save model and scaler
-    joblib.dump(model, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
-    
+    production = models_dir is None
+    models_dir = Path(models_dir) if models_dir is not None else MODELS_DIR
+    model_path, scaler_path = models_dir / MODEL_PATH.name, models_dir / SCALER_PATH.name
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    fingerprint = model_fingerprint(model_path, scaler_path)
+    if production:
+        _model_cache.clear()
+        _model_cache['default'] = (model, scaler)
+
+    # Save the compact copy used for inference, if it reproduces the model exactly
+    try:
+        forest = build_compact_forest(model, scaler, FEATURE_COLUMNS)
+        parity = check_parity(forest, model, scaler, X.to_numpy(dtype=np.float64))
+        if parity['ok'] and parity['predictions_match']:
+            forest.metadata['source_fingerprint'] = fingerprint
+            save_compact_model(forest, models_dir / COMPACT_MODEL_PATH.name)
+            print(f"Compact model saved: {models_dir / COMPACT_MODEL_PATH.name}")
+        else:
+            print(f"Compact model not saved, parity check failed: {parity}")
+    except ValueError as e:
+        print(f"Compact model not saved: {e}")
+
+    # Calibrate on out-of-fold training predictions, report curves on the test split
+    calibrator, report = calibrate_model(
+        model, X_train_scaled, y_train.to_numpy(), X_test_scaled, y_test.to_numpy()
+    )
+    calibrator.metadata['source_fingerprint'] = fingerprint
+    save_calibration(calibrator, models_dir / CALIBRATION_PATH.name)
+    update_metrics_file(models_dir / METRICS_PATH.name, report)
+    if production:
+        _model_cache['calibrator'] = calibrator
+    print(f"Calibration Brier score: {report['raw']['brier_score']:.4f} -> {report['calibrated']['brier_score']:.4f}")
+
     return model, scaler
 
 def load_model():
     """Load the trained model and scaler"""
     if not MODEL_PATH.exists() or not SCALER_PATH.exists():
         raise FileNotFoundError("Model not trained yet. Please train the model first.")
-    
+
     model = joblib.load(MODEL_PATH)
     scaler = joblib.load(SCALER_PATH)
     return model, scaler
 
-def predict_asd(features: dict):
-    """Make a prediction for ASD"""
-    model, scaler = load_model()
-    
-    # Create feature array in the correct order
-    feature_array = np.array([[
+def get_model():
+    """Return the cached model and scaler, loading them on first use"""
+    cached = _model_cache.get('default')
+    if cached is None:
+        cached = _model_cache['default'] = load_model()
+    return cached
+
+def model_fingerprint(model_path=None, scaler_path=None) -> str:
+    """SHA-256 of the pickled model and scaler, recorded in the compact model it was exported from"""
+    digest = hashlib.sha256()
+    for path in (model_path or MODEL_PATH, scaler_path or SCALER_PATH):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _load_current_compact_model():
+    """Load the compact model unless it is missing or was exported from different .pkl files"""
+    if not COMPACT_MODEL_PATH.exists() or not COMPACT_MODEL_PATH.with_suffix('.json').exists():
+        return None
+    forest = load_compact_model(COMPACT_MODEL_PATH)
+    if MODEL_PATH.exists() and SCALER_PATH.exists():
+        if forest.metadata.get('source_fingerprint') != model_fingerprint():
+            return None
+    return forest
+
+def get_compact_model():
+    """Return the cached memory-mapped compact model, or None if it should not be used"""
+    if MODEL_FORMAT == 'sklearn':
+        return None
+    if 'compact' not in _model_cache:
+        forest = _load_current_compact_model()
+        if forest is None and MODEL_FORMAT == 'compact':
+            raise FileNotFoundError(f"Compact model not found or stale: {COMPACT_MODEL_PATH}")
+        _model_cache['compact'] = forest
+    return _model_cache['compact']
+
+def warm_model():
+    """Load whichever model predictions will use (call before forking workers)"""
+    if get_compact_model() is None:
+        get_model()
+    get_calibrator()
+
+def get_explainer():
+    """Compact forest used for explanations; built in memory when predictions use the .pkl"""
+    compact = get_compact_model()
+    if compact is not None:
+        return compact
+    if 'explainer' not in _model_cache:
+        model, scaler = get_model()
+        try:
+            _model_cache['explainer'] = build_compact_forest(model, scaler, FEATURE_COLUMNS)
+        except ValueError:
+            _model_cache['explainer'] = None
+    return _model_cache['explainer']
+
+def get_calibrator():
+    """Return the cached calibration table (identity if missing or fitted for another model)"""
+    calibrator = _model_cache.get('calibrator')
+    if calibrator is None:
+        calibrator = CalibrationTable.identity()
+        if CALIBRATION_PATH.exists():
+            fitted = load_calibration(CALIBRATION_PATH)
+            if not MODEL_PATH.exists() or fitted.metadata.get('source_fingerprint') == model_fingerprint():
+                calibrator = fitted
+        _model_cache['calibrator'] = calibrator
+    return calibrator
+
+def clear_model_cache():
+    """Forget the loaded model so the next prediction reloads it from disk"""
+    _model_cache.clear()
+
+def _integral_rows(feature_array: np.ndarray) -> np.ndarray:
+    """Which rows the compact forest can take: its thresholds only hold for integer features"""
+    return (feature_array == np.floor(feature_array)).all(axis=-1)
+
+def predict_proba(feature_array: np.ndarray) -> np.ndarray:
+    """Probability of ASD for each row of raw (unscaled) features in FEATURE_COLUMNS order"""
+    compact = get_compact_model()
+    if compact is not None:
+        feature_array = np.asarray(feature_array, dtype=np.float64)
+        integral = _integral_rows(feature_array)
+        if integral.all():
+            return compact.predict_proba(feature_array)
+        # The compact thresholds only hold for integer features (e.g. not an age of 4.5):
+        # those rows go through the pickled model instead
+        probability = np.empty(len(integral))
+        if integral.any():
+            probability[integral] = compact.predict_proba(feature_array[integral])
+        model, scaler = get_model()
+        probability[~integral] = model.predict_proba(scaler.transform(feature_array[~integral]))[:, 1]
+        return probability
+    model, scaler = get_model()
+    return model.predict_proba(scaler.transform(feature_array))[:, 1]
+
+def features_to_array(features) -> np.ndarray:
+    """One row of raw features in FEATURE_COLUMNS order from a predict_asd feature dict
+
+    A (1, len(FEATURE_COLUMNS)) array, such as the one the API builds from a
+    validated request, is already in that form and is returned as is.
+    """
+    if isinstance(features, np.ndarray):
+        return features
+    return np.array([[
         features['a1_score'], features['a2_score'], features['a3_score'],
         features['a4_score'], features['a5_score'], features['a6_score'],
         features['a7_score'], features['a8_score'], features['a9_score'],
         features['a10_score'], features['age'], features['gender'],
         features['ethnicity'], features['jaundice'], features['austim']
-    ]])
-    
-    # Scale and predict
-    feature_scaled = scaler.transform(feature_array)
-    prediction = model.predict(feature_scaled)[0]
-    probability = model.predict_proba(feature_scaled)[0]
-    
-    return {
-        'prediction': int(prediction),
-        'probability': float(probability[1]),
-        'confidence': float(max(probability))
+    ]], dtype=np.float64)
+
+def prediction_result(probability: float, calibrator, explanation=None) -> dict:
+    """The dict predict_asd returns, from a probability and an optional CompactForest.explain result"""
+    result = {
+        'prediction': int(probability > 0.5),
+        'probability': probability,
+        'calibrated_probability': calibrator(probability),
+        'confidence': max(probability, 1.0 - probability)
     }
+    if explanation is not None:
+        _, base, contributions = explanation
+        result['base_probability'] = base
+        result['feature_contributions'] = dict(zip(EXPLANATION_KEYS, contributions[0].tolist()))
+    return result
+
+def predict_asd(features):
+    """Make a prediction for ASD from a feature dict or a row from features_to_array"""
+    # Create feature array in the correct order
+    feature_array = features_to_array(features)
+
+    # Non-integer features (e.g. an age of 4.5) are predicted by the pickled model, unexplained
+    explanation = None
+    if EXPLAIN_PREDICTIONS and _integral_rows(feature_array).all():
+        explainer = get_explainer()
+        if explainer is not None:
+            explanation = explainer.explain(feature_array)
+
+    # Scale and predict (the compact model's explanation already includes the prediction)
+    if explanation is not None and get_compact_model() is not None:
+        probability = float(explanation[0][0])
+    else:
+        probability = float(predict_proba(feature_array)[0])
+
+    return prediction_result(probability, get_calibrator(), explanation)
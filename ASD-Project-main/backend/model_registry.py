@@ -0,0 +1,403 @@
+"""
+Versioned model store, A/B routing and shadow inference.
+
+Production keeps using the model files in ``backend/models/``. Other versions
+live in ``backend/models/versions/<name>/`` with the same file names (the
+compact forest is required, the .pkl files are kept for retraining) plus a
+``manifest.json``:
+
+    python -m backend.model_registry train v2 --n-estimators 200   # train a candidate
+    python -m backend.model_registry snapshot                      # archive production as a version
+    python -m backend.model_registry list
+
+Routing is configured per deployment:
+
+    CANDIDATE_MODEL_VERSION   version under evaluation (unset: production only)
+    CANDIDATE_TRAFFIC         share of assessments answered by the candidate (A/B), default 0
+    SHADOW_TRAFFIC            share of the remaining assessments also scored by the candidate
+                              in a background thread, default 1
+
+Routing hashes the assessment id, so the same id always takes the same path.
+Every result records the version that produced it and its inference time;
+``ComparisonStats`` aggregates served latency per version and, for shadowed
+assessments, how often the candidate agrees with production.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from . import ml_model
+    from .calibration import CalibrationTable, load_calibration
+    from .compact_model import load_compact_model
+    from .dataset import feature_matrix
+except ImportError:
+    import ml_model
+    from calibration import CalibrationTable, load_calibration
+    from compact_model import load_compact_model
+    from dataset import feature_matrix
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = ml_model.MODELS_DIR / 'versions'
+MANIFEST_NAME = 'manifest.json'
+VERSION_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+
+# Latency samples kept per version for percentiles
+LATENCY_WINDOW = 2048
+
+
+def _bucket(assessment_id: str, salt: str) -> float:
+    """Stable position of an id in [0, 1) for a given routing decision."""
+    digest = hashlib.sha256(f'{salt}:{assessment_id}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def production_version_name() -> str:
+    """Name recorded for predictions from the model files in ``backend/models/``."""
+    return f"production@{ml_model.model_fingerprint()[:12]}"
+
+
+def version_dir(name: str) -> Path:
+    if not VERSION_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid model version name: {name!r}")
+    return VERSIONS_DIR / name
+
+
+def list_versions() -> List[Dict[str, Any]]:
+    """Manifests of all stored versions, oldest first."""
+    manifests = []
+    if VERSIONS_DIR.exists():
+        for manifest_path in VERSIONS_DIR.glob(f'*/{MANIFEST_NAME}'):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda manifest: manifest.get('created_at', ''))
+
+
+class ModelVersion:
+    """One servable model; ``predict`` takes and returns the same as ``ml_model.predict_asd``."""
+
+    def __init__(self, name: str, predict: Callable[[Any], dict], warm: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self._predict = predict
+        self._warm = warm
+
+    @classmethod
+    def production(cls) -> 'ModelVersion':
+        return cls(production_version_name(), ml_model.predict_asd, ml_model.warm_model)
+
+    @classmethod
+    def from_directory(cls, name: str, directory: Optional[Path] = None) -> 'ModelVersion':
+        """Serve a stored version from its compact forest and calibration table."""
+        directory = Path(directory) if directory is not None else version_dir(name)
+        state = {}
+
+        def load():
+            if 'forest' not in state:
+                forest = load_compact_model(directory / ml_model.COMPACT_MODEL_PATH.name)
+                calibration_path = directory / ml_model.CALIBRATION_PATH.name
+                calibrator = CalibrationTable.identity()
+                if calibration_path.exists():
+                    fitted = load_calibration(calibration_path)
+                    if fitted.metadata.get('source_fingerprint') == forest.metadata.get('source_fingerprint'):
+                        calibrator = fitted
+                state['forest'], state['calibrator'] = forest, calibrator
+            return state['forest'], state['calibrator']
+
+        def predict(features) -> dict:
+            forest, calibrator = load()
+            feature_array = ml_model.features_to_array(features)
+            if ml_model.EXPLAIN_PREDICTIONS:
+                explanation = forest.explain(feature_array)
+                return ml_model.prediction_result(float(explanation[0][0]), calibrator, explanation)
+            return ml_model.prediction_result(float(forest.predict_proba(feature_array)[0]), calibrator)
+
+        return cls(name, predict, load)
+
+    def warm(self):
+        if self._warm is not None:
+            self._warm()
+
+    def timed_predict(self, features) -> Tuple[dict, float]:
+        """Prediction and its wall-clock inference time in milliseconds."""
+        start = time.perf_counter()
+        result = self._predict(features)
+        return result, (time.perf_counter() - start) * 1000.0
+
+
+class _LatencyWindow:
+    __slots__ = ('count', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, milliseconds: float):
+        self.count += 1
+        self.samples.append(milliseconds)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {'count': self.count}
+        samples = np.fromiter(self.samples, dtype=np.float64)
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {'count': self.count, 'mean_ms': float(samples.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95)}
+
+
+class ComparisonStats:
+    """Thread-safe aggregates of served latency and production/candidate agreement."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._served: Dict[str, _LatencyWindow] = {}
+        self._shadow_latency: Dict[str, _LatencyWindow] = {}
+        self._compared = 0
+        self._prediction_agreements = 0
+        self._risk_level_agreements = 0
+        self._abs_difference_total = 0.0
+        self._abs_difference_max = 0.0
+        self._shadow_errors = 0
+
+    def record_served(self, version: str, milliseconds: float):
+        with self._lock:
+            self._served.setdefault(version, _LatencyWindow()).add(milliseconds)
+
+    def record_shadow(self, version: str, milliseconds: float, primary: dict, shadow: dict,
+                      primary_risk_level: str, shadow_risk_level: str):
+        difference = abs(primary['calibrated_probability'] - shadow['calibrated_probability'])
+        with self._lock:
+            self._shadow_latency.setdefault(version, _LatencyWindow()).add(milliseconds)
+            self._compared += 1
+            self._prediction_agreements += primary['prediction'] == shadow['prediction']
+            self._risk_level_agreements += primary_risk_level == shadow_risk_level
+            self._abs_difference_total += difference
+            self._abs_difference_max = max(self._abs_difference_max, difference)
+
+    def record_shadow_error(self):
+        with self._lock:
+            self._shadow_errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            compared = self._compared
+            return {
+                'served': {version: window.summary() for version, window in self._served.items()},
+                'shadow': {
+                    'compared': compared,
+                    'errors': self._shadow_errors,
+                    'prediction_agreement': self._prediction_agreements / compared if compared else None,
+                    'risk_level_agreement': self._risk_level_agreements / compared if compared else None,
+                    'mean_abs_probability_difference': self._abs_difference_total / compared if compared else None,
+                    'max_abs_probability_difference': self._abs_difference_max if compared else None,
+                    'latency': {version: window.summary() for version, window in self._shadow_latency.items()},
+                },
+            }
+
+
+class ModelRouter:
+    """Chooses the model for each assessment and runs shadow predictions off the request path."""
+
+    def __init__(self, production: ModelVersion, candidate: Optional[ModelVersion] = None,
+                 candidate_traffic: float = 0.0, shadow_traffic: float = 1.0):
+        for name, share in (('CANDIDATE_TRAFFIC', candidate_traffic), ('SHADOW_TRAFFIC', shadow_traffic)):
+            if not 0.0 <= share <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1, got {share}")
+        self.production = production
+        self.candidate = candidate
+        self.candidate_traffic = candidate_traffic if candidate is not None else 0.0
+        self.shadow_traffic = shadow_traffic if candidate is not None else 0.0
+        self.stats = ComparisonStats()
+        self._pending = set()
+
+    def warm(self):
+        self.production.warm()
+        if self.candidate is not None:
+            self.candidate.warm()
+
+    def route(self, assessment_id: str) -> Tuple[ModelVersion, Optional[ModelVersion]]:
+        """(model that answers, model that shadows it or None) for an assessment id."""
+        if self.candidate is None:
+            return self.production, None
+        if _bucket(assessment_id, 'ab') < self.candidate_traffic:
+            return self.candidate, None
+        if _bucket(assessment_id, 'shadow') < self.shadow_traffic:
+            return self.production, self.candidate
+        return self.production, None
+
+    def predict(self, assessment_id: str, features) -> Tuple[dict, ModelVersion, float, Optional[ModelVersion]]:
+        served, shadow = self.route(assessment_id)
+        result, milliseconds = served.timed_predict(features)
+        self.stats.record_served(served.name, milliseconds)
+        return result, served, milliseconds, shadow
+
+    def _run_shadow(self, shadow: ModelVersion, features, primary: dict,
+                    risk_level: Callable[[float], str]):
+        try:
+            result, milliseconds = shadow.timed_predict(features)
+            self.stats.record_shadow(
+                shadow.name, milliseconds, primary, result,
+                risk_level(primary['calibrated_probability']), risk_level(result['calibrated_probability'])
+            )
+        except Exception as e:
+            self.stats.record_shadow_error()
+            logger.warning(f"Shadow prediction with {shadow.name} failed: {type(e).__name__}: {e}")
+
+    def submit_shadow(self, shadow: ModelVersion, features, primary: dict,
+                      risk_level: Callable[[float], str]) -> asyncio.Future:
+        """Score ``features`` with ``shadow`` in the default executor; the caller does not wait."""
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self._run_shadow, shadow, features, primary, risk_level
+        )
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    async def drain(self):
+        """Wait for shadow predictions still running (used on shutdown and in tests)."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'production': self.production.name,
+            'candidate': self.candidate.name if self.candidate is not None else None,
+            'candidate_traffic': self.candidate_traffic,
+            'shadow_traffic': self.shadow_traffic,
+            'comparison': self.stats.snapshot(),
+        }
+
+
+def create_model_router() -> ModelRouter:
+    """Build the router from CANDIDATE_MODEL_VERSION / CANDIDATE_TRAFFIC / SHADOW_TRAFFIC."""
+    candidate_name = os.environ.get('CANDIDATE_MODEL_VERSION', '').strip()
+    candidate = None
+    if candidate_name:
+        directory = version_dir(candidate_name)
+        if not (directory / ml_model.COMPACT_MODEL_PATH.name).exists():
+            raise FileNotFoundError(f"Model version {candidate_name!r} not found in {VERSIONS_DIR}")
+        candidate = ModelVersion.from_directory(candidate_name, directory)
+    return ModelRouter(
+        ModelVersion.production(),
+        candidate,
+        candidate_traffic=float(os.environ.get('CANDIDATE_TRAFFIC', '0')),
+        shadow_traffic=float(os.environ.get('SHADOW_TRAFFIC', '1')),
+    )
+
+
+_router_cache = {}
+
+
+def get_model_router() -> ModelRouter:
+    """Process-wide router, created on first use."""
+    router = _router_cache.get('router')
+    if router is None:
+        router = _router_cache['router'] = create_model_router()
+    return router
+
+
+def _test_accuracy(forest, csv_path) -> float:
+    """Accuracy on the same held-out split that train_model uses."""
+    from sklearn.model_selection import train_test_split
+
+    X, y = feature_matrix(csv_path, ml_model.FEATURE_COLUMNS)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return float(np.mean((forest.predict_proba(X_test) > 0.5).astype(int) == y_test))
+
+
+def _write_manifest(directory: Path, name: str, source: str, csv_path=None,
+                    params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    forest = load_compact_model(directory / ml_model.COMPACT_MODEL_PATH.name)
+    csv_path = Path(csv_path or ml_model.DATASET_PATH)
+    manifest = {
+        'version': name,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'source': source,
+        'source_fingerprint': forest.metadata.get('source_fingerprint'),
+        'params': params or {},
+        'test_accuracy': _test_accuracy(forest, csv_path) if csv_path.exists() else None,
+    }
+    with open(directory / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def snapshot_production(name: Optional[str] = None) -> Dict[str, Any]:
+    """Copy the production model files into a new version directory."""
+    name = name or production_version_name().replace('@', '-')
+    directory = version_dir(name)
+    if directory.exists():
+        raise FileExistsError(f"Model version {name!r} already exists")
+    if not ml_model.COMPACT_MODEL_PATH.exists():
+        raise FileNotFoundError("Production has no compact model; run python -m backend.compact_model first")
+    directory.mkdir(parents=True)
+    for path in (ml_model.MODEL_PATH, ml_model.SCALER_PATH, ml_model.COMPACT_MODEL_PATH,
+                 ml_model.COMPACT_MODEL_PATH.with_suffix('.json'), ml_model.CALIBRATION_PATH):
+        if path.exists():
+            shutil.copy2(path, directory / path.name)
+    return _write_manifest(directory, name, 'snapshot')
+
+
+def train_version(name: str, csv_path: Optional[str] = None, **params) -> Dict[str, Any]:
+    """Train a candidate into its own version directory; production files are untouched."""
+    directory = version_dir(name)
+    if directory.exists():
+        raise FileExistsError(f"Model version {name!r} already exists")
+    # Train next to the version directory and move it into place, so a failed run leaves nothing behind
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f'.{name}.', suffix='.tmp', dir=VERSIONS_DIR))
+    try:
+        csv_path = str(csv_path or ml_model.DATASET_PATH)
+        ml_model.train_model(csv_path, models_dir=staging, **params)
+        manifest = _write_manifest(staging, name, 'train', csv_path, params)
+        os.replace(staging, directory)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging, ignore_errors=True)
+    return manifest
+
+
+def main(argv: Optional[list] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage stored model versions")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="List stored versions")
+    snapshot = commands.add_parser('snapshot', help="Archive the production model as a version")
+    snapshot.add_argument('name', nargs='?')
+    train = commands.add_parser('train', help="Train a candidate version")
+    train.add_argument('name')
+    train.add_argument('--csv', default=str(ml_model.DATASET_PATH))
+    train.add_argument('--n-estimators', type=int, default=100)
+    train.add_argument('--max-depth', type=int, default=10)
+    train.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        print(f"production: {production_version_name()}")
+        for manifest in list_versions():
+            accuracy = manifest.get('test_accuracy')
+            accuracy = f"{accuracy:.4f}" if accuracy is not None else 'n/a'
+            print(f"{manifest['version']}: {manifest['source']} {manifest['created_at']} test accuracy {accuracy}")
+    elif args.command == 'snapshot':
+        print(json.dumps(snapshot_production(args.name), indent=2))
+    else:
+        print(json.dumps(train_version(args.name, args.csv, n_estimators=args.n_estimators,
+                                       max_depth=args.max_depth, random_state=args.random_state), indent=2))
+
+
+if __name__ == '__main__':
+    main()
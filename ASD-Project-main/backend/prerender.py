@@ -0,0 +1,147 @@
+"""
+Background prerendering of PDF reports.
+
+Most users download the report right after creating an assessment. With
+``REPORT_PRERENDER=1``, ``Prerenderer.submit`` queues the rendering as soon
+as the assessment is saved, so the PDF is usually on disk by the time
+``GET /api/assessments/{id}/report`` is called. Reports are rendered in a
+dedicated pool of ``PRERENDER_WORKERS`` threads (default 1), so on-demand
+renders in the default executor are never stuck behind a burst of
+prerenders. At most ``PRERENDER_MAX_PENDING`` reports (default 32) are queued
+or rendering. Past that, new ones are dropped and rendered on demand as
+before.
+
+Prerenders go through the same ``SingleFlight`` as downloads. A download
+that arrives mid-render waits for that render instead of starting a second
+one. ``snapshot`` reports how first downloads were served: ``hits`` (the
+prerendered file was ready), ``joined`` (waited for a prerender still
+running) and ``misses`` (rendered on demand).
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+try:
+    from .single_flight import SingleFlight
+except ImportError:
+    from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PRERENDER_ENABLED = os.environ.get('REPORT_PRERENDER', '0') == '1'
+PRERENDER_WORKERS = int(os.environ.get('PRERENDER_WORKERS', '1'))
+PRERENDER_MAX_PENDING = int(os.environ.get('PRERENDER_MAX_PENDING', '32'))
+# Prerendered reports remembered until their first download, for the hit rate
+PRERENDER_TRACKED = 4096
+
+# Renders one report: (assessment, assessment_id) -> path of the PDF
+Render = Callable[[dict, str], Path]
+
+
+class Prerenderer:
+    """Bounded background rendering of new reports, with hit-rate counters."""
+
+    def __init__(self, render: Render, flight: SingleFlight, workers: int = PRERENDER_WORKERS,
+                 max_pending: int = PRERENDER_MAX_PENDING, enabled: bool = PRERENDER_ENABLED):
+        self.render = render
+        self.flight = flight
+        self.workers = workers
+        self.max_pending = max_pending
+        self.enabled = enabled and workers > 0 and max_pending > 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._pending: Set[str] = set()
+        # Rendered and not downloaded yet
+        self._ready: 'OrderedDict[str, None]' = OrderedDict()
+        # Downloaded while the prerender was still running
+        self._joined: Set[str] = set()
+        self.submitted = 0
+        self.dropped = 0
+        self.rendered = 0
+        self.failed = 0
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+
+    def submit(self, assessment_id: str, assessment: dict) -> bool:
+        """Queue a render without waiting; False when disabled, already queued or the queue is full."""
+        if not self.enabled or assessment_id in self._pending:
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prerender')
+        self.submitted += 1
+        self._pending.add(assessment_id)
+        task = asyncio.get_running_loop().create_task(self._prerender(assessment_id, assessment))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _prerender(self, assessment_id: str, assessment: dict):
+        async def render():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.render, assessment, assessment_id)
+        try:
+            await self.flight.do(assessment_id, render)
+            self.rendered += 1
+            if assessment_id not in self._joined:
+                self._ready[assessment_id] = None
+                while len(self._ready) > PRERENDER_TRACKED:
+                    self._ready.popitem(last=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Prerendering report {assessment_id} failed: {type(e).__name__}: {e}")
+        finally:
+            self._pending.discard(assessment_id)
+            self._joined.discard(assessment_id)
+
+    # Download outcomes
+
+    def record_ready(self, assessment_id: str):
+        """A download found the report on disk (a hit if it is the first one after a prerender)."""
+        if assessment_id in self._ready:
+            del self._ready[assessment_id]
+            self.hits += 1
+
+    def record_render(self, assessment_id: str):
+        """A download is about to wait for a rendering: a prerender still running, or its own."""
+        if assessment_id in self._pending:
+            self.joined += 1
+            self._joined.add(assessment_id)
+        else:
+            self.misses += 1
+
+    async def stop(self):
+        """Cancel queued prerenders; renders already running finish in the background."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        downloads = self.hits + self.joined + self.misses
+        return {
+            'enabled': self.enabled,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': len(self._pending),
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'hits': self.hits,
+            'joined': self.joined,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.joined) / downloads if downloads else None,
+        }
@@ -1,158 +1,51 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab.lib.enums import TA_LEFT
 from datetime import datetime
 from pathlib import Path
-import os
+
+# Handle imports for both module and direct script execution
+try:
+    from .report_i18n import DEFAULT_LOCALE, get_report_locale
+except ImportError:
+    from report_i18n import DEFAULT_LOCALE, get_report_locale
 
 REPORTS_DIR = Path(__file__).parent / 'reports'
 REPORTS_DIR.mkdir(exist_ok=True)
 
-def get_recommendations(risk_level: str, behavioral_data: dict, demographic_data: dict):
+# Number of features listed in the "what drove this score" table
+TOP_CONTRIBUTIONS = 8
+
+def _contribution_label(key: str, report_locale) -> str:
+    if key in report_locale.demographic_labels:
+        return report_locale.demographic_labels[key]
+    q_num, label = report_locale.question_labels()[int(key[1:-len('_score')]) - 1]
+    return f"{q_num} {label}"
+
+def _contribution_bar(contribution: float, largest: float, width: float = 2.2*inch, height: float = 10):
+    """Horizontal bar centred on zero: red raises the ASD probability, green lowers it"""
+    from reportlab.graphics.shapes import Drawing, Line, Rect
+
+    drawing = Drawing(width, height)
+    half = width / 2
+    length = half * abs(contribution) / largest if largest > 0 else 0
+    x = half if contribution >= 0 else half - length
+    fill = colors.HexColor('#C0392B') if contribution >= 0 else colors.HexColor('#2E8B57')
+    drawing.add(Rect(x, 1, length, height - 2, fillColor=fill, strokeColor=None))
+    drawing.add(Line(half, 0, half, height, strokeColor=colors.grey))
+    return drawing
+
+def get_recommendations(risk_level: str, behavioral_data: dict, demographic_data: dict,
+                        locale: str = DEFAULT_LOCALE):
     """Generate comprehensive recommendations based on assessment results"""
-    
-    age = demographic_data.get('age', 0)
-    
-    # Base recommendations structure
-    recommendations = {
-        'medical': [],
-        'therapy': [],
-        'yoga': [],
-        'lifestyle': [],
-        'nutrition': []
-    }
-    
-    if risk_level == "High":
-        recommendations['medical'] = [
-            "Consult with a developmental pediatrician or child psychiatrist for comprehensive evaluation",
-            "Consider Applied Behavior Analysis (ABA) therapy - evidence-based intervention",
-            "Discuss medication options with psychiatrist if co-occurring conditions exist (anxiety, ADHD, sleep issues)",
-            "Medications may include: Risperidone or Aripiprazole for irritability (FDA approved for ASD)",
-            "Melatonin supplements for sleep regulation (consult doctor for dosage)",
-            "Regular monitoring and follow-ups every 3-6 months"
-        ]
-        
-        recommendations['therapy'] = [
-            "Applied Behavior Analysis (ABA): 20-40 hours per week recommended",
-            "Speech and Language Therapy: Focus on communication skills and social pragmatics",
-            "Occupational Therapy: Address sensory processing and fine motor skills",
-            "Social Skills Training: Group sessions for peer interaction",
-            "Cognitive Behavioral Therapy (CBT): For managing anxiety and emotional regulation",
-            "Parent training programs: PCIT (Parent-Child Interaction Therapy) or similar"
-        ]
-        
-        recommendations['yoga'] = [
-            "Child's Pose (Balasana): Calming effect, reduces anxiety - 2 minutes daily",
-            "Tree Pose (Vrksasana): Improves balance and focus - 1 minute each leg",
-            "Cat-Cow Stretch (Marjaryasana-Bitilasana): Body awareness and coordination - 5 repetitions",
-            "Butterfly Pose (Baddha Konasana): Hip opening and calming - 2 minutes",
-            "Deep Breathing (Pranayama): 5-10 minutes daily for emotional regulation",
-            "Progressive Muscle Relaxation: Before bedtime for better sleep"
-        ]
-        
-        recommendations['lifestyle'] = [
-            "Establish consistent daily routines with visual schedules",
-            "Create a sensory-friendly environment at home (quiet spaces, soft lighting)",
-            "Limit screen time to 1-2 hours daily with educational content",
-            "Encourage physical activity: 60 minutes daily (swimming, cycling, dancing)",
-            "Use social stories to prepare for new situations or transitions",
-            "Implement positive reinforcement strategies consistently"
-        ]
-        
-        recommendations['nutrition'] = [
-            "Gluten-free, casein-free diet (GFCF) - consult nutritionist before starting",
-            "Omega-3 fatty acids: Fish oil supplements (500-1000mg daily)",
-            "Probiotic-rich foods: Yogurt, kefir for gut health",
-            "Avoid artificial colors, preservatives, and high-sugar foods",
-            "Ensure adequate vitamin D (sunlight exposure or supplements)",
-            "Zinc and magnesium supplements if deficient (blood test recommended)"
-        ]
-    
-    elif risk_level == "Moderate":
-        recommendations['medical'] = [
-            "Schedule evaluation with developmental pediatrician within 3 months",
-            "Consider Early Intervention Program (EIP) referral if under 3 years old",
-            "Monitor developmental milestones closely",
-            "Discuss preventive strategies with healthcare provider",
-            "Annual comprehensive developmental screening recommended"
-        ]
-        
-        recommendations['therapy'] = [
-            "Speech therapy if communication delays are present",
-            "Occupational therapy for sensory sensitivities (2-3 sessions/week)",
-            "Play-based therapy for social skill development",
-            "Parent coaching sessions to learn supportive strategies",
-            "Social skills groups (once weekly)"
-        ]
-        
-        recommendations['yoga'] = [
-            "Mountain Pose (Tadasana): Grounding and focus - 1 minute",
-            "Warrior Pose (Virabhadrasana): Strength and confidence - 30 seconds each side",
-            "Bridge Pose (Setu Bandhasana): Calming and energizing - 1 minute",
-            "Seated Forward Bend (Paschimottanasana): Relaxation - 1-2 minutes",
-            "Breathing exercises: 5 minutes daily"
-        ]
-        
-        recommendations['lifestyle'] = [
-            "Maintain predictable routines with some flexibility",
-            "Encourage social play dates in structured settings",
-            "Practice turn-taking and sharing through games",
-            "Limit sensory overload in busy environments",
-            "Use visual supports for daily activities",
-            "Promote physical activities: team sports or group classes"
-        ]
-        
-        recommendations['nutrition'] = [
-            "Balanced diet with plenty of fruits and vegetables",
-            "Omega-3 rich foods: Salmon, walnuts, flaxseeds",
-            "Limit processed foods and added sugars",
-            "Ensure adequate hydration throughout the day",
-            "Consider multivitamin if dietary intake is limited"
-        ]
-    
-    else:  # Low risk
-        recommendations['medical'] = [
-            "Continue regular pediatric check-ups",
-            "Monitor developmental milestones per age guidelines",
-            "Stay informed about developmental health",
-            "Consult healthcare provider if new concerns arise"
-        ]
-        
-        recommendations['therapy'] = [
-            "No specific interventions required currently",
-            "Consider enrichment activities for overall development",
-            "Encourage social interaction through playgroups or activities"
-        ]
-        
-        recommendations['yoga'] = [
-            "General yoga practice for wellness (10-15 minutes daily)",
-            "Sun Salutation (Surya Namaskar): Morning routine",
-            "Simple breathing exercises for stress management",
-            "Mindfulness activities: 5 minutes daily"
-        ]
-        
-        recommendations['lifestyle'] = [
-            "Maintain healthy sleep schedule (9-11 hours for children)",
-            "Encourage diverse social interactions",
-            "Promote physical activity and outdoor play",
-            "Limit screen time according to age-appropriate guidelines",
-            "Foster creative expression through arts and music"
-        ]
-        
-        recommendations['nutrition'] = [
-            "Follow balanced, nutritious diet",
-            "Encourage variety in food choices",
-            "Limit junk food and sugary beverages",
-            "Promote healthy eating habits and family meals"
-        ]
-    
-    return recommendations
+    # Medical, therapy, yoga, lifestyle and nutrition lists from the locale's catalog
+    return get_report_locale(locale).recommendations_for(risk_level)
 
-def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path: str = None):
-    """Generate comprehensive PDF report for assessment"""
+def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path: str = None,
+                        locale: str = DEFAULT_LOCALE):
+    """Generate comprehensive PDF report for assessment in ``locale`` (en, hi or mr)"""
     
     if output_path is None:
         output_path = REPORTS_DIR / f"assessment_{assessment_id}.pdf"
@@ -160,6 +53,9 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
     # Ensure output directory exists
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     
+    # Text, fonts and styles are loaded once per language and process
+    loc = get_report_locale(locale)
+    
     # Validate and extract assessment data with defaults
     risk_level = assessment_data.get('risk_level', 'Unknown')
     probability = float(assessment_data.get('probability', 0.0))
@@ -198,58 +94,24 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
     # Container for the 'Flowable' objects
     elements = []
     
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#0F5A5C'),
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#0F5A5C'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName='Helvetica-Bold'
-    )
-    
-    subheading_style = ParagraphStyle(
-        'CustomSubHeading',
-        parent=styles['Heading3'],
-        fontSize=13,
-        textColor=colors.HexColor('#0F5A5C'),
-        spaceAfter=8,
-        spaceBefore=8,
-        fontName='Helvetica-Bold'
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        leading=16,
-        alignment=TA_JUSTIFY
-    )
+    # Styles
+    title_style = loc.styles['title']
+    heading_style = loc.styles['heading']
+    subheading_style = loc.styles['subheading']
+    normal_style = loc.styles['normal']
     
     # Title
-    elements.append(Paragraph("ASD SCREENING ASSESSMENT REPORT", title_style))
+    elements.append(Paragraph(loc.t('title'), title_style))
     elements.append(Spacer(1, 12))
     
     # Report Info with Name and Image
-    report_date = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-    elements.append(Paragraph(f"<b>Report Generated:</b> {report_date}", normal_style))
-    elements.append(Paragraph(f"<b>Assessment ID:</b> {assessment_id}", normal_style))
+    report_date = datetime.now().strftime(loc.date_format)
+    elements.append(Paragraph(f"<b>{loc.t('report_generated')}</b> {report_date}", normal_style))
+    elements.append(Paragraph(f"<b>{loc.t('assessment_id')}</b> {assessment_id}", normal_style))
     
     # Add name if available
     if demographic.get('name'):
-        elements.append(Paragraph(f"<b>Subject Name:</b> {demographic['name']}", normal_style))
+        elements.append(Paragraph(f"<b>{loc.t('subject_name')}</b> {demographic['name']}", normal_style))
     
     elements.append(Spacer(1, 15))
     
@@ -276,13 +138,18 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
     
     risk_color = colors.green if risk_level_str == "Low" else (colors.orange if risk_level_str == "Moderate" else colors.red)
     
-    elements.append(Paragraph("ASSESSMENT RESULTS", heading_style))
+    elements.append(Paragraph(loc.t('results_heading'), heading_style))
     
     summary_data = [
-        ['Risk Level:', f"{risk_level_str}"],
-        ['ASD Probability:', f"{probability_pct:.1f}%"],
-        ['Model Confidence:', f"{confidence_pct:.1f}%"]
+        [loc.cell(loc.t('risk_level'), 12, bold=True), loc.cell(loc.risk_level(risk_level_str), 12)],
+        [loc.cell(loc.t('asd_probability'), 12, bold=True), f"{probability_pct:.1f}%"],
+        [loc.cell(loc.t('model_confidence'), 12, bold=True), f"{confidence_pct:.1f}%"]
     ]
+    calibrated_probability = assessment_data.get('calibrated_probability')
+    if calibrated_probability is not None:
+        summary_data.insert(2, [
+            loc.cell(loc.t('calibrated_probability'), 12, bold=True), f"{float(calibrated_probability) * 100:.1f}%"
+        ])
     
     summary_table = Table(summary_data, colWidths=[2*inch, 3*inch])
     summary_table.setStyle(TableStyle([
@@ -290,8 +157,8 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
         ('BACKGROUND', (1, 0), (1, -1), colors.white),
         ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTNAME', (0, 0), (0, -1), loc.bold_font),
+        ('FONTNAME', (1, 0), (1, -1), loc.font),
         ('FONTSIZE', (0, 0), (-1, -1), 12),
         ('GRID', (0, 0), (-1, -1), 1, colors.grey),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
@@ -302,24 +169,26 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
     elements.append(Spacer(1, 20))
     
     # Demographic Information
-    elements.append(Paragraph("DEMOGRAPHIC INFORMATION", heading_style))
-    demo_data = [
-        ['Name:', str(demographic.get('name', 'Not provided'))],
-        ['Age:', f"{demographic['age']} years"],
-        ['Gender:', 'Male' if demographic['gender'] == 0 else 'Female'],
-        ['Country:', str(demographic['country'])],
-        ['Jaundice at Birth:', 'Yes' if demographic['jaundice'] == 1 else 'No'],
-        ['Family History of ASD:', 'Yes' if demographic['family_history'] == 1 else 'No'],
-        ['Respondent:', str(demographic['respondent'])]
+    elements.append(Paragraph(loc.t('demographic_heading'), heading_style))
+    yes, no = loc.t('yes'), loc.t('no')
+    demo_rows = [
+        ('name', str(demographic.get('name', loc.t('not_provided')))),
+        ('age', loc.t('age_value', age=demographic['age'])),
+        ('gender', loc.t('male') if demographic['gender'] == 0 else loc.t('female')),
+        ('country', str(demographic['country'])),
+        ('jaundice', yes if demographic['jaundice'] == 1 else no),
+        ('family_history', yes if demographic['family_history'] == 1 else no),
+        ('respondent', loc.respondent(str(demographic['respondent'])))
     ]
+    demo_data = [[loc.cell(loc.t(key), 10, bold=True), loc.cell(value, 10)] for key, value in demo_rows]
     
     demo_table = Table(demo_data, colWidths=[2.5*inch, 2.5*inch])
     demo_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F5F5F4')),
         ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTNAME', (0, 0), (0, -1), loc.bold_font),
+        ('FONTNAME', (1, 0), (1, -1), loc.font),
         ('FONTSIZE', (0, 0), (-1, -1), 10),
         ('GRID', (0, 0), (-1, -1), 1, colors.grey),
         ('TOPPADDING', (0, 0), (-1, -1), 8),
@@ -329,35 +198,24 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
     elements.append(Spacer(1, 20))
     
     # Behavioral Assessment
-    elements.append(Paragraph("BEHAVIORAL ASSESSMENT (AQ-10)", heading_style))
+    elements.append(Paragraph(loc.t('behavioral_heading'), heading_style))
     behavioral = assessment_data['behavioral']
     
-    questions_labels = [
-        ('Q1', 'Sensory Awareness'),
-        ('Q2', 'Attention to Detail'),
-        ('Q3', 'Social Attention'),
-        ('Q4', 'Attention Switching'),
-        ('Q5', 'Cognitive Flexibility'),
-        ('Q6', 'Communication'),
-        ('Q7', 'Social Awareness'),
-        ('Q8', 'Social Imagination'),
-        ('Q9', 'Pattern Interests'),
-        ('Q10', 'Social Intuition')
-    ]
-    
-    behavioral_data = [['Question', 'Domain', 'Response']]
-    for i, (q_num, label) in enumerate(questions_labels, 1):
+    behavioral_data = [[
+        loc.cell(loc.t(key), 9, bold=True, color=colors.white) for key in ('question', 'domain', 'response')
+    ]]
+    for i, (q_num, label) in enumerate(loc.question_labels(), 1):
         score_key = f'a{i}_score'
-        response = 'Yes' if behavioral[score_key] == 1 else 'No'
-        behavioral_data.append([q_num, label, response])
+        response = yes if behavioral[score_key] == 1 else no
+        behavioral_data.append([q_num, loc.cell(label, 9), loc.cell(response, 9)])
     
     behavioral_table = Table(behavioral_data, colWidths=[0.8*inch, 2.5*inch, 1.2*inch])
     behavioral_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0F5A5C')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTNAME', (0, 0), (-1, 0), loc.bold_font),
+        ('FONTNAME', (0, 1), (-1, -1), loc.font),
         ('FONTSIZE', (0, 0), (-1, -1), 9),
         ('GRID', (0, 0), (-1, -1), 1, colors.grey),
         ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F4')]),
@@ -365,77 +223,74 @@ def generate_pdf_report(assessment_id: str, assessment_data: dict, output_path:
         ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
     ]))
     elements.append(behavioral_table)
+    
+    # Feature contributions (what drove the score)
+    contributions = assessment_data.get('feature_contributions')
+    if isinstance(contributions, dict) and contributions:
+        elements.append(Spacer(1, 20))
+        elements.append(Paragraph(loc.t('contributions_heading'), heading_style))
+        base_probability = assessment_data.get('base_probability')
+        if base_probability is not None:
+            elements.append(Paragraph(
+                loc.t('contributions_intro', base=f"{float(base_probability) * 100:.1f}%",
+                      probability=f"{probability_pct:.1f}%"),
+                normal_style
+            ))
+            elements.append(Spacer(1, 8))
+        
+        ranked = sorted(contributions.items(), key=lambda item: abs(item[1]), reverse=True)[:TOP_CONTRIBUTIONS]
+        largest = max(abs(value) for _, value in ranked)
+        contribution_data = [[
+            loc.cell(loc.t('answer'), 9, bold=True, color=colors.white),
+            loc.cell(loc.t('effect'), 9, bold=True, color=colors.white), ''
+        ]]
+        for key, value in ranked:
+            contribution_data.append([
+                loc.cell(_contribution_label(key, loc), 9),
+                loc.cell(loc.t('points', value=f"{value * 100:+.1f}"), 9),
+                _contribution_bar(value, largest)
+            ])
+        
+        contribution_table = Table(contribution_data, colWidths=[2.2*inch, 0.9*inch, 2.4*inch])
+        contribution_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0F5A5C')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), loc.bold_font),
+            ('FONTNAME', (0, 1), (-1, -1), loc.font),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F4')]),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(contribution_table)
     elements.append(PageBreak())
     
     # Recommendations Section
-    elements.append(Paragraph("COMPREHENSIVE RECOMMENDATIONS", heading_style))
+    elements.append(Paragraph(loc.t('recommendations_heading'), heading_style))
     elements.append(Spacer(1, 10))
     
-    recommendations = get_recommendations(risk_level_str, behavioral, demographic)
+    recommendations = loc.recommendations_for(risk_level_str)
     
-    # Medical Recommendations
-    elements.append(Paragraph("1. Medical Consultation & Treatment", subheading_style))
-    for rec in recommendations['medical']:
-        elements.append(Paragraph(f"• {rec}", normal_style))
-        elements.append(Spacer(1, 6))
-    elements.append(Spacer(1, 12))
-    
-    # Therapy Recommendations
-    elements.append(Paragraph("2. Therapeutic Interventions", subheading_style))
-    for rec in recommendations['therapy']:
-        elements.append(Paragraph(f"• {rec}", normal_style))
-        elements.append(Spacer(1, 6))
-    elements.append(Spacer(1, 12))
-    
-    # Yoga & Mindfulness
-    elements.append(Paragraph("3. Yoga & Mindfulness Practices", subheading_style))
-    for rec in recommendations['yoga']:
-        elements.append(Paragraph(f"• {rec}", normal_style))
-        elements.append(Spacer(1, 6))
-    elements.append(Spacer(1, 12))
-    
-    # Lifestyle Modifications
-    elements.append(Paragraph("4. Lifestyle Modifications", subheading_style))
-    for rec in recommendations['lifestyle']:
-        elements.append(Paragraph(f"• {rec}", normal_style))
-        elements.append(Spacer(1, 6))
-    elements.append(Spacer(1, 12))
-    
-    # Nutrition
-    elements.append(Paragraph("5. Nutritional Recommendations", subheading_style))
-    for rec in recommendations['nutrition']:
-        elements.append(Paragraph(f"• {rec}", normal_style))
-        elements.append(Spacer(1, 6))
-    elements.append(Spacer(1, 20))
+    # Medical, therapy, yoga & mindfulness, lifestyle and nutrition, in that order
+    for section in ('medical', 'therapy', 'yoga', 'lifestyle', 'nutrition'):
+        elements.append(Paragraph(loc.t(section), subheading_style))
+        for rec in recommendations[section]:
+            elements.append(Paragraph(f"• {rec}", normal_style))
+            elements.append(Spacer(1, 6))
+        elements.append(Spacer(1, 20 if section == 'nutrition' else 12))
     
     # Disclaimer
     elements.append(PageBreak())
-    elements.append(Paragraph("IMPORTANT MEDICAL DISCLAIMER", heading_style))
-    disclaimer_text = """
-    This assessment report is generated by an AI-powered screening tool and is NOT a clinical diagnosis. 
-    The results should be used as a reference point for discussions with qualified healthcare professionals. 
-    All recommendations provided are general guidelines and must be customized by licensed medical practitioners 
-    based on individual needs, medical history, and comprehensive evaluation.
-    <br/><br/>
-    <b>Always consult with:</b><br/>
-    • Licensed pediatrician or family physician<br/>
-    • Developmental pediatrician or child psychiatrist<br/>
-    • Certified therapists (ABA, OT, Speech, etc.)<br/>
-    • Registered dietitian for nutritional advice<br/>
-    <br/>
-    <b>Do not:</b><br/>
-    • Self-diagnose or self-medicate based on this report<br/>
-    • Start any medication without professional prescription<br/>
-    • Discontinue existing treatments without consulting your doctor<br/>
-    • Delay seeking professional medical advice<br/>
-    <br/>
-    This report is for informational purposes only and does not establish a doctor-patient relationship.
-    """
-    elements.append(Paragraph(disclaimer_text, normal_style))
+    elements.append(Paragraph(loc.t('disclaimer_heading'), heading_style))
+    elements.append(Paragraph(loc.t('disclaimer'), normal_style))
     elements.append(Spacer(1, 20))
     
     # Footer
-    footer_text = f"<i>Report generated by ASD Screening System | {report_date}</i>"
+    footer_text = f"<i>{loc.t('footer', date=report_date)}</i>"
     elements.append(Paragraph(footer_text, normal_style))
     
     # Build PDF
@@ -0,0 +1,243 @@
+"""
+Localized text, fonts and paragraph styles for PDF reports.
+
+Reports can be rendered in English (``en``), Hindi (``hi``) or Marathi
+(``mr``). The text for each language lives in ``backend/locales/<code>.json``:
+labels, the AQ-10 domains, risk levels and the recommendations. Any key
+missing from a translation falls back to English.
+
+Devanagari needs a TrueType font and complex text layout (conjuncts, and
+vowel signs drawn before their consonant). ReportLab shapes text with
+``uharfbuzz`` (pinned in ``requirements.txt``). The font is searched for in
+``REPORT_FONT_DIR``, ``backend/fonts`` (where the Render build downloads Noto
+Sans Devanagari) and then in the usual system font directories. Noto Sans
+Devanagari (Debian/Ubuntu ``fonts-noto-core``), Lohit Devanagari, and
+Nirmala UI or Mangal on Windows all work. A language whose font or shaper is
+missing is not offered.
+
+Reading a catalog, finding and registering its fonts and building its styles
+happens once per language per process, in ``get_report_locale``. Reports
+rendered afterwards only look the results up.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph
+
+try:
+    import uharfbuzz
+except ImportError:
+    uharfbuzz = None
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = Path(__file__).parent / 'locales'
+DEFAULT_LOCALE = 'en'
+# Language code -> script needing a TrueType font (None: the built-in Helvetica)
+LOCALE_SCRIPTS = {'en': None, 'hi': 'devanagari', 'mr': 'devanagari'}
+SUPPORTED_LOCALES = tuple(LOCALE_SCRIPTS)
+
+# Font files tried for each script, in order: (regular, bold or None)
+SCRIPT_FONTS = {
+    'devanagari': (
+        ('NotoSansDevanagari-Regular.ttf', 'NotoSansDevanagari-Bold.ttf'),
+        ('NotoSerifDevanagari-Regular.ttf', 'NotoSerifDevanagari-Bold.ttf'),
+        ('Lohit-Devanagari.ttf', None),
+        ('Nirmala.ttf', 'NirmalaB.ttf'),
+        ('mangal.ttf', 'mangalb.ttf'),
+    ),
+}
+BUNDLED_FONT_DIR = Path(__file__).parent / 'fonts'
+FONT_DIRS = [Path(p) for p in (
+    os.environ.get('REPORT_FONT_DIR', ''), BUNDLED_FONT_DIR,
+    '/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'), '/Library/Fonts', 'C:/Windows/Fonts',
+) if p]
+
+TEXT_COLOR = colors.HexColor('#0F5A5C')
+
+
+class LocaleUnavailable(ValueError):
+    """The language is unknown, or its font or text shaper is not installed."""
+
+
+def _read_catalog(code: str) -> dict:
+    with open(LOCALES_DIR / f'{code}.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_font(candidates: Sequence[Tuple[str, Optional[str]]],
+              font_dirs: Sequence[Path]) -> Optional[Tuple[Path, Optional[Path]]]:
+    """Paths of the first candidate (regular, bold) found under ``font_dirs``."""
+    found: Dict[str, Path] = {}
+    for directory in font_dirs:
+        if not directory.is_dir():
+            continue
+        for root, _, files in os.walk(directory):
+            for name in files:
+                found.setdefault(name.lower(), Path(root) / name)
+    for regular, bold in candidates:
+        if regular.lower() in found:
+            return found[regular.lower()], found.get(bold.lower()) if bold else None
+    return None
+
+
+def _register_font(path: Path) -> str:
+    name = path.stem
+    if name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(name, str(path)))
+    return name
+
+
+class ReportLocale:
+    """Text, fonts and paragraph styles for rendering reports in one language."""
+
+    def __init__(self, code: str, catalog: dict, fallback: Optional[dict] = None,
+                 font: str = 'Helvetica', bold_font: str = 'Helvetica-Bold', shaping: bool = False):
+        fallback = fallback or {}
+        self.code = code
+        self.language = catalog.get('language', code)
+        self.font = font
+        self.bold_font = bold_font
+        self.shaping = shaping
+        self.date_format = catalog.get('date_format') or fallback.get('date_format', '%Y-%m-%d %H:%M')
+        self.text = {**fallback.get('text', {}), **catalog.get('text', {})}
+        self.risk_levels = {**fallback.get('risk_levels', {}), **catalog.get('risk_levels', {})}
+        self.respondents = {**fallback.get('respondents', {}), **catalog.get('respondents', {})}
+        self.demographic_labels = {**fallback.get('demographic_labels', {}), **catalog.get('demographic_labels', {})}
+        self.questions = catalog.get('questions') or fallback.get('questions', [])
+        self.recommendations = copy.deepcopy(fallback.get('recommendations', {}))
+        for level, sections in catalog.get('recommendations', {}).items():
+            self.recommendations.setdefault(level, {}).update(sections)
+        self.styles = self._build_styles()
+        self._cell_styles: Dict[tuple, ParagraphStyle] = {}
+
+    def _build_styles(self) -> Dict[str, ParagraphStyle]:
+        styles = getSampleStyleSheet()
+        shaping = {'shaping': 1} if self.shaping else {}
+        return {
+            'title': ParagraphStyle(
+                f'CustomTitle-{self.code}', parent=styles['Heading1'], fontSize=24, textColor=TEXT_COLOR,
+                spaceAfter=30, alignment=TA_CENTER, fontName=self.bold_font, **shaping
+            ),
+            'heading': ParagraphStyle(
+                f'CustomHeading-{self.code}', parent=styles['Heading2'], fontSize=16, textColor=TEXT_COLOR,
+                spaceAfter=12, spaceBefore=12, fontName=self.bold_font, **shaping
+            ),
+            'subheading': ParagraphStyle(
+                f'CustomSubHeading-{self.code}', parent=styles['Heading3'], fontSize=13, textColor=TEXT_COLOR,
+                spaceAfter=8, spaceBefore=8, fontName=self.bold_font, **shaping
+            ),
+            'normal': ParagraphStyle(
+                f'CustomNormal-{self.code}', parent=styles['Normal'], fontSize=11, leading=16,
+                alignment=TA_JUSTIFY, fontName=self.font, **shaping
+            ),
+        }
+
+    def t(self, key: str, **values) -> str:
+        text = self.text.get(key, key)
+        return text.format(**values) if values else text
+
+    def risk_level(self, level: str) -> str:
+        return self.risk_levels.get(level, level)
+
+    def respondent(self, value: str) -> str:
+        return self.respondents.get(value, value)
+
+    def question_labels(self) -> List[Tuple[str, str]]:
+        return [(f'Q{i}', label) for i, label in enumerate(self.questions, 1)]
+
+    def recommendations_for(self, risk_level: str) -> Dict[str, List[str]]:
+        """A fresh copy of the recommendations for a risk level (anything but High/Moderate is Low)."""
+        level = risk_level if risk_level in ('High', 'Moderate') else 'Low'
+        return {section: list(items) for section, items in self.recommendations.get(level, {}).items()}
+
+    def cell(self, text: str, size: float, bold: bool = False,
+             color=colors.black) -> Union[str, Paragraph]:
+        """A table cell: plain text, or a shaped paragraph where the script needs one."""
+        if not self.shaping:
+            return text
+        key = (size, bold, str(color))
+        style = self._cell_styles.get(key)
+        if style is None:
+            style = self._cell_styles[key] = ParagraphStyle(
+                f'Cell-{self.code}-{len(self._cell_styles)}', fontName=self.bold_font if bold else self.font,
+                fontSize=size, leading=size * 1.25, textColor=color, shaping=1
+            )
+        return Paragraph(escape(str(text)), style)
+
+
+def load_report_locale(code: str, font_dirs: Optional[Sequence[Path]] = None) -> ReportLocale:
+    """Read the catalog for ``code`` and register its fonts; raises LocaleUnavailable."""
+    if code not in LOCALE_SCRIPTS:
+        raise LocaleUnavailable(f"Unknown report language {code!r}")
+    fallback = _read_catalog(DEFAULT_LOCALE)
+    script = LOCALE_SCRIPTS[code]
+    if script is None:
+        return ReportLocale(code, fallback if code == DEFAULT_LOCALE else _read_catalog(code))
+    if uharfbuzz is None:
+        raise LocaleUnavailable(f"Report language {code!r} needs uharfbuzz for text shaping")
+    fonts = find_font(SCRIPT_FONTS[script], FONT_DIRS if font_dirs is None else font_dirs)
+    if fonts is None:
+        raise LocaleUnavailable(f"No {script} font found for report language {code!r}")
+    regular, bold = fonts
+    font = _register_font(regular)
+    bold_font = _register_font(bold) if bold is not None else font
+    # Lets <b> in paragraphs switch to the bold face
+    pdfmetrics.registerFontFamily(font, normal=font, bold=bold_font, italic=font, boldItalic=bold_font)
+    logger.info(f"Report language {code} uses {regular.name}" + (f" and {bold.name}" if bold else ""))
+    return ReportLocale(code, _read_catalog(code), fallback, font, bold_font, shaping=True)
+
+
+# Loaded locales (or why they could not be loaded), shared by every report in this process
+_locale_cache: Dict[str, Union[ReportLocale, LocaleUnavailable]] = {}
+_locale_lock = threading.Lock()
+
+
+def get_report_locale(code: str = DEFAULT_LOCALE) -> ReportLocale:
+    """The cached locale for ``code``, loading it on first use; raises LocaleUnavailable."""
+    if code not in LOCALE_SCRIPTS:
+        raise LocaleUnavailable(f"Unknown report language {code!r}")
+    loaded = _locale_cache.get(code)
+    if loaded is None:
+        with _locale_lock:
+            loaded = _locale_cache.get(code)
+            if loaded is None:
+                try:
+                    loaded = load_report_locale(code)
+                except LocaleUnavailable as e:
+                    logger.warning(f"⚠️ {e}")
+                    loaded = e
+                _locale_cache[code] = loaded
+    if isinstance(loaded, LocaleUnavailable):
+        raise LocaleUnavailable(str(loaded))
+    return loaded
+
+
+def available_locales() -> List[str]:
+    """Languages reports can be rendered in on this machine."""
+    available = []
+    for code in SUPPORTED_LOCALES:
+        try:
+            get_report_locale(code)
+            available.append(code)
+        except LocaleUnavailable:
+            pass
+    return available
+
+
+def clear_locale_cache():
+    """Forget loaded locales so the next report reloads catalogs and looks for fonts again"""
+    _locale_cache.clear()
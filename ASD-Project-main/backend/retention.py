@@ -0,0 +1,242 @@
+"""
+Retention for the reports and uploads directories.
+
+``backend/reports/`` and ``backend/uploads/`` would otherwise only grow.
+``GarbageCollector`` periodically removes:
+
+* rendered reports older than ``REPORT_TTL_HOURS`` (default 168). They are
+  rendered again on the next download.
+* uploads that no assessment references, once they are older than
+  ``UPLOAD_GRACE_HOURS`` (default 24). The grace period covers an image
+  uploaded just before the assessment that will reference it.
+* resized variants whose upload is gone, and ``*.tmp`` files left behind by
+  interrupted renders.
+* finished background jobs, with their assessment payloads, older than
+  ``JOB_TTL_HOURS`` (see ``jobs.JobQueue.prune``).
+
+A sweep runs every ``GC_INTERVAL_SECONDS`` (default 900; 0 disables it). The
+first sweep runs one interval after startup. A sweep lists a directory once,
+then stats and unlinks ``GC_BATCH_SIZE`` entries at a time in the default
+executor, pausing between batches, so a large directory never stalls the
+event loop. References come from the database and the assessment cache. If
+the database cannot be read, uploads are left alone for that sweep. Without
+a database and with several workers, give each worker a shared
+``ASSESSMENT_CACHE_URL``. Otherwise one worker cannot see the assessments of
+the others.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from .uploads import FILENAME_PATTERN
+except ImportError:
+    from uploads import FILENAME_PATTERN
+
+logger = logging.getLogger(__name__)
+
+REPORT_TTL = float(os.environ.get('REPORT_TTL_HOURS', '168')) * 3600
+UPLOAD_GRACE = float(os.environ.get('UPLOAD_GRACE_HOURS', '24')) * 3600
+GC_INTERVAL = float(os.environ.get('GC_INTERVAL_SECONDS', '900'))
+GC_BATCH_SIZE = int(os.environ.get('GC_BATCH_SIZE', '256'))
+# Pause between batches, letting requests run
+GC_BATCH_PAUSE = 0.01
+# Temporary files older than this belong to a render that died
+TMP_TTL = 3600.0
+
+# assessment_<id>.pdf, or assessment_<id>.<lang>.pdf for other report languages
+REPORT_PATTERN = re.compile(r'^assessment_[A-Za-z0-9-]+(\.[a-z]{2})?\.pdf$')
+VARIANT_PATTERN = re.compile(r'^(?P<stem>.+)\.w\d+(?P<suffix>\.[A-Za-z0-9]+)$')
+FILE_KINDS = ('reports', 'uploads', 'variants', 'tmp')
+KINDS = FILE_KINDS + ('jobs',)
+
+# Decides whether a directory entry goes: its kind (one of KINDS) or None to keep it
+Rule = Callable[[str, os.stat_result, float], Optional[str]]
+
+
+def _sweep_batch(directory: Path, names: List[str], rule: Rule, now: float) -> List[Tuple[str, str, int]]:
+    """Stat and remove the entries of one batch that ``rule`` selects; (kind, name, bytes) per removal."""
+    removed = []
+    for name in names:
+        path = directory / name
+        try:
+            stat = path.stat()
+            if not path.is_file():
+                continue
+            kind = rule(name, stat, now)
+            if kind is not None:
+                path.unlink()
+                removed.append((kind, name, stat.st_size))
+        except FileNotFoundError:
+            # Removed concurrently (another worker's sweep, or a re-render)
+            continue
+    return removed
+
+
+async def referenced_uploads(database, cache) -> Optional[Set[str]]:
+    """Upload names referenced by any assessment, or None when the database could not be read."""
+    names: Set[str] = set()
+    image_filenames = getattr(cache, 'image_filenames', None)
+    if hasattr(cache, 'image_filenames_async'):
+        # A shared cache is read in the executor, not on the event loop
+        names.update(await cache.image_filenames_async())
+    elif image_filenames is not None:
+        names.update(image_filenames())
+    else:
+        names.update(a['image_filename'] for a in cache.values() if a.get('image_filename'))
+    if database is not None:
+        try:
+            cursor = database.assessments.find({}, {'image_filename': 1, '_id': 0}).batch_size(1000)
+            async for assessment in cursor:
+                if assessment.get('image_filename'):
+                    names.add(assessment['image_filename'])
+        except Exception as e:
+            logger.warning(f"Could not list referenced uploads, keeping all uploads this time: {e}")
+            return None
+    return names
+
+
+class GarbageCollector:
+    """Incremental sweeps of the reports, uploads and variants directories, and of finished jobs."""
+
+    def __init__(self, reports_dir: Path, uploads_dir: Path, variant_store=None,
+                 references: Optional[Callable[[], Awaitable[Optional[Set[str]]]]] = None,
+                 report_ttl: float = REPORT_TTL, upload_grace: float = UPLOAD_GRACE,
+                 batch_size: int = GC_BATCH_SIZE, batch_pause: float = GC_BATCH_PAUSE,
+                 prune_jobs: Optional[Callable[[], int]] = None):
+        self.reports_dir = Path(reports_dir)
+        self.uploads_dir = Path(uploads_dir)
+        self.variant_store = variant_store
+        self.references = references
+        # Deletes expired jobs (blocking, run in the executor); returns how many
+        self.prune_jobs = prune_jobs
+        self.report_ttl = report_ttl
+        self.upload_grace = upload_grace
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.errors = 0
+        self.skipped_uploads = 0
+        self.removed = dict.fromkeys(KINDS, 0)
+        self.reclaimed_bytes = 0
+        self.last_sweep: Optional[Dict[str, Any]] = None
+
+    # Rules
+
+    def _report_rule(self, name: str, stat: os.stat_result, now: float) -> Optional[str]:
+        age = now - stat.st_mtime
+        if REPORT_PATTERN.match(name):
+            return 'reports' if age > self.report_ttl else None
+        return 'tmp' if name.endswith('.tmp') and age > TMP_TTL else None
+
+    def _upload_rule(self, referenced: Set[str]) -> Rule:
+        def rule(name: str, stat: os.stat_result, now: float) -> Optional[str]:
+            if FILENAME_PATTERN.match(name) and name not in referenced and now - stat.st_mtime > self.upload_grace:
+                return 'uploads'
+            return None
+        return rule
+
+    def _variant_rule(self, name: str, stat: os.stat_result, now: float) -> Optional[str]:
+        if name.endswith('.tmp'):
+            return 'tmp' if now - stat.st_mtime > TMP_TTL else None
+        match = VARIANT_PATTERN.match(name)
+        if match and not (self.uploads_dir / (match['stem'] + match['suffix'])).exists():
+            return 'variants'
+        return None
+
+    # Sweeping
+
+    async def _sweep(self, directory: Path, rule: Rule, totals: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        try:
+            names = await loop.run_in_executor(None, os.listdir, directory)
+        except FileNotFoundError:
+            return
+        now = time.time()
+        for start in range(0, len(names), self.batch_size):
+            batch = names[start:start + self.batch_size]
+            removed = await loop.run_in_executor(None, _sweep_batch, directory, batch, rule, now)
+            for kind, name, size in removed:
+                totals[kind] += 1
+                totals['bytes'] += size
+                if kind == 'variants' and self.variant_store is not None:
+                    self.variant_store.forget(name)
+            totals['scanned'] += len(batch)
+            await asyncio.sleep(self.batch_pause)
+
+    async def sweep(self) -> Dict[str, Any]:
+        """One pass over every directory; returns what it removed."""
+        started = time.perf_counter()
+        totals: Dict[str, Any] = dict.fromkeys(KINDS, 0)
+        totals.update(scanned=0, bytes=0, uploads_skipped=False)
+        await self._sweep(self.reports_dir, self._report_rule, totals)
+
+        # Without a way to list references, no upload can be shown to be unreferenced
+        referenced = await self.references() if self.references is not None else None
+        if referenced is None:
+            totals['uploads_skipped'] = True
+            self.skipped_uploads += 1
+        else:
+            await self._sweep(self.uploads_dir, self._upload_rule(referenced), totals)
+
+        if self.variant_store is not None:
+            await self._sweep(self.variant_store.directory, self._variant_rule, totals)
+
+        if self.prune_jobs is not None:
+            try:
+                totals['jobs'] = await asyncio.get_running_loop().run_in_executor(None, self.prune_jobs)
+            except Exception as e:
+                logger.warning(f"Could not prune finished jobs: {type(e).__name__}: {e}")
+
+        totals['duration_s'] = time.perf_counter() - started
+        totals['finished_at'] = time.time()
+        self.sweeps += 1
+        for kind in KINDS:
+            self.removed[kind] += totals[kind]
+        self.reclaimed_bytes += totals['bytes']
+        self.last_sweep = totals
+        if totals['bytes']:
+            logger.info(f"🧹 Retention sweep removed {sum(totals[k] for k in FILE_KINDS)} files "
+                        f"({totals['bytes'] / 1e6:.1f} MB) in {totals['duration_s']:.2f}s")
+        if totals['jobs']:
+            logger.info(f"🧹 Retention sweep removed {totals['jobs']} finished jobs")
+        return totals
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Retention sweep failed: {type(e).__name__}: {e}")
+
+    def start(self, interval: float = GC_INTERVAL):
+        if self._task is None and interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None,
+            'sweeps': self.sweeps,
+            'errors': self.errors,
+            'uploads_skipped': self.skipped_uploads,
+            'removed': dict(self.removed),
+            'reclaimed_bytes': self.reclaimed_bytes,
+            'last_sweep': self.last_sweep,
+        }
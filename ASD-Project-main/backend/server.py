@@ -1,5 +1,5 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,30 +7,86 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, AsyncGenerator, Dict, Any
+from typing import List, Optional, AsyncGenerator, Dict, Any, Callable, Tuple
 import uuid
 import json
+import numpy as np
+import hashlib
 import traceback
 from datetime import datetime, timezone
 import requests
 import shutil
 import sys
+import time
+import asyncio
+import threading
 from contextlib import asynccontextmanager
 
-# Handle imports for both module and direct script execution
 try:
-    from .ml_model import train_model, predict_asd, MODEL_PATH, SCALER_PATH
-    from .report_generator import generate_pdf_report
+    import orjson
 except ImportError:
-    from ml_model import train_model, predict_asd, MODEL_PATH, SCALER_PATH
-    from report_generator import generate_pdf_report
+    orjson = None
 
-# In-memory cache for assessments (for when MongoDB is unavailable)
-assessment_cache: Dict[str, dict] = {}
+# Handle imports for both module and direct script execution
+try:
+    from .ml_model import train_model, MODEL_PATH, SCALER_PATH
+    from .input_models import (
+        AssessmentRequest, BehavioralData, DemographicData, ETHNICITY_CODES, MAX_AGE, MAX_TEXT_LENGTH
+    )
+    from .report_generator import generate_pdf_report, REPORTS_DIR
+    from .report_i18n import DEFAULT_LOCALE, LocaleUnavailable, available_locales, get_report_locale
+    from .assessment_store import CompactAssessmentStore
+    from .shared_cache import SharedAssessmentCache, create_assessment_cache
+    from .storage import SQLiteDatabase
+    from .assessment_stats import stats_pipeline, format_pipeline_result, stats_from_store, stats_from_assessments
+    from .calibration import DEFAULT_RISK_THRESHOLDS, parse_risk_thresholds, risk_level as risk_level_for
+    from .model_registry import get_model_router, list_versions
+    from .export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_chunks, open_batches
+    from .jobs import JobQueue, JobRunner, TERMINAL_STATUSES, public_view
+    from .single_flight import SingleFlight
+    from .admission import AdmissionMiddleware, Rejected, create_admission_controller
+    from .diagnostics import PROFILER_MAX_HZ, PROFILER_MAX_SECONDS, LoopMonitor, collapsed, sample_stacks
+    from .retention import GC_INTERVAL, GarbageCollector, referenced_uploads
+    from .prerender import Prerenderer
+    from .uploads import VARIANT_WIDTHS, VariantStore, media_type_for, resolve_upload
+    from .http_cache import (
+        CompressionMiddleware, cached_file_response, etag_matches, is_not_modified, validator_headers
+    )
+except ImportError:
+    from ml_model import train_model, MODEL_PATH, SCALER_PATH
+    from input_models import (
+        AssessmentRequest, BehavioralData, DemographicData, ETHNICITY_CODES, MAX_AGE, MAX_TEXT_LENGTH
+    )
+    from report_generator import generate_pdf_report, REPORTS_DIR
+    from report_i18n import DEFAULT_LOCALE, LocaleUnavailable, available_locales, get_report_locale
+    from assessment_store import CompactAssessmentStore
+    from shared_cache import SharedAssessmentCache, create_assessment_cache
+    from storage import SQLiteDatabase
+    from assessment_stats import stats_pipeline, format_pipeline_result, stats_from_store, stats_from_assessments
+    from calibration import DEFAULT_RISK_THRESHOLDS, parse_risk_thresholds, risk_level as risk_level_for
+    from model_registry import get_model_router, list_versions
+    from export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_chunks, open_batches
+    from jobs import JobQueue, JobRunner, TERMINAL_STATUSES, public_view
+    from single_flight import SingleFlight
+    from admission import AdmissionMiddleware, Rejected, create_admission_controller
+    from diagnostics import PROFILER_MAX_HZ, PROFILER_MAX_SECONDS, LoopMonitor, collapsed, sample_stacks
+    from retention import GC_INTERVAL, GarbageCollector, referenced_uploads
+    from prerender import Prerenderer
+    from uploads import VARIANT_WIDTHS, VariantStore, media_type_for, resolve_upload
+    from http_cache import (
+        CompressionMiddleware, cached_file_response, etag_matches, is_not_modified, validator_headers
+    )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Cache for assessments (for when MongoDB is unavailable). By default entries are
+# packed in memory per process; set ASSESSMENT_CACHE_URL to share it between workers.
+assessment_cache = create_assessment_cache()
+
+# Low/Moderate/High cutoffs on the calibrated probability, e.g. RISK_THRESHOLDS=0.25,0.55
+RISK_THRESHOLDS = parse_risk_thresholds(os.environ.get('RISK_THRESHOLDS', DEFAULT_RISK_THRESHOLDS))
+
 # Initialize logger
 logging.basicConfig(
     level=logging.INFO,
@@ -43,9 +99,18 @@ mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 client = None
 db = None
 
+# Storage backend: "mongo" (default) or "sqlite" for an embedded database file
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH', str(ROOT_DIR / 'data' / 'asd.sqlite3'))
+
 def get_db():
     """Get database connection"""
     global client, db
+    if STORAGE_BACKEND == 'sqlite':
+        if db is None:
+            db = SQLiteDatabase(SQLITE_DB_PATH)
+            logger.info(f"SQLite database opened: {SQLITE_DB_PATH}")
+        return db
     if client is None:
         try:
             client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
@@ -90,13 +155,39 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         try:
             if dataset_path.exists():
                 train_model(str(dataset_path))
+                invalidate_metrics_cache()
                 logger.info("✅ Model trained successfully")
             else:
                 logger.warning("Dataset not available, skipping model training")
         except Exception as e:
             logger.warning(f"Error training model: {e}")
     else:
-        logger.info("✅ ML model loaded successfully")
+        try:
+            # Already loaded when the app was preloaded before forking workers
+            get_model_router().warm()
+            logger.info("✅ ML model loaded successfully")
+        except Exception as e:
+            logger.warning(f"Error loading model: {e}")
+    
+    # Report catalogs and fonts are loaded once per process, off the event loop
+    try:
+        report_languages = await asyncio.get_running_loop().run_in_executor(None, available_locales)
+        logger.info(f"📄 Report languages: {', '.join(report_languages)}")
+    except Exception as e:
+        logger.warning(f"Error loading report languages: {e}")
+    
+    # Resume queued and interrupted mode=async jobs
+    if JOB_WORKERS > 0:
+        try:
+            get_job_runner().start()
+        except Exception as e:
+            logger.warning(f"Job workers not started: {e}")
+    
+    # First retention sweep runs one GC_INTERVAL after startup
+    garbage_collector.start(GC_INTERVAL)
+    
+    # Event-loop lag heartbeat and blocked-loop watchdog
+    loop_monitor.start()
     
     logger.info("=" * 60)
     logger.info("✅ Application startup complete!")
@@ -109,6 +200,13 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     
     # Shutdown event
     try:
+        await get_model_router().drain()
+        if _job_runner.get('runner') is not None:
+            await _job_runner['runner'].stop()
+        await garbage_collector.stop()
+        await report_prerenderer.stop()
+        await loop_monitor.stop()
+        upload_variants.close()
         if client is not None:
             client.close()
         logger.info("✅ Shutdown complete")
@@ -117,6 +215,22 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
 app = FastAPI(lifespan=lifespan)
 
+# Measures event-loop lag and logs the stack of any handler blocking the loop
+loop_monitor = LoopMonitor()
+
+# Per-client rate limits and per-route concurrency limits for expensive endpoints.
+# Added before CORS so that 429/503 responses still carry CORS headers.
+admission = create_admission_controller()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# gzip/Brotli for JSON, CSV and text bodies of at least COMPRESSION_MIN_SIZE bytes.
+# COMPRESSION_ENCODINGS lists the encodings in preference order; empty disables compression.
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=[e.strip() for e in os.environ.get('COMPRESSION_ENCODINGS', 'br,gzip').split(',') if e.strip()],
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+)
+
 # Allow CORS for frontend (adjust origins as needed)
 app.add_middleware(
     CORSMiddleware,
@@ -131,37 +245,18 @@ api_router = APIRouter(prefix="/api")
 # Directories
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
+# Resized copies of uploaded images served by GET /api/uploads/{filename}?w=
+upload_variants = VariantStore(UPLOADS_DIR / '.variants')
+# Removes expired reports and unreferenced uploads in the background
+garbage_collector = GarbageCollector(
+    REPORTS_DIR, UPLOADS_DIR, upload_variants,
+    references=lambda: referenced_uploads(get_db(), assessment_cache),
+    prune_jobs=lambda: get_job_runner().queue.prune()
+)
 DATA_DIR = ROOT_DIR / 'data'
 DATA_DIR.mkdir(exist_ok=True)
 
 # Models
-class DemographicData(BaseModel):
-    name: str
-    age: int
-    gender: int
-    country: str
-    jaundice: int
-    family_history: int
-    respondent: str
-    ethnicity: Optional[int] = None
-
-class BehavioralData(BaseModel):
-    a1_score: int
-    a2_score: int
-    a3_score: int
-    a4_score: int
-    a5_score: int
-    a6_score: int
-    a7_score: int
-    a8_score: int
-    a9_score: int
-    a10_score: int
-
-class AssessmentRequest(BaseModel):
-    demographic: DemographicData
-    behavioral: BehavioralData
-    image_filename: Optional[str] = None
-
 class AssessmentResult(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -174,6 +269,55 @@ class AssessmentResult(BaseModel):
     probability: float
     confidence: float
     risk_level: str
+    # Calibrated ASD probability that risk_level is cut from
+    calibrated_probability: Optional[float] = None
+    # Model version that produced the prediction and how long inference took
+    model_version: Optional[str] = None
+    inference_ms: Optional[float] = None
+    # Saabas decomposition: probability == base_probability + sum(feature_contributions)
+    base_probability: Optional[float] = None
+    feature_contributions: Optional[Dict[str, float]] = None
+
+# Serve already-validated assessment dicts with orjson instead of re-validating them
+# through response_model and jsonable_encoder. Set FAST_JSON_RESPONSES=0 to disable.
+FAST_JSON_RESPONSES = orjson is not None and os.environ.get('FAST_JSON_RESPONSES', '1') != '0'
+
+def _trusted_assessment(doc: dict) -> dict:
+    """Validate a stored document once so it can be cached and served as trusted data."""
+    return AssessmentResult.model_validate(doc).model_dump()
+
+def _assessment_response(content):
+    """Serialize trusted assessment dicts directly, or defer to response_model validation."""
+    if not FAST_JSON_RESPONSES:
+        return content
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_UTC_Z),
+        media_type="application/json"
+    )
+
+# Assessments and rendered reports never change once created, so clients may keep
+# them; they hold personal data, so only in private (browser) caches
+IMMUTABLE_CACHE_MAX_AGE = int(os.environ.get('IMMUTABLE_CACHE_MAX_AGE', '86400'))
+IMMUTABLE_CACHE_CONTROL = f"private, max-age={IMMUTABLE_CACHE_MAX_AGE}, immutable"
+# Part of assessment ETags; bump when the JSON representation of an assessment changes
+ASSESSMENT_REPRESENTATION = "1" + ("o" if FAST_JSON_RESPONSES else "p")
+
+def _assessment_etag(assessment_id: str) -> str:
+    """Strong ETag derived from the id alone, so revalidation needs no lookup"""
+    return f'"{assessment_id}-{ASSESSMENT_REPRESENTATION}"'
+
+def _cacheable_assessment_response(request: Request, response: Response, assessment: dict):
+    """Single-assessment response with ETag/Last-Modified, or 304 when the client's copy is current"""
+    timestamp = assessment.get('timestamp')
+    last_modified = timestamp.timestamp() if isinstance(timestamp, datetime) else None
+    headers = validator_headers(_assessment_etag(assessment['id']), last_modified, IMMUTABLE_CACHE_CONTROL)
+    if is_not_modified(request.headers, headers['ETag'], last_modified):
+        return Response(status_code=304, headers=headers)
+    content = _assessment_response(assessment)
+    # response_model path: headers set on the injected response are merged by FastAPI
+    (content if isinstance(content, Response) else response).headers.update(headers)
+    return content
+
 # API endpoints
 @api_router.get("/")
 async def root():
@@ -212,80 +356,159 @@ async def upload_image(file: UploadFile = File(...)):
         logger.error(f"❌ Error uploading image: {type(e).__name__}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
 
+def _predict_assessment(request: AssessmentRequest,
+                        assessment_id: str) -> Tuple[AssessmentResult, Optional[Callable[[], None]]]:
+    """Predict ASD risk for a request with the model version its id is routed to
+
+    Safe to run in the executor. Also returns, when a candidate model shadows
+    this one, the function submitting its prediction (call it on the event loop).
+    """
+    # Bounds were checked when the request was validated, so the row goes straight to the model
+    features = request.feature_row()
+    
+    # Get prediction from the model version this assessment is routed to
+    model_router = get_model_router()
+    prediction_result, model_version, inference_ms, shadow = model_router.predict(assessment_id, features)
+    logger.info(f"Prediction result ({model_version.name}, {inference_ms:.2f} ms): {prediction_result}")
+    
+    # Determine risk level from the calibrated probability
+    risk_level = risk_level_for(prediction_result['calibrated_probability'], RISK_THRESHOLDS)
+    
+    # Create result object
+    answers = request.model_dump()
+    result = AssessmentResult(
+        id=assessment_id,
+        demographic=answers['demographic'],
+        behavioral=answers['behavioral'],
+        image_filename=answers['image_filename'],
+        prediction=prediction_result['prediction'],
+        probability=prediction_result['probability'],
+        calibrated_probability=prediction_result['calibrated_probability'],
+        confidence=prediction_result['confidence'],
+        risk_level=risk_level,
+        base_probability=prediction_result.get('base_probability'),
+        feature_contributions=prediction_result.get('feature_contributions'),
+        model_version=model_version.name,
+        inference_ms=inference_ms
+    )
+    
+    # Score the candidate model in the background; the response never waits for it
+    submit_shadow = None
+    if shadow is not None:
+        def submit_shadow():
+            model_router.submit_shadow(
+                shadow, features, prediction_result,
+                lambda probability: risk_level_for(probability, RISK_THRESHOLDS)
+            )
+    
+    logger.info(f"Assessment created with ID: {result.id}")
+    return result, submit_shadow
+
+def _score_assessment(request: AssessmentRequest, assessment_id: str) -> AssessmentResult:
+    """Predict ASD risk for a request on the event loop and submit its shadow prediction"""
+    result, submit_shadow = _predict_assessment(request, assessment_id)
+    if submit_shadow is not None:
+        submit_shadow()
+    return result
+
+# A shared cache (SQLite file or Redis) is blocking I/O: it is only used through its async
+# variants, which run in the executor. The in-process cache is read directly.
+async def _cached_assessment(assessment_id: str) -> Optional[dict]:
+    if isinstance(assessment_cache, SharedAssessmentCache):
+        return await assessment_cache.get_async(assessment_id)
+    return assessment_cache.get(assessment_id)
+
+async def _cache_assessment(assessment_id: str, assessment: dict):
+    if isinstance(assessment_cache, SharedAssessmentCache):
+        await assessment_cache.set_async(assessment_id, assessment)
+    else:
+        assessment_cache[assessment_id] = assessment
+
+async def _listed_cached_assessments(limit: int) -> List[dict]:
+    """Every assessment in the in-process cache, or the newest ``limit`` from a shared one"""
+    if isinstance(assessment_cache, SharedAssessmentCache):
+        return await assessment_cache.recent_async(limit)
+    return list(assessment_cache.values())
+
+async def _save_assessment(result: AssessmentResult, skip_existing: bool = False) -> dict:
+    """Cache the assessment and save it to the database (if available); returns the cached document.
+
+    ``skip_existing`` makes a retried save (a resumed job) a no-op when the
+    first attempt already reached the database.
+    """
+    # Cache the assessment in memory
+    document = result.model_dump()
+    await _cache_assessment(result.id, document)
+    
+    # Save to database (if available)
+    try:
+        database = get_db()
+        if database is not None:
+            if skip_existing and await database.assessments.find_one({"id": result.id}, {"_id": 0}) is not None:
+                logger.info(f"Assessment already in database: {result.id}")
+            else:
+                doc = {**document, 'timestamp': document['timestamp'].isoformat()}
+                await database.assessments.insert_one(doc)
+                logger.info(f"✅ Assessment saved to database: {result.id}")
+        else:
+            logger.info(f"⚠️  Assessment created (MongoDB unavailable): {result.id}")
+    except Exception as db_error:
+        logger.warning(f"Could not save to database: {db_error}")
+    
+    logger.info(f"✅ Assessment cached in memory: {result.id}")
+    return document
+
+@api_router.get("/uploads/{filename}")
+async def get_upload(filename: str, request: Request, w: Optional[int] = None):
+    """Serve an uploaded image, or a copy ``w`` pixels wide, with Range and conditional GET support"""
+    try:
+        path = resolve_upload(filename, UPLOADS_DIR)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if w is not None:
+        if w not in VARIANT_WIDTHS:
+            raise HTTPException(status_code=400, detail=f"w must be one of {', '.join(map(str, VARIANT_WIDTHS))}")
+        try:
+            path = await upload_variants.get(path, w)
+        except OSError as e:
+            # Pillow's UnidentifiedImageError is an OSError too
+            logger.warning(f"Could not resize {filename} to {w}px: {type(e).__name__}: {e}")
+            raise HTTPException(status_code=415, detail="Upload is not a readable image")
+    
+    # Upload names are random and never reused, so the content is immutable
+    response = cached_file_response(
+        request.headers, path, media_type_for(path), IMMUTABLE_CACHE_CONTROL, ranges=True
+    )
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
 @api_router.post("/assess", response_model=AssessmentResult)
-async def create_assessment(request: AssessmentRequest):
-    """Create a new assessment and predict ASD risk"""
+async def create_assessment(request: AssessmentRequest, mode: str = "sync"):
+    """Create a new assessment and predict ASD risk.
+
+    With ``mode=async`` the assessment is queued and a job is returned at once;
+    follow it at ``/api/jobs/{id}`` (long-poll) or ``/api/jobs/{id}/events`` (SSE).
+    """
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
     try:
         logger.info(f"Processing assessment request with demographic: {request.demographic}")
         
-        # Prepare features for prediction
-        features = {
-            'a1_score': request.behavioral.a1_score,
-            'a2_score': request.behavioral.a2_score,
-            'a3_score': request.behavioral.a3_score,
-            'a4_score': request.behavioral.a4_score,
-            'a5_score': request.behavioral.a5_score,
-            'a6_score': request.behavioral.a6_score,
-            'a7_score': request.behavioral.a7_score,
-            'a8_score': request.behavioral.a8_score,
-            'a9_score': request.behavioral.a9_score,
-            'a10_score': request.behavioral.a10_score,
-            'age': request.demographic.age,
-            'gender': request.demographic.gender,
-            'ethnicity': request.demographic.ethnicity if request.demographic.ethnicity is not None else 0,
-            'jaundice': request.demographic.jaundice,
-            'austim': request.demographic.family_history
-        }
-        
-        logger.info(f"Prediction features: {features}")
-        
-        # Get prediction
-        prediction_result = predict_asd(features)
-        logger.info(f"Prediction result: {prediction_result}")
-        
-        # Determine risk level
-        probability = prediction_result['probability']
-        if probability < 0.3:
-            risk_level = "Low"
-        elif probability < 0.6:
-            risk_level = "Moderate"
-        else:
-            risk_level = "High"
-        
-        # Create result object
-        result = AssessmentResult(
-            demographic=request.demographic.model_dump(),
-            behavioral=request.behavioral.model_dump(),
-            image_filename=request.image_filename,
-            prediction=prediction_result['prediction'],
-            probability=prediction_result['probability'],
-            confidence=prediction_result['confidence'],
-            risk_level=risk_level
-        )
+        if mode == "async":
+            job = await get_job_runner().submit("assessment", request.model_dump(mode="json"))
+            logger.info(f"📥 Assessment queued as job: {job['id']}")
+            return JSONResponse(status_code=202, content=_job_response(job))
         
-        logger.info(f"Assessment created with ID: {result.id}")
+        result = _score_assessment(request, str(uuid.uuid4()))
+        assessment = await _save_assessment(result)
         
-        # Cache the assessment in memory
-        assessment_cache[result.id] = result.model_dump()
+        # With REPORT_PRERENDER=1 the PDF is rendered in the background for the download that usually follows
+        report_prerenderer.submit(result.id, assessment)
         
-        # Save to database (if available)
-        try:
-            database = get_db()
-            if database is not None:
-                doc = result.model_dump()
-                doc['timestamp'] = doc['timestamp'].isoformat()
-                await database.assessments.insert_one(doc)
-                logger.info(f"✅ Assessment saved to MongoDB: {result.id}")
-            else:
-                logger.info(f"⚠️  Assessment created (MongoDB unavailable): {result.id}")
-        except Exception as db_error:
-            logger.warning(f"Could not save to database: {db_error}")
-        
-        # Always cache in memory for quick retrieval
-        assessment_cache[result.id] = result.model_dump()
-        logger.info(f"✅ Assessment cached in memory: {result.id}")
-        
-        return result
+        return _assessment_response(assessment)
     except HTTPException:
         raise
     except Exception as e:
@@ -293,6 +516,47 @@ async def create_assessment(request: AssessmentRequest):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error creating assessment: {str(e)}")
 
+# Assessment jobs (mode=async) run these stages; the job id is also the assessment id
+async def _score_stage(job_id: str, payload: Dict[str, Any], state: Any) -> Dict[str, Any]:
+    # Queued jobs predict in the executor, like they render, so they never hold up requests
+    loop = asyncio.get_running_loop()
+    result, submit_shadow = await loop.run_in_executor(
+        None, _predict_assessment, AssessmentRequest.model_validate(payload), job_id
+    )
+    if submit_shadow is not None:
+        submit_shadow()
+    return {"assessment": json.loads(result.model_dump_json())}
+
+async def _persist_stage(job_id: str, payload: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    await _save_assessment(AssessmentResult.model_validate(state["assessment"]), skip_existing=True)
+    return state
+
+async def _render_stage(job_id: str, payload: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    assessment = state["assessment"]
+    loop = asyncio.get_running_loop()
+    report_path = await loop.run_in_executor(None, _render_report, assessment, assessment["id"])
+    logger.info(f"✅ PDF report prerendered: {report_path}")
+    return dict(state, report_url=f"/api/assessments/{assessment['id']}/report")
+
+ASSESSMENT_PIPELINE = [("score", _score_stage), ("persist", _persist_stage), ("render", _render_stage)]
+
+# Worker coroutines per process for mode=async jobs, and the durable queue they share
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH', str(ROOT_DIR / 'data' / 'jobs.sqlite3'))
+_job_runner: Dict[str, JobRunner] = {}
+
+def get_job_runner() -> JobRunner:
+    runner = _job_runner.get('runner')
+    if runner is None:
+        runner = JobRunner(JobQueue(JOBS_DB_PATH), {"assessment": ASSESSMENT_PIPELINE}, workers=JOB_WORKERS)
+        _job_runner['runner'] = runner
+    return runner
+
+def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = public_view(job)
+    view["links"] = {"self": f"/api/jobs/{job['id']}", "events": f"/api/jobs/{job['id']}/events"}
+    return view
+
 MODELS_DIR = ROOT_DIR / 'models'
 QUESTIONNAIRE_METRICS_PATH = MODELS_DIR / 'questionnaire_metrics.json'
 IMAGE_METRICS_PATH = MODELS_DIR / 'image_metrics.json'
@@ -328,25 +592,66 @@ def _clean_json_data(obj):
         # Convert any other type to string
         return str(obj)
 
+# Serialized /model-metrics response, rebuilt only when a metrics file changes
+METRICS_CACHE_MAX_AGE = int(os.environ.get('METRICS_CACHE_MAX_AGE', '60'))
+_metrics_cache: Dict[str, Any] = {}
+
+def _metrics_signature():
+    """Identify the current metrics files by (mtime, size) so rewrites invalidate the cache."""
+    signature = []
+    for path in (QUESTIONNAIRE_METRICS_PATH, IMAGE_METRICS_PATH):
+        try:
+            stat = path.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def _serialize_metrics(payload: Dict[str, Any]) -> bytes:
+    """Serialize metrics to JSON bytes, mapping inf/nan to null."""
+    if orjson is not None:
+        # orjson already emits null for non-finite floats
+        return orjson.dumps(payload)
+    return json.dumps(_clean_json_data(payload), separators=(',', ':')).encode('utf-8')
+
+def invalidate_metrics_cache():
+    """Drop the cached metrics response (call after retraining a model)."""
+    _metrics_cache.clear()
+
+def _get_metrics_entry() -> Dict[str, Any]:
+    """Return the cached metrics body and ETag, rebuilding it if the files changed."""
+    signature = _metrics_signature()
+    entry = _metrics_cache.get('entry')
+    if entry is not None and entry['signature'] == signature:
+        return entry
+    
+    body = _serialize_metrics({
+        "questionnaire": _load_metrics_json(QUESTIONNAIRE_METRICS_PATH),
+        "image": _load_metrics_json(IMAGE_METRICS_PATH),
+    })
+    entry = {
+        'signature': signature,
+        'body': body,
+        'etag': f'"{hashlib.sha1(body).hexdigest()}"',
+    }
+    _metrics_cache['entry'] = entry
+    logger.info("Model metrics response cache rebuilt")
+    return entry
+
 @api_router.get("/model-metrics")
-async def get_model_metrics():
+async def get_model_metrics(request: Request):
     """Get model performance metrics for questionnaire and image modules (F1, confusion matrix, etc.) for graphical representation."""
     try:
-        # Load metrics files
-        questionnaire = _load_metrics_json(QUESTIONNAIRE_METRICS_PATH)
-        image = _load_metrics_json(IMAGE_METRICS_PATH)
-        
-        # Clean data to remove inf/nan values that aren't JSON compliant
-        questionnaire_clean = _clean_json_data(questionnaire) if questionnaire else None
-        image_clean = _clean_json_data(image) if image else None
-        
-        # Return response
-        result = {
-            "questionnaire": questionnaire_clean,
-            "image": image_clean,
+        entry = _get_metrics_entry()
+        headers = {
+            "ETag": entry['etag'],
+            "Cache-Control": f"public, max-age={METRICS_CACHE_MAX_AGE}, must-revalidate",
         }
         
-        return result
+        if etag_matches(request.headers.get("if-none-match"), entry['etag']):
+            return Response(status_code=304, headers=headers)
+        
+        return Response(content=entry['body'], media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -354,42 +659,176 @@ async def get_model_metrics():
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error loading model metrics: {str(e)}")
 
+@api_router.get("/metrics")
+async def get_runtime_metrics():
+    """Per-process runtime counters"""
+    return {
+        "coalescing": {flight.name: flight.snapshot() for flight in (assessment_flight, report_flight)},
+        "admission": admission.snapshot(),
+        "upload_variants": upload_variants.snapshot(),
+        "retention": garbage_collector.snapshot(),
+        "report_prerender": report_prerenderer.snapshot(),
+        "event_loop": loop_monitor.snapshot(),
+    }
+
+# Sampling profiler; off unless PROFILER_ENABLED=1, one capture at a time
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '0') == '1'
+_profiler_lock = asyncio.Lock()
+
+@api_router.get("/debug/profile")
+async def capture_profile(seconds: float = 10.0, hz: int = 100, all_threads: bool = False):
+    """Sample stacks for ``seconds`` and return them in collapsed (flamegraph) format"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILER_MAX_SECONDS:g}]")
+    if not 1 <= hz <= PROFILER_MAX_HZ:
+        raise HTTPException(status_code=400, detail=f"hz must be between 1 and {PROFILER_MAX_HZ}")
+    if _profiler_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    
+    async with _profiler_lock:
+        # By default only the event loop thread, where blocking calls hurt latency
+        thread_ids = None if all_threads else [threading.get_ident()]
+        loop = asyncio.get_running_loop()
+        counts = await loop.run_in_executor(None, sample_stacks, seconds, hz, thread_ids)
+    
+    logger.info(f"Captured {sum(counts.values())} stack samples over {seconds:g}s")
+    return PlainTextResponse(
+        collapsed(counts),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+    )
+
+@api_router.get("/models")
+async def get_model_versions():
+    """Stored model versions, current routing and production/candidate comparison (this worker)"""
+    try:
+        model_router = get_model_router()
+        return {**model_router.describe(), "versions": list_versions()}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Most assessments listed from the database and from a shared cache
+ASSESSMENTS_LIST_LIMIT = int(os.environ.get('ASSESSMENTS_LIST_LIMIT', '1000'))
+
 @api_router.get("/assessments", response_model=List[AssessmentResult])
 async def get_assessments():
     """Get all assessments"""
     # Start with cached assessments
-    assessments = list(assessment_cache.values())
+    assessments = await _listed_cached_assessments(ASSESSMENTS_LIST_LIMIT)
     
     # Try to fetch from database if available
     database = get_db()
     if database is not None:
         try:
-            db_assessments = await database.assessments.find({}, {"_id": 0}).to_list(1000)
-            # Convert timestamp strings to datetime objects
-            for assessment in db_assessments:
-                if isinstance(assessment['timestamp'], str):
-                    assessment['timestamp'] = datetime.fromisoformat(assessment['timestamp'])
+            db_assessments = await database.assessments.find({}, {"_id": 0}).to_list(ASSESSMENTS_LIST_LIMIT)
             
-            # Merge with cache, preferring database entries (more complete)
+            # Merge with cache; database-only entries are validated once here
+            # (which also parses timestamp strings) so they can be served as trusted data
             assessment_ids_in_cache = {a['id'] for a in assessments}
             for db_assessment in db_assessments:
                 if db_assessment['id'] not in assessment_ids_in_cache:
-                    assessments.append(db_assessment)
+                    assessments.append(_trusted_assessment(db_assessment))
         except Exception as e:
             logger.warning(f"Error retrieving assessments from database: {e}")
     
     # Sort by timestamp (newest first)
-    assessments.sort(key=lambda x: x['timestamp'] if isinstance(x['timestamp'], datetime) else datetime.fromisoformat(x['timestamp']), reverse=True)
+    assessments.sort(key=lambda x: x['timestamp'], reverse=True)
     
-    return assessments
+    return _assessment_response(assessments)
+
+# Short-lived cache for /assessments/stats; dashboards poll it frequently
+STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '10'))
+_stats_cache: Dict[str, Any] = {}
+
+async def _compute_assessment_stats() -> Dict[str, Any]:
+    """Aggregate in MongoDB when available, otherwise over the in-memory cache."""
+    database = get_db()
+    if database is not None:
+        try:
+            if isinstance(database, SQLiteDatabase):
+                facets = [await database.assessments.stats_facets()]
+            else:
+                facets = await database.assessments.aggregate(stats_pipeline()).to_list(1)
+            if facets:
+                return dict(format_pipeline_result(facets[0]), source="database")
+        except Exception as e:
+            logger.warning(f"Error aggregating assessments in database: {e}")
+    
+    if isinstance(assessment_cache, CompactAssessmentStore):
+        stats = stats_from_store(assessment_cache)
+    elif isinstance(assessment_cache, SharedAssessmentCache):
+        stats = stats_from_assessments(await assessment_cache.values_async())
+    else:
+        stats = stats_from_assessments(assessment_cache.values())
+    return dict(stats, source="memory")
+
+@api_router.get("/assessments/stats")
+async def get_assessment_stats():
+    """Get risk-level distribution, average probability by age band and country, and AQ positive rates"""
+    try:
+        now = time.monotonic()
+        entry = _stats_cache.get('entry')
+        if entry is None or entry['expires'] <= now:
+            stats = await _compute_assessment_stats()
+            stats['generated_at'] = datetime.now(timezone.utc).isoformat()
+            entry = {'stats': stats, 'expires': now + STATS_CACHE_TTL}
+            _stats_cache['entry'] = entry
+        return entry['stats']
+    except Exception as e:
+        logger.error(f"Error computing assessment statistics: {type(e).__name__}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error computing statistics: {str(e)}")
+
+@api_router.get("/assessments/export")
+async def export_assessments(format: str = "csv", batch_size: int = 1000):
+    """Stream all assessments as CSV or Parquet in the training dataset layout"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(sorted(EXPORT_MEDIA_TYPES))}")
+    if not 1 <= batch_size <= 10000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 10000")
+    try:
+        batches = await open_batches(get_db(), assessment_cache, batch_size)
+        chunks = export_chunks(batches, format)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    filename = f"assessments_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{format}"
+    logger.info(f"📤 Exporting assessments as {format}")
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Concurrent cache misses for the same assessment share one database read, and
+# concurrent downloads of the same report share one PDF rendering
+assessment_flight = SingleFlight("assessment")
+report_flight = SingleFlight("report")
+
+async def _load_assessment(database, assessment_id: str) -> Optional[dict]:
+    """Fetch, validate and cache an assessment from the database (one query per id at a time)"""
+    async def load():
+        assessment = await database.assessments.find_one({"id": assessment_id}, {"_id": 0})
+        if not assessment:
+            return None
+        # Validate once and cache it for future requests
+        assessment = _trusted_assessment(assessment)
+        await _cache_assessment(assessment_id, assessment)
+        return assessment
+    return await assessment_flight.do(assessment_id, load)
 
 @api_router.get("/assessments/{assessment_id}", response_model=AssessmentResult)
-async def get_assessment(assessment_id: str):
+async def get_assessment(assessment_id: str, request: Request, response: Response):
     """Get a specific assessment by ID"""
+    # Assessments are immutable: a matching ETag is answered without looking anything up
+    etag = _assessment_etag(assessment_id)
+    if is_not_modified(request.headers, etag):
+        return Response(status_code=304, headers=validator_headers(etag, None, IMMUTABLE_CACHE_CONTROL))
+    
     # Check cache first (fast retrieval)
-    if assessment_id in assessment_cache:
+    assessment = await _cached_assessment(assessment_id)
+    if assessment is not None:
         logger.info(f"✅ Retrieved assessment from cache: {assessment_id}")
-        return assessment_cache[assessment_id]
+        return _cacheable_assessment_response(request, response, assessment)
     
     # Try database if available
     database = get_db()
@@ -397,39 +836,112 @@ async def get_assessment(assessment_id: str):
         raise HTTPException(status_code=404, detail="Assessment not found")
     
     try:
-        assessment = await database.assessments.find_one({"id": assessment_id}, {"_id": 0})
+        assessment = await _load_assessment(database, assessment_id)
         
         if not assessment:
             raise HTTPException(status_code=404, detail="Assessment not found")
         
-        if isinstance(assessment['timestamp'], str):
-            assessment['timestamp'] = datetime.fromisoformat(assessment['timestamp'])
-        
-        # Cache it for future requests
-        assessment_cache[assessment_id] = assessment
-        return assessment
+        return _cacheable_assessment_response(request, response, assessment)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving assessment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
     return assessment
 
+def _report_path(assessment_id: str, locale: str = DEFAULT_LOCALE) -> Path:
+    if locale == DEFAULT_LOCALE:
+        return REPORTS_DIR / f"assessment_{assessment_id}.pdf"
+    return REPORTS_DIR / f"assessment_{assessment_id}.{locale}.pdf"
+
+def _render_report(assessment: dict, assessment_id: str, locale: str = DEFAULT_LOCALE) -> Path:
+    """Generate the PDF next to its final path and move it into place, so readers never see a partial file"""
+    report_path = _report_path(assessment_id, locale)
+    tmp_path = report_path.with_name(f"{report_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        generate_pdf_report(assessment_id, _report_payload(assessment, assessment_id), str(tmp_path), locale=locale)
+        os.replace(tmp_path, report_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return report_path
+
+# Renders new reports in the background when REPORT_PRERENDER=1
+report_prerenderer = Prerenderer(_render_report, report_flight)
+
+def _report_payload(assessment: dict, assessment_id: str) -> dict:
+    """Assessment fields for PDF generation, with defaults for anything missing"""
+    assessment_for_pdf = {
+        "id": assessment.get("id", assessment_id),
+        "demographic": assessment.get("demographic", {}),
+        "behavioral": assessment.get("behavioral", {}),
+        "risk_level": assessment.get("risk_level", "Unknown"),
+        "probability": assessment.get("probability", 0.0),
+        "calibrated_probability": assessment.get("calibrated_probability"),
+        "confidence": assessment.get("confidence", 0.0),
+        "base_probability": assessment.get("base_probability"),
+        "feature_contributions": assessment.get("feature_contributions"),
+        "timestamp": assessment.get("timestamp", datetime.now(timezone.utc).isoformat())
+    }
+    
+    # Validate demographic data
+    if not assessment_for_pdf["demographic"]:
+        assessment_for_pdf["demographic"] = {
+            "age": 0, 
+            "gender": 0, 
+            "ethnicity": 0, 
+            "country": "Unknown", 
+            "jaundice": 0, 
+            "family_history": 0, 
+            "respondent": "Unknown"
+        }
+    
+    # Validate behavioral data
+    if not assessment_for_pdf["behavioral"]:
+        assessment_for_pdf["behavioral"] = {
+            f"a{i}_score": 0 for i in range(1, 11)
+        }
+    return assessment_for_pdf
+
 @api_router.get("/assessments/{assessment_id}/report")
-async def download_report(assessment_id: str):
-    """Generate and download PDF report for an assessment"""
+async def download_report(assessment_id: str, request: Request, lang: str = DEFAULT_LOCALE):
+    """Generate and download PDF report for an assessment, in English (default), Hindi (hi) or Marathi (mr)"""
     assessment = None
+    # Catalogs and fonts are loaded once per process; a language without its font is refused
+    try:
+        get_report_locale(lang)
+    except LocaleUnavailable as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    suffix = "" if lang == DEFAULT_LOCALE else f"_{lang}"
+    filename = f"ASD_Assessment_Report_{assessment_id}{suffix}.pdf"
+    # Prerendered reports are English; other languages are rendered on first download
+    prerendered = lang == DEFAULT_LOCALE
+    flight_key = assessment_id if prerendered else (assessment_id, lang)
     
     try:
+        # A rendered report never changes: serve or revalidate it without looking up the assessment
+        try:
+            response = cached_file_response(
+                request.headers, _report_path(assessment_id, lang), "application/pdf", IMMUTABLE_CACHE_CONTROL, filename
+            )
+            logger.info(f"✅ Serving rendered PDF report for {assessment_id} ({lang}, {response.status_code})")
+            if prerendered:
+                report_prerenderer.record_ready(assessment_id)
+            return response
+        except FileNotFoundError:
+            pass
+        
         # Check cache first (fast retrieval)
-        if assessment_id in assessment_cache:
-            assessment = assessment_cache[assessment_id]
+        assessment = await _cached_assessment(assessment_id)
+        if assessment is not None:
             logger.info(f"✅ Retrieved assessment from cache for report: {assessment_id}")
         else:
             # Try database if available
             database = get_db()
             if database is not None:
                 try:
-                    assessment = await database.assessments.find_one({"id": assessment_id}, {"_id": 0})
+                    assessment = await _load_assessment(database, assessment_id)
                     if assessment:
                         logger.info(f"✅ Retrieved assessment from database for report: {assessment_id}")
                 except Exception as db_error:
@@ -440,40 +952,26 @@ async def download_report(assessment_id: str):
             logger.warning(f"Assessment not found: {assessment_id}")
             raise HTTPException(status_code=404, detail=f"Assessment {assessment_id} not found")
         
-        # Ensure assessment has all required fields for PDF generation
-        assessment_for_pdf = {
-            "id": assessment.get("id", assessment_id),
-            "demographic": assessment.get("demographic", {}),
-            "behavioral": assessment.get("behavioral", {}),
-            "risk_level": assessment.get("risk_level", "Unknown"),
-            "probability": assessment.get("probability", 0.0),
-            "confidence": assessment.get("confidence", 0.0),
-            "timestamp": assessment.get("timestamp", datetime.now(timezone.utc).isoformat())
-        }
-        
-        # Validate demographic data
-        if not assessment_for_pdf["demographic"]:
-            assessment_for_pdf["demographic"] = {
-                "age": 0, 
-                "gender": 0, 
-                "ethnicity": 0, 
-                "country": "Unknown", 
-                "jaundice": 0, 
-                "family_history": 0, 
-                "respondent": "Unknown"
-            }
-        
-        # Validate behavioral data
-        if not assessment_for_pdf["behavioral"]:
-            assessment_for_pdf["behavioral"] = {
-                f"a{i}_score": 0 for i in range(1, 11)
-            }
-        
         logger.info(f"Generating PDF report for assessment: {assessment_id}")
         
-        # Generate PDF report
+        # Generate PDF report; concurrent downloads of the same report share one rendering.
+        # Only the rendering itself is rate limited: 304s, rendered files above and
+        # downloads joining a rendering already in flight cost nothing.
         try:
-            report_path = generate_pdf_report(assessment_id, assessment_for_pdf)
+            async def render():
+                async with admission.guard("report", request.scope):
+                    # An earlier rendering may have finished while this one waited for a slot
+                    report_path = _report_path(assessment_id, lang)
+                    if report_path.exists():
+                        return report_path
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(None, _render_report, assessment, assessment_id, lang)
+            if prerendered:
+                report_prerenderer.record_render(assessment_id)
+            try:
+                report_path = await report_flight.do(flight_key, render)
+            except Rejected as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
             
             if not Path(report_path).exists():
                 logger.error(f"PDF file was not created: {report_path}")
@@ -482,10 +980,8 @@ async def download_report(assessment_id: str):
             logger.info(f"✅ PDF report generated successfully: {report_path}")
             
             # Return file
-            return FileResponse(
-                report_path,
-                media_type="application/pdf",
-                filename=f"ASD_Assessment_Report_{assessment_id}.pdf"
+            return cached_file_response(
+                request.headers, report_path, "application/pdf", IMMUTABLE_CACHE_CONTROL, filename
             )
         except HTTPException:
             raise
@@ -499,6 +995,54 @@ async def download_report(assessment_id: str):
         logger.error(f"❌ Unexpected error in report endpoint: {type(e).__name__}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# Longest wait a long-poll request may ask for, and the SSE keep-alive interval
+JOB_MAX_WAIT = 60.0
+SSE_KEEPALIVE_SECONDS = 15.0
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, since: int = -1, wait: float = 0.0):
+    """Job status; with ``wait`` > 0, long-poll until the job changes past ``since`` or finishes"""
+    runner = get_job_runner()
+    if wait > 0:
+        job = await runner.wait(job_id, since, min(wait, JOB_MAX_WAIT))
+    else:
+        job = await runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _job_response(job)
+
+@api_router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-Sent Events stream of job progress; ends once the job is done or failed"""
+    runner = get_job_runner()
+    if await runner.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    try:
+        since = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        since = -1
+    
+    async def stream():
+        nonlocal since
+        while True:
+            job = await runner.wait(job_id, since, SSE_KEEPALIVE_SECONDS)
+            if job is None or await request.is_disconnected():
+                return
+            if job["seq"] > since:
+                since = job["seq"]
+                event = job["status"] if job["status"] in TERMINAL_STATUSES else "progress"
+                yield f"id: {since}\nevent: {event}\ndata: {json.dumps(_job_response(job))}\n\n"
+                if job["status"] in TERMINAL_STATUSES:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 app.include_router(api_router)
 
 app.add_middleware(
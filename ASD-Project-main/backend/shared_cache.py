@@ -0,0 +1,347 @@
+"""
+Assessment cache backends that can be shared between worker processes.
+
+With several gunicorn/uvicorn workers the default in-process cache is not
+enough: an assessment created on one worker would 404 on another when
+MongoDB is unavailable. ``create_assessment_cache`` picks the backend from
+``ASSESSMENT_CACHE_URL``:
+
+    memory (default)                 CompactAssessmentStore, per process
+    sqlite:////var/tmp/asd.sqlite3   local SQLite file in WAL mode
+    redis://localhost:6379/0         Redis or any Redis-compatible server
+
+The SQLite and Redis caches are bounded. They keep at most
+``ASSESSMENT_CACHE_MAX_ENTRIES`` assessments (default 10000, oldest evicted
+first). Entries older than ``ASSESSMENT_CACHE_TTL_HOURS`` (default 24) are
+dropped, so a file left over from an earlier run does not serve stale data.
+
+All backends expose the same mapping interface as the in-process cache.
+Every access to a shared backend is blocking I/O, so ``SharedAssessmentCache``
+adds ``*_async`` variants that run it in the default executor; request
+handlers use those and never touch the file or the network on the event
+loop. ``recent`` returns the newest entries without reading the whole cache.
+"""
+
+import abc
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .assessment_store import CompactAssessmentStore
+except ImportError:
+    from assessment_store import CompactAssessmentStore
+
+CACHE_MAX_ENTRIES = int(os.environ.get('ASSESSMENT_CACHE_MAX_ENTRIES', '10000'))
+CACHE_TTL_SECONDS = float(os.environ.get('ASSESSMENT_CACHE_TTL_HOURS', '24')) * 3600
+# A SQLite cache is pruned at startup, then after this many writes or seconds (per process)
+PRUNE_EVERY_WRITES = 100
+PRUNE_EVERY_SECONDS = 60.0
+
+
+def _dumps(assessment: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(assessment)
+    return json.dumps(assessment, default=lambda value: value.isoformat()).encode('utf-8')
+
+
+def _loads(data) -> Dict[str, Any]:
+    assessment = orjson.loads(data) if orjson is not None else json.loads(data)
+    if isinstance(assessment.get('timestamp'), str):
+        assessment['timestamp'] = datetime.fromisoformat(assessment['timestamp'])
+    return assessment
+
+
+def _created(assessment: Dict[str, Any]) -> float:
+    """Assessment timestamp as seconds since the epoch, for ordering (0 when missing)."""
+    timestamp = assessment.get('timestamp')
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return 0.0
+    return timestamp.timestamp() if isinstance(timestamp, datetime) else 0.0
+
+
+class SharedAssessmentCache(MutableMapping, abc.ABC):
+    """Base for caches outside the process, with async variants that keep I/O off the event loop."""
+
+    @abc.abstractmethod
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` newest assessments, newest first."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_many(self, assessment_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Assessments for the ids still cached, in one round trip."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def image_filenames(self) -> Set[str]:
+        """Upload names referenced by cached assessments."""
+        raise NotImplementedError
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args))
+
+    async def get_async(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.get, assessment_id)
+
+    async def set_async(self, assessment_id: str, assessment: Dict[str, Any]):
+        await self._run(self.__setitem__, assessment_id, assessment)
+
+    async def ids_async(self) -> List[str]:
+        return await self._run(list, self)
+
+    async def values_async(self) -> List[Dict[str, Any]]:
+        return await self._run(self.values)
+
+    async def recent_async(self, limit: int) -> List[Dict[str, Any]]:
+        return await self._run(self.recent, limit)
+
+    async def get_many_async(self, assessment_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return await self._run(self.get_many, list(assessment_ids))
+
+    async def image_filenames_async(self) -> Set[str]:
+        return await self._run(self.image_filenames)
+
+
+class SQLiteAssessmentCache(SharedAssessmentCache):
+    """Assessment cache in a local SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._prune_lock = threading.Lock()
+        self._writes = 0
+        self._pruned_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS assessment_cache ('
+                         'id TEXT PRIMARY KEY, doc BLOB NOT NULL)')
+            # Columns added after the first release: files from older versions are migrated in place
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(assessment_cache)')}
+            if 'created' not in columns:
+                conn.execute('ALTER TABLE assessment_cache ADD COLUMN created REAL NOT NULL DEFAULT 0')
+            if 'image_filename' not in columns:
+                conn.execute('ALTER TABLE assessment_cache ADD COLUMN image_filename TEXT')
+            if 'stored_at' not in columns:
+                conn.execute('ALTER TABLE assessment_cache ADD COLUMN stored_at REAL NOT NULL DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS assessment_cache_created ON assessment_cache (created)')
+            conn.execute('CREATE INDEX IF NOT EXISTS assessment_cache_stored_at ON assessment_cache (stored_at)')
+        self.prune()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __getitem__(self, assessment_id: str) -> Dict[str, Any]:
+        row = self._connect().execute(
+            'SELECT doc FROM assessment_cache WHERE id = ?', (assessment_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(assessment_id)
+        return _loads(row[0])
+
+    def __setitem__(self, assessment_id: str, assessment: Dict[str, Any]):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO assessment_cache (id, doc, created, image_filename, stored_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (assessment_id, _dumps(assessment), _created(assessment), assessment.get('image_filename'), time.time())
+        )
+        with self._prune_lock:
+            self._writes += 1
+            due = (self._writes >= PRUNE_EVERY_WRITES
+                   or time.monotonic() - self._pruned_at >= PRUNE_EVERY_SECONDS)
+        if due:
+            self.prune()
+
+    def __delitem__(self, assessment_id: str):
+        cursor = self._connect().execute('DELETE FROM assessment_cache WHERE id = ?', (assessment_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(assessment_id)
+
+    def __contains__(self, assessment_id) -> bool:
+        return self._connect().execute(
+            'SELECT 1 FROM assessment_cache WHERE id = ?', (assessment_id,)
+        ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for (assessment_id,) in self._connect().execute('SELECT id FROM assessment_cache'):
+            yield assessment_id
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM assessment_cache').fetchone()[0]
+
+    def values(self):
+        return [_loads(doc) for (doc,) in self._connect().execute('SELECT doc FROM assessment_cache')]
+
+    def prune(self) -> int:
+        """Drop entries past the TTL, then the oldest ones over ``max_entries``; returns how many."""
+        with self._prune_lock:
+            self._writes = 0
+            self._pruned_at = time.monotonic()
+        conn = self._connect()
+        removed = 0
+        if self.ttl > 0:
+            removed += conn.execute(
+                'DELETE FROM assessment_cache WHERE stored_at < ?', (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_entries > 0:
+            removed += conn.execute(
+                'DELETE FROM assessment_cache WHERE id IN (SELECT id FROM assessment_cache '
+                'ORDER BY stored_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            ).rowcount
+        return removed
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            'SELECT doc FROM assessment_cache ORDER BY created DESC LIMIT ?', (limit,)
+        )
+        return [_loads(doc) for (doc,) in rows]
+
+    def get_many(self, assessment_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        assessment_ids = list(assessment_ids)
+        assessments = []
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(assessment_ids), 500):
+            chunk = assessment_ids[start:start + 500]
+            rows = self._connect().execute(
+                f"SELECT doc FROM assessment_cache WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            assessments.extend(_loads(doc) for (doc,) in rows)
+        return assessments
+
+    def image_filenames(self) -> Set[str]:
+        rows = self._connect().execute(
+            'SELECT DISTINCT image_filename FROM assessment_cache WHERE image_filename IS NOT NULL'
+        )
+        return {name for (name,) in rows if name}
+
+
+class RedisAssessmentCache(SharedAssessmentCache):
+    """Assessment cache in Redis, for workers spread over several hosts.
+
+    Documents live in the hash ``key``; the sorted set ``key:created`` orders
+    them by assessment time and the hash ``key:images`` holds their upload
+    names, so listings and retention never read every document. Each write
+    trims the oldest assessments over ``max_entries`` and pushes the expiry
+    of all three keys ``ttl`` seconds out.
+    """
+
+    def __init__(self, url: str, key: str = 'asd:assessments',
+                 max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("ASSESSMENT_CACHE_URL uses redis:// but the 'redis' package is not installed")
+        self._redis = redis.Redis.from_url(url)
+        self._key = key
+        self._created_key = f'{key}:created'
+        self._images_key = f'{key}:images'
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def __getitem__(self, assessment_id: str) -> Dict[str, Any]:
+        data = self._redis.hget(self._key, assessment_id)
+        if data is None:
+            raise KeyError(assessment_id)
+        return _loads(data)
+
+    def __setitem__(self, assessment_id: str, assessment: Dict[str, Any]):
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key, assessment_id, _dumps(assessment))
+        pipe.zadd(self._created_key, {assessment_id: _created(assessment)})
+        if assessment.get('image_filename'):
+            pipe.hset(self._images_key, assessment_id, assessment['image_filename'])
+        else:
+            pipe.hdel(self._images_key, assessment_id)
+        if self.ttl > 0:
+            for key in (self._key, self._created_key, self._images_key):
+                pipe.expire(key, int(self.ttl))
+        pipe.execute()
+        if self.max_entries > 0:
+            self._trim()
+
+    def _trim(self):
+        excess = self._redis.zcard(self._created_key) - self.max_entries
+        if excess <= 0:
+            return
+        evicted = self._redis.zrange(self._created_key, 0, excess - 1)
+        if evicted:
+            pipe = self._redis.pipeline()
+            pipe.zrem(self._created_key, *evicted)
+            pipe.hdel(self._key, *evicted)
+            pipe.hdel(self._images_key, *evicted)
+            pipe.execute()
+
+    def __delitem__(self, assessment_id: str):
+        pipe = self._redis.pipeline()
+        pipe.hdel(self._key, assessment_id)
+        pipe.zrem(self._created_key, assessment_id)
+        pipe.hdel(self._images_key, assessment_id)
+        if not pipe.execute()[0]:
+            raise KeyError(assessment_id)
+
+    def __contains__(self, assessment_id) -> bool:
+        return bool(self._redis.hexists(self._key, assessment_id))
+
+    def __iter__(self) -> Iterator[str]:
+        for assessment_id in self._redis.hkeys(self._key):
+            yield assessment_id.decode('utf-8')
+
+    def __len__(self) -> int:
+        return self._redis.hlen(self._key)
+
+    def values(self):
+        return [_loads(doc) for doc in self._redis.hvals(self._key)]
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        return self.get_many(
+            assessment_id.decode('utf-8') for assessment_id in self._redis.zrevrange(self._created_key, 0, limit - 1)
+        )
+
+    def get_many(self, assessment_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        assessment_ids = list(assessment_ids)
+        if not assessment_ids:
+            return []
+        return [_loads(doc) for doc in self._redis.hmget(self._key, assessment_ids) if doc is not None]
+
+    def image_filenames(self) -> Set[str]:
+        return {name.decode('utf-8') for name in self._redis.hvals(self._images_key)}
+
+
+def create_assessment_cache(url: Optional[str] = None):
+    """Create the assessment cache configured by ``url`` or ``ASSESSMENT_CACHE_URL``."""
+    if url is None:
+        url = os.environ.get('ASSESSMENT_CACHE_URL', 'memory')
+    if not url or url == 'memory':
+        return CompactAssessmentStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteAssessmentCache(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisAssessmentCache(url)
+    raise ValueError(f"Unsupported ASSESSMENT_CACHE_URL: {url}")
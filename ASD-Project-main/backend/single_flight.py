@@ -0,0 +1,61 @@
+"""
+Single-flight coalescing of concurrent identical work.
+
+When many clients open the same dashboard, they request the same assessment
+and report at the same moment. Without coalescing, every request that misses
+the cache queries the database and renders the PDF on its own.
+``SingleFlight.do(key, fn)`` runs ``fn`` once per key at a time, and every
+caller that arrives while it is running awaits the same result or exception.
+Nothing is cached after the call finishes; that stays the job of the regular
+caches.
+
+The shared call runs as its own task and callers await it through
+``asyncio.shield``, so a client that disconnects does not cancel the work the
+others are waiting for.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Per-key deduplication of in-flight coroutine calls, with counters."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.get_running_loop().create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'coalesced_ratio': self.coalesced / self.calls if self.calls else 0.0,
+            'in_flight': self.in_flight,
+        }
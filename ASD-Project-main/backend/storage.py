@@ -0,0 +1,367 @@
+"""
+Embedded SQLite persistence backend.
+
+When ``STORAGE_BACKEND=sqlite`` the server's ``get_db()`` returns a
+``SQLiteDatabase`` instead of a Motor database, so small deployments keep
+their assessments across restarts without running MongoDB. It implements
+the subset of the Motor collection API the server uses (``insert_one``,
+``insert_many``, ``find``, ``find_one``, ``count_documents``), so call sites
+don't need to know which backend is active.
+
+* The database runs in WAL mode, so readers never block the writer.
+* Every blocking call runs in the default thread pool on a per-thread
+  connection, keeping the event loop free.
+* Concurrent ``insert_one`` calls are group-committed: whatever arrives
+  while a write is in progress goes into the next single transaction.
+* ``id`` is the primary key; ``timestamp`` and ``risk_level`` are indexed.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from .assessment_stats import AQ_KEYS, AGE_BAND_BOUNDARIES, UNKNOWN_BAND
+except ImportError:
+    from assessment_stats import AQ_KEYS, AGE_BAND_BOUNDARIES, UNKNOWN_BAND
+
+# Top-level fields that are stored in their own columns and can be filtered/sorted on
+INDEXED_FIELDS = ('id', 'timestamp', 'risk_level')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    risk_level TEXT,
+    probability REAL,
+    age INTEGER,
+    country TEXT,
+    aq_bits INTEGER,
+    doc BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_timestamp ON assessments (timestamp);
+CREATE INDEX IF NOT EXISTS idx_assessments_risk_level ON assessments (risk_level);
+"""
+
+
+def _dumps(document: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(document)
+    return json.dumps(document, default=str).encode('utf-8')
+
+
+def _loads(data) -> Dict[str, Any]:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _row_values(document: Dict[str, Any]) -> Tuple:
+    """Column values for a document (the full document is kept in ``doc``)."""
+    demographic = document.get('demographic') or {}
+    behavioral = document.get('behavioral') or {}
+    timestamp = document.get('timestamp')
+    if timestamp is not None and not isinstance(timestamp, str):
+        timestamp = timestamp.isoformat()
+    aq_bits = sum(1 << bit for bit, key in enumerate(AQ_KEYS) if behavioral.get(key) == 1)
+    return (
+        document['id'], timestamp, document.get('risk_level'), document.get('probability'),
+        demographic.get('age'), demographic.get('country'), aq_bits, _dumps(document),
+    )
+
+
+def _where(filter: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """Translate an equality filter on indexed fields into a WHERE clause."""
+    if not filter:
+        return '', []
+    clauses, params = [], []
+    for field, value in filter.items():
+        if field not in INDEXED_FIELDS or isinstance(value, dict):
+            raise ValueError(f"SQLite backend only supports equality filters on {INDEXED_FIELDS}, got {field!r}")
+        clauses.append(f'{field} = ?')
+        params.append(value)
+    return ' WHERE ' + ' AND '.join(clauses), params
+
+
+class SQLiteCursor:
+    """Lazy query result supporting ``sort``/``limit``/``batch_size``, ``to_list`` and ``async for``."""
+
+    def __init__(self, collection: 'SQLiteCollection', filter: Optional[Dict[str, Any]] = None):
+        self._collection = collection
+        self._filter = filter
+        self._sort: Optional[Tuple[str, int]] = None
+        self._limit = 0
+        self._batch_size = 1000
+
+    def sort(self, key: str, direction: int = 1) -> 'SQLiteCursor':
+        if key not in INDEXED_FIELDS:
+            raise ValueError(f"SQLite backend can only sort on {INDEXED_FIELDS}, got {key!r}")
+        self._sort = (key, direction)
+        return self
+
+    def limit(self, limit: int) -> 'SQLiteCursor':
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> 'SQLiteCursor':
+        self._batch_size = max(int(batch_size), 1)
+        return self
+
+    def _order_by(self) -> str:
+        if self._sort is None:
+            return ' ORDER BY rowid'
+        key, direction = self._sort
+        return f" ORDER BY {key} {'DESC' if direction < 0 else 'ASC'}, rowid"
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        limit = min(x for x in (length, self._limit) if x) if (length or self._limit) else None
+        where, params = _where(self._filter)
+        sql = 'SELECT doc FROM assessments' + where + self._order_by()
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        rows = await self._collection._run(self._collection._fetch_all, sql, params)
+        return [_loads(doc) for (doc,) in rows]
+
+    async def __aiter__(self):
+        # Keyset pagination: each batch is an independent query, so no SQLite
+        # cursor has to stay open across threads or awaits.
+        where, params = _where(self._filter)
+        key, direction = self._sort if self._sort else ('rowid', 1)
+        comparison = '<' if direction < 0 else '>'
+        last = None
+        remaining = self._limit or None
+        while True:
+            clauses = [where[len(' WHERE '):]] if where else []
+            batch_params = list(params)
+            if last is not None:
+                if key == 'rowid':
+                    clauses.append('rowid > ?')
+                    batch_params.append(last[1])
+                else:
+                    clauses.append(f'({key} {comparison} ? OR ({key} IS ? AND rowid > ?))')
+                    batch_params.extend([last[0], last[0], last[1]])
+            size = min(self._batch_size, remaining) if remaining else self._batch_size
+            sql = (f'SELECT {key}, rowid, doc FROM assessments'
+                   + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+                   + self._order_by() + ' LIMIT ?')
+            batch_params.append(size)
+            rows = await self._collection._run(self._collection._fetch_all, sql, batch_params)
+            for _, _, doc in rows:
+                yield _loads(doc)
+            if remaining:
+                remaining -= len(rows)
+                if remaining <= 0:
+                    return
+            if len(rows) < size:
+                return
+            last = rows[-1][:2]
+
+
+class _GroupCommitWriter:
+    """Collects concurrent inserts and writes each group in one transaction."""
+
+    def __init__(self, collection: 'SQLiteCollection', max_batch: int = 1000):
+        self._collection = collection
+        self._max_batch = max_batch
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+        # The loop only keeps a weak reference to tasks; hold the running flush here
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def submit(self, documents: List[Dict[str, Any]]):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((documents, future))
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush())
+        await future
+
+    async def _flush(self):
+        try:
+            while self._pending:
+                batch, size = [], 0
+                while self._pending and (not batch or size + len(self._pending[0][0]) <= self._max_batch):
+                    documents, future = self._pending.pop(0)
+                    batch.append((documents, future))
+                    size += len(documents)
+                try:
+                    await self._collection._run(self._collection._insert_rows, [d for docs, _ in batch for d in docs])
+                    results = [None] * len(batch)
+                except sqlite3.IntegrityError:
+                    # A duplicate id fails the whole transaction; retry per request so
+                    # only the offending insert sees the error.
+                    results = []
+                    for documents, _ in batch:
+                        try:
+                            await self._collection._run(self._collection._insert_rows, documents)
+                            results.append(None)
+                        except Exception as e:
+                            results.append(e)
+                except Exception as e:
+                    results = [e] * len(batch)
+                for (_, future), error in zip(batch, results):
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+        finally:
+            self._flush_task = None
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class SQLiteCollection:
+    """The ``assessments`` collection stored in a SQLite table."""
+
+    def __init__(self, database: 'SQLiteDatabase'):
+        self._database = database
+        self._writer = _GroupCommitWriter(self)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _fetch_all(self, sql: str, params: Iterable[Any]) -> List[Tuple]:
+        return self._database.connection().execute(sql, list(params)).fetchall()
+
+    def _insert_rows(self, documents: List[Dict[str, Any]]):
+        conn = self._database.connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO assessments (id, timestamp, risk_level, probability, age, country, aq_bits, doc) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [_row_values(document) for document in documents]
+            )
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        await self._writer.submit([document])
+        return InsertOneResult(document['id'])
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]]) -> InsertManyResult:
+        documents = list(documents)
+        if documents:
+            await self._run(self._insert_rows, documents)
+        return InsertManyResult([document['id'] for document in documents])
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> SQLiteCursor:
+        # Documents never carry a Mongo "_id", so the usual {"_id": 0} projection is a no-op
+        return SQLiteCursor(self, filter)
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None,
+                       projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        documents = await self.find(filter, projection).to_list(1)
+        return documents[0] if documents else None
+
+    async def count_documents(self, filter: Optional[Dict[str, Any]] = None) -> int:
+        where, params = _where(filter)
+        rows = await self._run(self._fetch_all, 'SELECT COUNT(*) FROM assessments' + where, params)
+        return rows[0][0]
+
+    async def delete_many(self, filter: Optional[Dict[str, Any]] = None) -> int:
+        where, params = _where(filter)
+
+        def _delete():
+            conn = self._database.connection()
+            with conn:
+                return conn.execute('DELETE FROM assessments' + where, params).rowcount
+
+        return await self._run(_delete)
+
+    def _stats_facets(self) -> Dict[str, Any]:
+        conn = self._database.connection()
+        count, average = conn.execute('SELECT COUNT(*), AVG(probability) FROM assessments').fetchone()
+        if count == 0:
+            return {'totals': [], 'risk_levels': [], 'by_age_band': [], 'by_country': [], 'aq_positive_rates': []}
+
+        band_cases = ' '.join(
+            f'WHEN age >= {lower} AND age < {upper} THEN {lower}'
+            for lower, upper in zip(AGE_BAND_BOUNDARIES, AGE_BAND_BOUNDARIES[1:])
+        )
+        bands = conn.execute(
+            f'SELECT CASE {band_cases} ELSE NULL END AS band, COUNT(*), AVG(probability) '
+            'FROM assessments GROUP BY band ORDER BY band IS NULL, band'
+        ).fetchall()
+        rates = conn.execute(
+            'SELECT ' + ', '.join(f'AVG((aq_bits >> {bit}) & 1)' for bit in range(len(AQ_KEYS)))
+            + ' FROM assessments'
+        ).fetchone()
+        return {
+            'totals': [{'count': count, 'average_probability': average}],
+            'risk_levels': [
+                {'_id': risk_level, 'count': n}
+                for risk_level, n in conn.execute('SELECT risk_level, COUNT(*) FROM assessments GROUP BY risk_level')
+            ],
+            'by_age_band': [
+                {'_id': UNKNOWN_BAND if band is None else band, 'count': n, 'average_probability': avg}
+                for band, n, avg in bands
+            ],
+            'by_country': [
+                {'_id': country, 'count': n, 'average_probability': avg}
+                for country, n, avg in conn.execute(
+                    'SELECT country, COUNT(*) AS n, AVG(probability) FROM assessments '
+                    'GROUP BY country ORDER BY n DESC, country'
+                )
+            ],
+            'aq_positive_rates': [dict(zip(AQ_KEYS, rates))],
+        }
+
+    async def stats_facets(self) -> Dict[str, Any]:
+        """Statistics grouped in SQL, in the same shape as the MongoDB ``$facet`` stats pipeline."""
+        return await self._run(self._stats_facets)
+
+
+class SQLiteDatabase:
+    """Motor-like database handle backed by a single SQLite file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self.connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        self.assessments = SQLiteCollection(self)
+
+    def connection(self) -> sqlite3.Connection:
+        """Connection for the calling thread (re-opened after a fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+def add_database_arguments(parser):
+    """Storage options for the command-line tools, defaulting to the server's environment."""
+    parser.add_argument('--storage', choices=('mongo', 'sqlite'),
+                        default=os.environ.get('STORAGE_BACKEND', 'mongo').lower())
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'asd_db'))
+    parser.add_argument('--sqlite-path', default=os.environ.get(
+        'SQLITE_DB_PATH', str(Path(__file__).parent / 'data' / 'asd.sqlite3')))
+
+
+def open_database(args):
+    """The database selected by ``add_database_arguments`` options."""
+    if args.storage == 'sqlite':
+        return SQLiteDatabase(args.sqlite_path)
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(args.mongo_url, serverSelectionTimeoutMS=5000)[args.db_name]
@@ -0,0 +1,301 @@
+"""
+Hyperparameter search for the questionnaire model.
+
+Every candidate (random forest or gradient boosting, over a small parameter
+grid) is scored with stratified k-fold cross-validation on the training
+split. The test split stays held out, using the same 80/20 split as
+``train_model``. Folds run in parallel on all cores with joblib. Each finished
+fold is written to ``data/.cache/tuning/``, so an interrupted search picks up
+where it stopped and a rerun only fits what changed.
+
+Accuracy is not the only criterion: each candidate is then refitted on the
+training split and its single-row latency is measured the way it would be
+served (the compact forest for random forests, sklearn otherwise). The
+selected model is the best cross-validated F1 whose p99 latency fits the
+budget.
+
+    python -m backend.tune_model --latency-budget-ms 0.5
+    python -m backend.tune_model --models random_forest --train-version tuned
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from . import ml_model
+    from .compact_model import build_compact_forest, check_parity
+    from .dataset import DATASET_CACHE_DIR, feature_matrix
+except ImportError:
+    import ml_model
+    from compact_model import build_compact_forest, check_parity
+    from dataset import DATASET_CACHE_DIR, feature_matrix
+
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [6, 10, None],
+    },
+    'gradient_boosting': {
+        'n_estimators': [100, 200],
+        'max_depth': [2, 3],
+        'learning_rate': [0.05, 0.1],
+    },
+}
+
+TUNING_CACHE_DIR = DATASET_CACHE_DIR / 'tuning'
+RESULTS_PATH = ml_model.MODELS_DIR / 'tuning_results.json'
+
+DEFAULT_FOLDS = 5
+
+# p99 single-row latency a candidate must meet to be selected
+DEFAULT_LATENCY_BUDGET_MS = 1.0
+
+# Single-row predictions timed per candidate
+LATENCY_SAMPLES = 1000
+
+# Bump when fold results are computed differently so old cache entries are ignored
+CACHE_FORMAT = 1
+
+
+def candidates(models: Sequence[str], search_spaces: Optional[Dict[str, Dict[str, list]]] = None) -> List[Dict[str, Any]]:
+    """Every ``{'model', 'params'}`` combination in the search spaces of ``models``."""
+    from sklearn.model_selection import ParameterGrid
+
+    search_spaces = search_spaces or SEARCH_SPACES
+    result = []
+    for model in models:
+        if model not in search_spaces:
+            raise ValueError(f"Unknown model {model!r}; choose from {', '.join(search_spaces)}")
+        for params in ParameterGrid(search_spaces[model]):
+            result.append({'model': model, 'params': dict(sorted(params.items()))})
+    return result
+
+
+def make_estimator(model: str, params: Dict[str, Any], random_state: int = 42):
+    if model == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=random_state, **params)
+    if model == 'gradient_boosting':
+        from sklearn.ensemble import GradientBoostingClassifier
+        return GradientBoostingClassifier(random_state=random_state, **params)
+    raise ValueError(f"Unknown model {model!r}")
+
+
+def candidate_name(candidate: Dict[str, Any]) -> str:
+    params = ','.join(f"{key}={value}" for key, value in candidate['params'].items())
+    return f"{candidate['model']}({params})"
+
+
+def fold_key(data_digest: str, candidate: Dict[str, Any], fold: int, folds: int, random_state: int) -> str:
+    payload = json.dumps([CACHE_FORMAT, data_digest, candidate, fold, folds, random_state], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+def evaluate_fold(candidate: Dict[str, Any], X: np.ndarray, y: np.ndarray, train_index: np.ndarray,
+                  validation_index: np.ndarray, random_state: int, cache_path: Optional[Path] = None) -> Dict[str, Any]:
+    """Fit on one fold's training rows, score its validation rows and cache the result."""
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X[train_index])
+    estimator = make_estimator(candidate['model'], candidate['params'], random_state)
+    start = time.perf_counter()
+    estimator.fit(scaler.transform(X[train_index]), y[train_index])
+    fit_seconds = time.perf_counter() - start
+    probability = estimator.predict_proba(scaler.transform(X[validation_index]))[:, 1]
+    predicted = (probability > 0.5).astype(int)
+    y_validation = y[validation_index]
+    result = {
+        'accuracy': float(accuracy_score(y_validation, predicted)),
+        'f1': float(f1_score(y_validation, predicted)),
+        'roc_auc': float(roc_auc_score(y_validation, probability)),
+        'fit_seconds': fit_seconds,
+    }
+    if cache_path is not None:
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, cache_path)
+    return result
+
+
+def _read_cached(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, candidate_list: List[Dict[str, Any]], folds: int = DEFAULT_FOLDS,
+                   n_jobs: int = -1, cache_dir=None, random_state: int = 42) -> List[Dict[str, Any]]:
+    """Mean and std of each fold metric per candidate; cached folds are not refitted."""
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else TUNING_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_digest = hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest()
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state).split(X, y))
+
+    fold_results: Dict[tuple, Dict[str, Any]] = {}
+    tasks = []
+    for c, candidate in enumerate(candidate_list):
+        for fold, (train_index, validation_index) in enumerate(splits):
+            path = cache_dir / f"{fold_key(data_digest, candidate, fold, folds, random_state)}.json"
+            cached = _read_cached(path)
+            if cached is not None:
+                fold_results[c, fold] = cached
+            else:
+                tasks.append(((c, fold), delayed(evaluate_fold)(
+                    candidate, X, y, train_index, validation_index, random_state, path
+                )))
+
+    if tasks:
+        print(f"Fitting {len(tasks)} folds ({len(fold_results)} cached)")
+        computed = Parallel(n_jobs=n_jobs)(task for _, task in tasks)
+        fold_results.update(zip((key for key, _ in tasks), computed))
+
+    results = []
+    for c, candidate in enumerate(candidate_list):
+        per_fold = [fold_results[c, fold] for fold in range(folds)]
+        summary = {'model': candidate['model'], 'params': candidate['params'], 'name': candidate_name(candidate)}
+        for metric in ('accuracy', 'f1', 'roc_auc', 'fit_seconds'):
+            values = [result[metric] for result in per_fold]
+            summary[f"cv_{metric}"] = float(np.mean(values))
+            summary[f"cv_{metric}_std"] = float(np.std(values))
+        results.append(summary)
+    return results
+
+
+def serving_predictor(candidate: Dict[str, Any], X_train: np.ndarray, y_train: np.ndarray, random_state: int = 42):
+    """Fit on the whole training split and return ``predict(rows) -> probabilities`` as it would be served."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X_train)
+    estimator = make_estimator(candidate['model'], candidate['params'], random_state)
+    estimator.fit(scaler.transform(X_train), y_train)
+    if candidate['model'] == 'random_forest':
+        forest = build_compact_forest(estimator, scaler, ml_model.FEATURE_COLUMNS)
+        parity = check_parity(forest, estimator, scaler, X_train)
+        if parity['ok'] and parity['predictions_match']:
+            return forest.predict_proba, 'compact'
+    return (lambda rows: estimator.predict_proba(scaler.transform(rows))[:, 1]), 'sklearn'
+
+
+def measure_latency(predict, rows: np.ndarray, samples: int = LATENCY_SAMPLES) -> Dict[str, float]:
+    """p50/p99 milliseconds of single-row ``predict`` calls, cycling through ``rows``."""
+    for row in rows[:10]:
+        predict(row[np.newaxis, :])
+    timings = np.empty(samples)
+    for i in range(samples):
+        row = rows[i % len(rows)][np.newaxis, :]
+        start = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - start
+    timings *= 1000.0
+    return {'p50_ms': float(np.percentile(timings, 50)), 'p99_ms': float(np.percentile(timings, 99))}
+
+
+def select(results: List[Dict[str, Any]], latency_budget_ms: float) -> Dict[str, Any]:
+    """Best CV F1 (then accuracy, then p99) within the latency budget; the fastest if none fits."""
+    within = [result for result in results if result['latency']['p99_ms'] <= latency_budget_ms]
+    if not within:
+        return min(results, key=lambda result: result['latency']['p99_ms'])
+    return max(within, key=lambda result: (result['cv_f1'], result['cv_accuracy'], -result['latency']['p99_ms']))
+
+
+def pareto_front(results: List[Dict[str, Any]]) -> List[str]:
+    """Names of candidates that no other candidate beats on both CV F1 and p99 latency."""
+    front = []
+    for result in results:
+        dominated = any(
+            other['cv_f1'] >= result['cv_f1'] and other['latency']['p99_ms'] <= result['latency']['p99_ms']
+            and (other['cv_f1'] > result['cv_f1'] or other['latency']['p99_ms'] < result['latency']['p99_ms'])
+            for other in results
+        )
+        if not dominated:
+            front.append(result['name'])
+    return front
+
+
+def tune(csv_path=None, models: Sequence[str] = tuple(SEARCH_SPACES), folds: int = DEFAULT_FOLDS,
+         n_jobs: int = -1, latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS, cache_dir=None,
+         search_spaces: Optional[Dict[str, Dict[str, list]]] = None, latency_samples: int = LATENCY_SAMPLES,
+         random_state: int = 42) -> Dict[str, Any]:
+    """Cross-validate, time and rank every candidate; returns the report."""
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.model_selection import train_test_split
+
+    csv_path = str(csv_path or ml_model.DATASET_PATH)
+    X, y = feature_matrix(csv_path, ml_model.FEATURE_COLUMNS)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    candidate_list = candidates(models, search_spaces)
+    results = cross_validate(X_train, y_train, candidate_list, folds, n_jobs, cache_dir, random_state)
+
+    # Latency is measured serially, one candidate at a time, so runs don't compete for cores
+    for candidate, result in zip(candidate_list, results):
+        predict, served_as = serving_predictor(candidate, X_train, y_train, random_state)
+        predicted = (predict(X_test) > 0.5).astype(int)
+        result['holdout_accuracy'] = float(accuracy_score(y_test, predicted))
+        result['holdout_f1'] = float(f1_score(y_test, predicted))
+        result['latency'] = dict(measure_latency(predict, X_test, latency_samples), served_as=served_as)
+
+    best = select(results, latency_budget_ms)
+    return {
+        'csv': csv_path,
+        'folds': folds,
+        'latency_budget_ms': latency_budget_ms,
+        'selected': best['name'],
+        'pareto_front': pareto_front(results),
+        'results': sorted(results, key=lambda result: -result['cv_f1']),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the questionnaire model")
+    parser.add_argument('--csv', default=str(ml_model.DATASET_PATH))
+    parser.add_argument('--models', nargs='+', choices=sorted(SEARCH_SPACES), default=list(SEARCH_SPACES))
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits (default: all cores)')
+    parser.add_argument('--latency-budget-ms', type=float, default=DEFAULT_LATENCY_BUDGET_MS)
+    parser.add_argument('--output', default=str(RESULTS_PATH))
+    parser.add_argument('--train-version', metavar='NAME',
+                        help='Train the selected random forest as a candidate model version')
+    args = parser.parse_args(argv)
+
+    report = tune(args.csv, args.models, args.folds, args.jobs, args.latency_budget_ms)
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, args.output)
+
+    print(f"{'candidate':<70} {'cv f1':>7} {'cv acc':>7} {'p99 ms':>7}")
+    for result in report['results']:
+        marker = '*' if result['name'] == report['selected'] else ' '
+        print(f"{marker}{result['name']:<69} {result['cv_f1']:>7.4f} {result['cv_accuracy']:>7.4f} "
+              f"{result['latency']['p99_ms']:>7.3f}")
+    print(f"Selected {report['selected']} (p99 budget {args.latency_budget_ms} ms); report saved to {args.output}")
+
+    if args.train_version:
+        best = next(result for result in report['results'] if result['name'] == report['selected'])
+        if best['model'] != 'random_forest':
+            raise SystemExit(f"Only random forests can be trained as model versions, selected {best['name']}")
+        try:
+            from .model_registry import train_version
+        except ImportError:
+            from model_registry import train_version
+        print(json.dumps(train_version(args.train_version, args.csv, **best['params']), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Uploaded images and their resized variants.
+
+``GET /api/uploads/{filename}`` serves the originals in ``backend/uploads/``,
+and ``?w=256`` serves a copy scaled to that width, for list views. Only the
+widths in ``VARIANT_WIDTHS`` are offered, so clients cannot fill the disk
+with arbitrary sizes. Each variant is rendered once by Pillow in a small
+dedicated thread pool (``UPLOAD_VARIANT_WORKERS``, default 2). Pillow
+releases the GIL while decoding, resizing and encoding, and the separate pool
+keeps resizing from competing with report rendering in the default executor.
+Concurrent requests for the same variant share one rendering.
+
+Variants are stored in ``uploads/.variants/``. The total size is capped at
+``UPLOAD_VARIANT_CACHE_MB`` (default 256), and the least recently served
+variants are evicted first. Only plain upload names with an image extension
+are served, and the resolved path must stay inside the uploads directory.
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    from .single_flight import SingleFlight
+except ImportError:
+    from single_flight import SingleFlight
+
+UPLOADS_DIR = Path(__file__).parent / 'uploads'
+VARIANT_WIDTHS = (64, 128, 256, 512, 1024)
+VARIANT_CACHE_MAX_BYTES = int(os.environ.get('UPLOAD_VARIANT_CACHE_MB', '256')) * 1024 * 1024
+VARIANT_WORKERS = int(os.environ.get('UPLOAD_VARIANT_WORKERS', '2'))
+JPEG_QUALITY = 85
+
+# Names the upload endpoint generates: <uuid><extension>; no separators, no leading dot
+FILENAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,127}\.[A-Za-z0-9]{1,8}$')
+IMAGE_MEDIA_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+}
+
+
+def resolve_upload(filename: str, directory: Path = UPLOADS_DIR) -> Path:
+    """Path of an uploaded image; ValueError for anything that is not a plain upload name."""
+    if not FILENAME_PATTERN.match(filename) or Path(filename).suffix.lower() not in IMAGE_MEDIA_TYPES:
+        raise ValueError(f"Invalid upload name: {filename!r}")
+    base = Path(directory).resolve()
+    path = (base / filename).resolve()
+    # Also rejects symlinks pointing out of the uploads directory
+    if path.parent != base:
+        raise ValueError(f"Invalid upload name: {filename!r}")
+    return path
+
+
+def media_type_for(path: Path) -> str:
+    return IMAGE_MEDIA_TYPES[path.suffix.lower()]
+
+
+def render_variant(source: Path, target: Path, width: int) -> Path:
+    """Write ``source`` scaled down to ``width`` pixels wide (never up) to ``target``, atomically."""
+    from PIL import Image, ImageOps
+
+    tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with Image.open(source) as original:
+            image_format = original.format
+            if original.width <= width and original.getexif().get(0x0112, 1) == 1:
+                # Already small enough and upright: the variant is the original
+                shutil.copyfile(source, tmp_path)
+            else:
+                image = ImageOps.exif_transpose(original)
+                image.thumbnail((width, image.height))
+                options = {}
+                if image_format == 'JPEG':
+                    if image.mode not in ('RGB', 'L'):
+                        image = image.convert('RGB')
+                    options = {'quality': JPEG_QUALITY, 'optimize': True}
+                elif image_format == 'PNG':
+                    options = {'optimize': True}
+                image.save(tmp_path, format=image_format, **options)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return target
+
+
+class VariantStore:
+    """Resized variants on disk, rendered in a worker pool and evicted least recently used first."""
+
+    def __init__(self, directory: Path, max_bytes: int = VARIANT_CACHE_MAX_BYTES, workers: int = VARIANT_WORKERS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._flight = SingleFlight('upload_variants')
+        # name -> size, least recently served first; seeded from disk, oldest files first
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        existing = []
+        for path in self.directory.iterdir():
+            if path.suffix != '.tmp' and path.is_file():
+                stat = path.stat()
+                existing.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+        self.total_bytes = sum(self._entries.values())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, source: Path, width: int) -> Path:
+        return self.directory / f"{source.stem}.w{width}{source.suffix.lower()}"
+
+    async def get(self, source: Path, width: int) -> Path:
+        """Path of the ``width`` variant of ``source``, rendering it on first use."""
+        path = self.path_for(source, width)
+        if path.exists():
+            self.hits += 1
+            if path.name in self._entries:
+                self._entries.move_to_end(path.name)
+            else:
+                # Rendered by another worker process
+                self._add(path)
+            return path
+        self.misses += 1
+        return await self._flight.do(path.name, lambda: self._render(source, path, width))
+
+    async def _render(self, source: Path, path: Path, width: int) -> Path:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload-variant')
+        await asyncio.get_running_loop().run_in_executor(self._executor, render_variant, source, path, width)
+        self._add(path)
+        return path
+
+    def _add(self, path: Path):
+        size = path.stat().st_size
+        self.total_bytes += size - self._entries.pop(path.name, 0)
+        self._entries[path.name] = size
+        # The newest variant is kept even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def forget(self, name: str):
+        """Drop a variant removed from disk by someone else (the retention sweep) from the accounting."""
+        self.total_bytes -= self._entries.pop(name, 0)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'variants': len(self._entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'renders': self._flight.snapshot(),
+        }
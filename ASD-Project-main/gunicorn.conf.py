@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for running the backend with one or more worker processes.
+
+    gunicorn -c gunicorn.conf.py backend.server:app
+
+``WEB_CONCURRENCY`` sets the number of workers (default 1). The app (and the
+ML model) is loaded once in the master process before the workers fork, so
+they share the model's memory copy-on-write. Several workers share the
+assessment cache through ASSESSMENT_CACHE_URL. When it is not set, they use a
+bounded SQLite file at ASSESSMENT_CACHE_PATH (default
+backend/data/assessment_cache.sqlite3). That file is emptied when the master
+starts, like the per-process cache of a single worker.
+"""
+
+import glob
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+preload_app = True
+# Proxies whose X-Forwarded-For is trusted to give the client address (rate limits are
+# per address). Behind a platform load balancer (Render, Heroku) set FORWARDED_ALLOW_IPS='*',
+# or every user is seen as the balancer and shares one bucket.
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+# Local file backing the default shared cache (only used with more than one worker)
+ASSESSMENT_CACHE_PATH = os.environ.get(
+    'ASSESSMENT_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'data', 'assessment_cache.sqlite3')
+)
+
+# Runs when the config is loaded, before the preloaded app opens the cache. The
+# variable set here also keeps a configuration reload (HUP) from emptying it again.
+if workers > 1 and 'ASSESSMENT_CACHE_URL' not in os.environ:
+    for path in glob.glob(glob.escape(ASSESSMENT_CACHE_PATH) + '*'):
+        os.remove(path)
+    os.environ['ASSESSMENT_CACHE_URL'] = 'sqlite:///' + ASSESSMENT_CACHE_PATH
+
+
+def when_ready(server):
+    """Load the models in the master process, before any worker is forked."""
+    from backend.model_registry import get_model_router
+    try:
+        get_model_router().warm()
+        server.log.info("ML model preloaded before forking workers")
+    except FileNotFoundError as e:
+        server.log.warning(f"Model not preloaded: {e}")
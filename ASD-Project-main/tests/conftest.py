@@ -0,0 +1,189 @@
+"""
+Shared fixtures for the backend test-suite.
+
+Besides the dataset fixtures, this provides a small pytest-benchmark style
+``benchmark`` fixture. Every benchmark records its timings and, when a
+baseline file is present, fails if the median regressed by more than the
+configured threshold.
+
+    pytest tests/                          # run and compare to baseline
+    pytest tests/ --bench-save             # (re)write the baseline
+    pytest tests/ --bench-threshold 0.25   # allow at most 25% regression
+"""
+
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+DATASET_PATH = BACKEND_DIR / 'data' / 'Autism_Data_processed.csv'
+DEFAULT_BASELINE_PATH = Path(__file__).parent / '.benchmarks' / 'baseline.json'
+
+# Number of dataset rows used by the row-based fixtures; kept fixed so
+# that benchmark inputs are identical between runs.
+FIXTURE_ROWS = 64
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption(
+        '--bench-save', action='store_true', default=False,
+        help='Write benchmark medians to the baseline file instead of comparing'
+    )
+    group.addoption(
+        '--bench-threshold', type=float,
+        default=float(os.environ.get('ASD_BENCH_THRESHOLD', '0.5')),
+        help='Allowed relative slowdown against the baseline (default 0.5 = 50%%)'
+    )
+    group.addoption(
+        '--bench-baseline',
+        default=os.environ.get('ASD_BENCH_BASELINE', str(DEFAULT_BASELINE_PATH)),
+        help='Path of the benchmark baseline JSON file'
+    )
+
+
+class BenchmarkRunner:
+    """Times a callable over several rounds and checks it against a baseline."""
+
+    def __init__(self, name, baseline, threshold, results):
+        self.name = name
+        self.baseline = baseline
+        self.threshold = threshold
+        self.results = results
+        self.stats = None
+
+    def __call__(self, func, *args, rounds=20, warmup=1, setup=None, **kwargs):
+        for _ in range(warmup):
+            if setup is not None:
+                setup()
+            func(*args, **kwargs)
+
+        timings = []
+        result = None
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        self.stats = {
+            'rounds': rounds,
+            'min': min(timings),
+            'max': max(timings),
+            'mean': statistics.mean(timings),
+            'median': statistics.median(timings),
+        }
+        self.results[self.name] = self.stats
+        self._check_regression()
+        return result
+
+    def _check_regression(self):
+        reference = self.baseline.get(self.name)
+        if reference is None:
+            return
+        limit = reference['median'] * (1 + self.threshold)
+        if self.stats['median'] > limit:
+            pytest.fail(
+                f"Benchmark {self.name} regressed: median {self.stats['median'] * 1000:.3f} ms "
+                f"> {limit * 1000:.3f} ms (baseline {reference['median'] * 1000:.3f} ms "
+                f"+ {self.threshold:.0%})"
+            )
+
+
+@pytest.fixture(scope='session')
+def benchmark_session(request):
+    """Load the baseline once and persist new results at the end of the session."""
+    config = request.config
+    baseline_path = Path(config.getoption('--bench-baseline'))
+    save = config.getoption('--bench-save')
+
+    baseline = {}
+    if baseline_path.exists() and not save:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    yield baseline, results
+
+    if save and results:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        existing = {}
+        if baseline_path.exists():
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        existing.update(results)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(existing, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture
+def benchmark(request, benchmark_session):
+    """Per-test benchmark runner, keyed by the test's node name."""
+    baseline, results = benchmark_session
+    threshold = request.config.getoption('--bench-threshold')
+    return BenchmarkRunner(request.node.name, baseline, threshold, results)
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """The processed AQ-10 dataset shipped with the backend."""
+    pytest.importorskip('pandas')
+    from backend.dataset import load_frame
+
+    if not DATASET_PATH.exists():
+        pytest.skip('Dataset not available')
+    return load_frame(DATASET_PATH)
+
+
+def _row_to_features(row):
+    """Map a dataset row to the feature dict accepted by ``predict_asd``."""
+    features = {f'a{i}_score': int(row[f'A{i}_Score']) for i in range(1, 11)}
+    features.update({
+        'age': int(row['age']),
+        'gender': int(row['gender']),
+        'ethnicity': int(row['ethnicity']),
+        'jaundice': int(row['jundice']),
+        'austim': int(row['austim']),
+    })
+    return features
+
+
+@pytest.fixture(scope='session')
+def feature_rows(dataset):
+    """Deterministic list of ``predict_asd`` feature dicts from the dataset."""
+    return [_row_to_features(row) for _, row in dataset.head(FIXTURE_ROWS).iterrows()]
+
+
+@pytest.fixture(scope='session')
+def make_assessment(feature_rows):
+    """Factory for stored-assessment dicts built from a dataset row."""
+
+    def _make(risk_level='Low', probability=0.1, row=0):
+        features = feature_rows[row]
+        return {
+            'id': f'bench-{risk_level.lower()}-{row}',
+            'timestamp': '2024-01-01T00:00:00+00:00',
+            'demographic': {
+                'name': 'Benchmark Subject',
+                'age': features['age'],
+                'gender': features['gender'],
+                'country': 'India',
+                'jaundice': features['jaundice'],
+                'family_history': features['austim'],
+                'respondent': 'Parent',
+                'ethnicity': features['ethnicity'],
+            },
+            'behavioral': {f'a{i}_score': features[f'a{i}_score'] for i in range(1, 11)},
+            'image_filename': None,
+            'prediction': int(probability >= 0.5),
+            'probability': probability,
+            'confidence': max(probability, 1 - probability),
+            'risk_level': risk_level,
+        }
+
+    return _make
@@ -0,0 +1,184 @@
+"""Tests for admission control and per-client rate limiting."""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend import admission
+from backend.admission import (
+    AdmissionController, AdmissionMiddleware, MemoryBucketStore, RoutePolicy, SQLiteBucketStore
+)
+
+
+def _app(policies, store=None, latency_target=1.0):
+    app = FastAPI()
+    controller = AdmissionController(policies, store or MemoryBucketStore(), latency_target=latency_target)
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    state = {'gate': None}
+
+    @app.get('/slow')
+    async def slow():
+        await state['gate'].wait()
+        return {'ok': True}
+
+    @app.get('/fast')
+    async def fast():
+        return {'ok': True}
+
+    return app, controller, state
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_bucket_store_refills(tmp_path, monkeypatch, backend):
+    store = MemoryBucketStore() if backend == 'memory' else SQLiteBucketStore(tmp_path / 'buckets.sqlite3')
+    clock = [1000.0]
+    monkeypatch.setattr(admission.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(admission.time, 'time', lambda: clock[0])
+
+    assert [store.take('client', rate=2, burst=3) for _ in range(3)] == [0.0] * 3
+    assert store.take('client', rate=2, burst=3) == pytest.approx(0.5)
+    assert store.take('other', rate=2, burst=3) == 0.0
+    clock[0] += 0.5
+    assert store.take('client', rate=2, burst=3) == 0.0
+
+
+def test_rate_limit_is_per_client(monkeypatch):
+    monkeypatch.setattr(admission, 'API_KEY_DIGESTS', frozenset([admission._key_digest(b'partner')]))
+    app, controller, _ = _app([RoutePolicy('fast', 'GET', r'^/fast$', concurrency=4, rate=0.5, burst=2)])
+    with TestClient(app) as client:
+        assert [client.get('/fast').status_code for _ in range(2)] == [200, 200]
+        limited = client.get('/fast')
+        assert limited.status_code == 429
+        assert limited.headers['Retry-After'] == '2'
+        assert client.get('/fast', headers={'X-API-Key': 'partner'}).status_code == 200
+        # Unknown keys are the client's address, so new keys don't get new buckets
+        assert client.get('/fast', headers={'X-API-Key': 'random-1'}).status_code == 429
+        assert client.get('/fast', headers={'X-API-Key': 'random-2'}).status_code == 429
+    assert controller.snapshot()['routes']['fast']['rate_limited'] == 3
+
+
+def test_requests_are_shed_past_the_latency_target():
+    policy = RoutePolicy('slow', 'GET', r'^/slow$', concurrency=1, rate=100, burst=100)
+    app, controller, state = _app([policy], latency_target=0.2)
+
+    async def scenario():
+        import httpx
+        state['gate'] = asyncio.Event()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            first = asyncio.ensure_future(client.get('/slow'))
+            await asyncio.sleep(0.05)
+            # Queues, then times out while the first request holds the only slot
+            queued = await client.get('/slow')
+            # Once the service time is known to be long, new requests are refused up front
+            state['gate'].set()
+            await first
+            state['gate'] = asyncio.Event()
+            controller.limit_for(policy).service_time = 5.0
+            second = asyncio.ensure_future(client.get('/slow'))
+            await asyncio.sleep(0.05)
+            refused = await client.get('/slow')
+            unguarded = await client.get('/fast')
+            state['gate'].set()
+            return (await first), queued, (await second), refused, unguarded
+
+    first, queued, second, refused, unguarded = asyncio.run(scenario())
+    assert (first.status_code, second.status_code, unguarded.status_code) == (200, 200, 200)
+    assert queued.status_code == refused.status_code == 503
+    assert refused.headers['Retry-After'] == '5'
+    routes = controller.snapshot()['routes']
+    assert (routes['slow']['admitted'], routes['slow']['shed'], routes['slow']['active']) == (2, 2, 0)
+
+
+def test_failing_store_admits_requests():
+    class BrokenStore:
+        def take(self, key, rate, burst):
+            raise ConnectionError('store down')
+
+    app, _, _ = _app([RoutePolicy('fast', 'GET', r'^/fast$', concurrency=1, rate=1, burst=1)], BrokenStore())
+    with TestClient(app) as client:
+        assert [client.get('/fast').status_code for _ in range(3)] == [200] * 3
+
+
+def test_parse_limits():
+    policies = admission.parse_limits('report=1:0.25:2', admission.DEFAULT_POLICIES)
+    report = policies[0]
+    assert (report.name, report.concurrency, report.rate, report.burst) == ('report', 1, 0.25, 2)
+    assert report.matches('GET', '/api/assessments/abc/report')
+    assert not report.matches('POST', '/api/assessments/abc/report')
+    assert policies[1:] == admission.DEFAULT_POLICIES[1:]
+    for spec in ('report=1:2', 'pdf=1:1:1', 'report=0:1:1'):
+        with pytest.raises(ValueError):
+            admission.parse_limits(spec, admission.DEFAULT_POLICIES)
+
+
+def test_in_handler_policies_guard_only_the_enclosed_work():
+    policy = RoutePolicy('work', 'GET', r'^/work$', concurrency=1, rate=0.5, burst=1, in_handler=True)
+    app = FastAPI()
+    controller = AdmissionController([policy], MemoryBucketStore())
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get('/work')
+    async def work(request: Request, cached: bool = False):
+        if cached:
+            return {'cached': True}
+        try:
+            async with controller.guard('work', request.scope):
+                return {'cached': False}
+        except admission.Rejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+    with TestClient(app) as client:
+        assert [client.get('/work', params={'cached': 'true'}).status_code for _ in range(3)] == [200] * 3
+        assert client.get('/work').status_code == 200
+        limited = client.get('/work')
+        assert limited.status_code == 429 and limited.headers['Retry-After'] == '2'
+    assert controller.snapshot()['routes']['work']['admitted'] == 1
+
+
+def test_shared_store_is_queried_off_the_event_loop(tmp_path):
+    class RecordingStore(SQLiteBucketStore):
+        threads = []
+
+        def take(self, key, rate, burst):
+            self.threads.append(threading.current_thread().name)
+            return super().take(key, rate, burst)
+
+    store = RecordingStore(tmp_path / 'buckets.sqlite3')
+    app, _, _ = _app([RoutePolicy('fast', 'GET', r'^/fast$', concurrency=1, rate=1, burst=2)], store)
+    with TestClient(app) as client:
+        assert client.get('/fast').status_code == 200
+    assert store.threads and all(name.startswith('ratelimit') for name in store.threads)
+
+
+def test_report_downloads_are_limited_only_when_rendered(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from tests.test_jobs import ASSESSMENT_BODY
+
+    controller = AdmissionController(admission.parse_limits('report=1:0.01:1', admission.DEFAULT_POLICIES[:1]),
+                                     MemoryBucketStore())
+    monkeypatch.setattr(server, 'admission', controller)
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'REPORTS_DIR', tmp_path)
+
+    def render(assessment_id, assessment, output_path, locale='en'):
+        with open(output_path, 'wb') as handle:
+            handle.write(b'%PDF-1.4 test')
+
+    monkeypatch.setattr(server, 'generate_pdf_report', render)
+    with TestClient(server.app) as client:
+        first, second = (client.post('/api/assess', json=ASSESSMENT_BODY).json()['id'] for _ in range(2))
+        rendered = client.get(f'/api/assessments/{first}/report')
+        assert rendered.status_code == 200
+        # Served from disk or revalidated: no token needed
+        assert client.get(f'/api/assessments/{first}/report').status_code == 200
+        etag = rendered.headers['ETag']
+        assert client.get(f'/api/assessments/{first}/report',
+                          headers={'If-None-Match': etag}).status_code == 304
+        # A second render within the same second is over the limit
+        assert client.get(f'/api/assessments/{second}/report').status_code == 429
+    assert controller.snapshot()['routes']['report']['rate_limited'] == 1
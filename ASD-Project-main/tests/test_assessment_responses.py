@@ -0,0 +1,78 @@
+"""Tests and benchmarks for the fast assessment response path."""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+server = pytest.importorskip('backend.server')
+from fastapi.testclient import TestClient
+
+pytestmark = pytest.mark.skipif(server.orjson is None, reason='orjson not installed')
+
+LISTING_SIZE = 10_000
+
+
+def _cached_assessments(make_assessment, count):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    cache = {}
+    for i in range(count):
+        doc = make_assessment('Moderate', 0.45, row=i % 64)
+        doc['id'] = str(uuid.UUID(int=i))
+        doc['timestamp'] = base + timedelta(seconds=i, microseconds=i % 7)
+        cache[doc['id']] = server._trusted_assessment(doc)
+    return cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def small_cache(monkeypatch, make_assessment):
+    cache = _cached_assessments(make_assessment, 25)
+    monkeypatch.setattr(server, 'assessment_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def large_cache(monkeypatch, make_assessment):
+    cache = _cached_assessments(make_assessment, LISTING_SIZE)
+    monkeypatch.setattr(server, 'assessment_cache', cache)
+    return cache
+
+
+def _fetch(client, monkeypatch, fast, path):
+    monkeypatch.setattr(server, 'FAST_JSON_RESPONSES', fast)
+    response = client.get(path)
+    assert response.status_code == 200
+    return response
+
+
+def test_fast_listing_matches_validated_listing(client, monkeypatch, small_cache):
+    fast = _fetch(client, monkeypatch, True, '/api/assessments').json()
+    slow = _fetch(client, monkeypatch, False, '/api/assessments').json()
+    assert fast == slow
+    assert [a['id'] for a in fast] == sorted(small_cache, reverse=True)
+
+
+def test_fast_single_assessment_matches_validated(client, monkeypatch, small_cache):
+    assessment_id = next(iter(small_cache))
+    path = f'/api/assessments/{assessment_id}'
+    fast = _fetch(client, monkeypatch, True, path)
+    slow = _fetch(client, monkeypatch, False, path)
+    assert json.loads(fast.content) == json.loads(slow.content)
+    assert fast.json()['timestamp'].endswith('Z')
+
+
+def test_listing_10k_validated(benchmark, client, monkeypatch, large_cache):
+    response = benchmark(_fetch, client, monkeypatch, False, '/api/assessments', rounds=3)
+    assert len(response.json()) == LISTING_SIZE
+
+
+def test_listing_10k_fast(benchmark, client, monkeypatch, large_cache):
+    response = benchmark(_fetch, client, monkeypatch, True, '/api/assessments', rounds=3)
+    assert len(response.json()) == LISTING_SIZE
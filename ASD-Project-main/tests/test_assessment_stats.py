@@ -0,0 +1,98 @@
+"""Tests for the aggregate assessment statistics."""
+
+from collections import Counter
+
+import pytest
+
+from backend.assessment_stats import (
+    AQ_KEYS, format_pipeline_result, stats_from_assessments, stats_from_store, stats_pipeline,
+)
+from backend.assessment_store import CompactAssessmentStore
+from tests.test_assessment_store import _assessment
+
+
+def _sample(count=200):
+    assessments = []
+    for i in range(count):
+        assessment = _assessment(i, probability=(i % 10) / 10)
+        assessment['risk_level'] = ('Low', 'Moderate', 'High')[i % 3]
+        assessments.append(assessment)
+    return assessments
+
+
+def test_store_and_dict_paths_agree_with_reference():
+    assessments = _sample()
+    store = CompactAssessmentStore()
+    for assessment in assessments:
+        store[assessment['id']] = assessment
+
+    from_store = stats_from_store(store)
+    from_dicts = stats_from_assessments(assessments)
+    assert from_store == from_dicts
+
+    assert from_store['total'] == len(assessments)
+    assert from_store['risk_levels'] == dict(Counter(a['risk_level'] for a in assessments))
+    india = [a['probability'] for a in assessments if a['demographic']['country'] == 'India']
+    row = next(r for r in from_store['by_country'] if r['country'] == 'India')
+    assert row['count'] == len(india)
+    assert row['average_probability'] == pytest.approx(sum(india) / len(india))
+    for key in AQ_KEYS:
+        expected = sum(a['behavioral'][key] for a in assessments) / len(assessments)
+        assert from_store['aq_positive_rates'][key] == pytest.approx(expected)
+    assert sum(band['count'] for band in from_store['by_age_band']) == len(assessments)
+
+
+def test_empty_store():
+    stats = stats_from_store(CompactAssessmentStore())
+    assert stats['total'] == 0
+    assert stats['risk_levels'] == {}
+
+
+def test_pipeline_result_formatting():
+    assert '$facet' in stats_pipeline()[0]
+    facets = {
+        'totals': [{'_id': None, 'count': 3, 'average_probability': 0.5}],
+        'risk_levels': [{'_id': 'High', 'count': 2}, {'_id': 'Low', 'count': 1}],
+        'by_age_band': [{'_id': 4, 'count': 2, 'average_probability': 0.6},
+                        {'_id': 'Unknown', 'count': 1, 'average_probability': 0.3}],
+        'by_country': [{'_id': 'India', 'count': 3, 'average_probability': 0.5}],
+        'aq_positive_rates': [{'_id': None, **{key: 0.5 for key in AQ_KEYS}}],
+    }
+    stats = format_pipeline_result(facets)
+    assert stats['total'] == 3
+    assert stats['risk_levels'] == {'High': 2, 'Low': 1}
+    assert [band['band'] for band in stats['by_age_band']] == ['4-7', 'Unknown']
+    assert stats['aq_positive_rates']['a10_score'] == 0.5
+
+
+def test_stats_endpoint_is_cached(monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+
+    store = CompactAssessmentStore()
+    for assessment in _sample(30):
+        store[assessment['id']] = assessment
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', store)
+    monkeypatch.setattr(server, '_stats_cache', {})
+
+    client = TestClient(server.app)
+    first = client.get('/api/assessments/stats').json()
+    assert first['total'] == 30
+    assert first['source'] == 'memory'
+
+    extra = _assessment(999)
+    store[extra['id']] = extra
+    assert client.get('/api/assessments/stats').json() == first
+
+    monkeypatch.setattr(server, 'STATS_CACHE_TTL', 0)
+    server._stats_cache.clear()
+    assert client.get('/api/assessments/stats').json()['total'] == 31
+
+
+def test_stats_from_store_benchmark(benchmark):
+    store = CompactAssessmentStore()
+    for assessment in _sample(50_000):
+        store[assessment['id']] = assessment
+    stats = benchmark(stats_from_store, store, rounds=10)
+    assert stats['total'] == 50_000
@@ -0,0 +1,140 @@
+"""Tests and memory benchmark for the compact assessment store."""
+
+import os
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.assessment_store import CompactAssessmentStore
+
+# Number of entries for the memory benchmark; set ASD_BENCH_STORE_SIZE=1000000
+# for the full-size run.
+STORE_BENCH_SIZE = int(os.environ.get('ASD_BENCH_STORE_SIZE', '20000'))
+DICT_BENCH_SIZE = min(STORE_BENCH_SIZE, 20000)
+
+
+def _assessment(i, probability=0.42):
+    return {
+        'id': str(uuid.UUID(int=i)),
+        'timestamp': datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=i, microseconds=i),
+        'demographic': {
+            'name': f'Subject {i}',
+            'age': 3 + i % 60,
+            'gender': i % 2,
+            'country': ('India', 'USA', 'UK')[i % 3],
+            'jaundice': (i >> 1) % 2,
+            'family_history': (i >> 2) % 2,
+            'respondent': ('Parent', 'Self')[i % 2],
+            'ethnicity': None if i % 5 == 0 else i % 11,
+        },
+        'behavioral': {f'a{q}_score': (i >> q) & 1 for q in range(1, 11)},
+        'image_filename': None if i % 4 else f'{i}.jpg',
+        'prediction': int(probability >= 0.5),
+        'probability': probability,
+        'confidence': max(probability, 1 - probability),
+        'risk_level': 'Moderate',
+    }
+
+
+def test_round_trip_is_exact():
+    store = CompactAssessmentStore(capacity=2)
+    originals = [_assessment(i, probability=i / 7 % 1) for i in range(50)]
+    for assessment in originals:
+        store[assessment['id']] = assessment
+    assert len(store) == 50
+    assert list(store) == [a['id'] for a in originals]
+    for assessment in originals:
+        assert store[assessment['id']] == assessment
+    assert not store.overflow_values()
+
+
+def test_entries_outside_packed_layout_are_kept_verbatim():
+    store = CompactAssessmentStore()
+    odd = _assessment(1)
+    odd['behavioral']['a3_score'] = 7
+    naive = _assessment(2)
+    naive['timestamp'] = naive['timestamp'].replace(tzinfo=None)
+    store[odd['id']] = odd
+    store[naive['id']] = naive
+    assert store[odd['id']] is odd
+    assert store[naive['id']] is naive
+    assert len(store.overflow_values()) == 2
+
+
+def test_extra_fields_survive():
+    store = CompactAssessmentStore()
+    assessment = dict(_assessment(3), model_version='v2')
+    store[assessment['id']] = assessment
+    assert store[assessment['id']]['model_version'] == 'v2'
+
+
+def test_overwrite_and_delete():
+    store = CompactAssessmentStore()
+    first = _assessment(4)
+    store[first['id']] = first
+    store[first['id']] = dict(first, risk_level='High')
+    assert len(store) == 1
+    assert store[first['id']]['risk_level'] == 'High'
+    del store[first['id']]
+    assert first['id'] not in store
+    assert len(store.columns()['probability']) == 0
+    with pytest.raises(KeyError):
+        store[first['id']]
+
+
+def test_columns_and_lazy_result():
+    server = pytest.importorskip('backend.server')
+    store = CompactAssessmentStore()
+    for i in range(10):
+        assessment = _assessment(i, probability=i / 10)
+        store[assessment['id']] = assessment
+    columns = store.columns()
+    assert columns['probability'].tolist() == [i / 10 for i in range(10)]
+    assert store.decode('country', columns['country'][:3]) == ['India', 'USA', 'UK']
+
+    assessment_id = str(uuid.UUID(int=5))
+    result = store.get_result(assessment_id, server.AssessmentResult)
+    assert isinstance(result, server.AssessmentResult)
+    assert result.model_dump() == server.AssessmentResult.model_validate(store[assessment_id]).model_dump()
+    assert store.record(assessment_id).probability == 0.5
+
+
+def _measure(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        container = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return container, after - before
+
+
+def test_memory_per_assessment():
+    # Entries are generated inside the measured builders so that every object
+    # each container retains (ids, names, nested dicts) is counted.
+    def build_dict_cache():
+        cache = {}
+        for i in range(DICT_BENCH_SIZE):
+            assessment = _assessment(i)
+            cache[assessment['id']] = assessment
+        return cache
+
+    def build_compact_store():
+        store = CompactAssessmentStore()
+        for i in range(STORE_BENCH_SIZE):
+            assessment = _assessment(i)
+            store[assessment['id']] = assessment
+        return store
+
+    _, dict_bytes = _measure(build_dict_cache)
+    store, store_bytes = _measure(build_compact_store)
+    assert len(store) == STORE_BENCH_SIZE
+
+    dict_per_entry = dict_bytes / DICT_BENCH_SIZE
+    store_per_entry = store_bytes / STORE_BENCH_SIZE
+    print(f'\ndict cache: {dict_per_entry:.0f} B/assessment, '
+          f'compact store: {store_per_entry:.0f} B/assessment ({STORE_BENCH_SIZE} entries)')
+    assert store_per_entry * 3 < dict_per_entry
@@ -0,0 +1,85 @@
+"""
+Micro-benchmarks for the hot functions of ml_model and report_generator.
+
+These run fully offline against the model files and dataset committed in
+``backend/``. See ``conftest.py`` for the baseline/threshold options.
+"""
+
+import numpy as np
+import pytest
+
+from backend import ml_model
+from backend.ml_model import load_model, predict_asd, MODEL_PATH, SCALER_PATH
+from backend.report_generator import generate_pdf_report, get_recommendations
+
+pytestmark = pytest.mark.skipif(
+    not MODEL_PATH.exists() or not SCALER_PATH.exists(),
+    reason='Model files not available'
+)
+
+RISK_LEVELS = [('Low', 0.12), ('Moderate', 0.45), ('High', 0.87)]
+
+
+def test_load_model(benchmark):
+    model, scaler = benchmark(load_model, rounds=10)
+    assert model.n_features_in_ == 15
+    assert scaler.n_features_in_ == 15
+
+
+def test_predict_asd_cold(benchmark, feature_rows):
+    result = benchmark(
+        predict_asd, feature_rows[0], rounds=10, warmup=0, setup=ml_model.clear_model_cache
+    )
+    assert 0.0 <= result['probability'] <= 1.0
+
+
+def test_predict_asd_warm(benchmark, feature_rows):
+    for features in feature_rows:
+        predict_asd(features)
+    result = benchmark(predict_asd, feature_rows[1], rounds=30, warmup=3)
+    assert result['prediction'] in (0, 1)
+
+
+def test_scaler_transform_single_row(benchmark, feature_rows):
+    _, scaler = load_model()
+    row = np.array([list(feature_rows[0].values())], dtype=float)
+    scaled = benchmark(scaler.transform, row, rounds=50)
+    assert scaled.shape == (1, 15)
+
+
+def test_scaler_transform_batch(benchmark, feature_rows):
+    _, scaler = load_model()
+    batch = np.array([list(f.values()) for f in feature_rows], dtype=float)
+    scaled = benchmark(scaler.transform, batch, rounds=50)
+    assert scaled.shape == (len(feature_rows), 15)
+
+
+@pytest.mark.parametrize('risk_level,probability', RISK_LEVELS)
+def test_generate_pdf_report(benchmark, make_assessment, tmp_path, risk_level, probability):
+    assessment = make_assessment(risk_level, probability)
+    output_path = tmp_path / 'report.pdf'
+    path = benchmark(
+        generate_pdf_report, assessment['id'], assessment, str(output_path), rounds=5
+    )
+    assert output_path.stat().st_size > 0
+    assert path == str(output_path)
+
+
+@pytest.mark.parametrize('risk_level,probability', RISK_LEVELS)
+def test_get_recommendations(benchmark, make_assessment, risk_level, probability):
+    assessment = make_assessment(risk_level, probability)
+    recommendations = benchmark(
+        get_recommendations, risk_level, assessment['behavioral'],
+        assessment['demographic'], rounds=200
+    )
+    assert set(recommendations) == {'medical', 'therapy', 'yoga', 'lifestyle', 'nutrition'}
+
+
+@pytest.mark.parametrize('metrics_name', ['questionnaire_metrics.json', 'image_metrics.json'])
+def test_clean_json_data(benchmark, metrics_name):
+    server = pytest.importorskip('backend.server')
+    metrics = server._load_metrics_json(ml_model.MODELS_DIR / metrics_name)
+    if metrics is None:
+        pytest.skip(f'{metrics_name} not available')
+    cleaned = benchmark(server._clean_json_data, metrics, rounds=50)
+    assert cleaned['model_type'] == metrics['model_type']
@@ -0,0 +1,118 @@
+"""Tests for offline bulk scoring of questionnaire CSVs."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import bulk_score, ml_model
+from backend.calibration import risk_level
+from backend.model_registry import production_version_name
+from backend.storage import SQLiteDatabase
+from tests.conftest import DATASET_PATH
+
+pytestmark = pytest.mark.skipif(
+    not ml_model.MODEL_PATH.exists() or not DATASET_PATH.exists(),
+    reason='Model files or dataset not available'
+)
+
+
+def _features(row):
+    features = {f'a{i}_score': row[f'A{i}_Score'] for i in range(1, 11)}
+    features.update(age=row['age'], gender=row['gender'], ethnicity=row['ethnicity'],
+                    jaundice=row['jundice'], austim=row['austim'])
+    return features
+
+
+def test_scores_match_predict_asd(dataset):
+    frame = dataset.head(50)
+    scores = bulk_score.score_frame(frame)
+    for (_, row), (_, score) in zip(frame.iterrows(), scores.iterrows()):
+        expected = ml_model.predict_asd(_features(row))
+        assert score['probability'] == pytest.approx(expected['probability'])
+        assert score['calibrated_probability'] == pytest.approx(expected['calibrated_probability'], abs=1e-12)
+        assert score['prediction'] == expected['prediction']
+        assert score['risk_level'] == risk_level(expected['calibrated_probability'])
+
+
+def test_incomplete_rows_are_left_unscored(dataset):
+    frame = dataset.head(4).copy()
+    frame.loc[1, 'A3_Score'] = np.nan
+    frame.loc[2, 'ethnicity'] = np.nan
+    scores = bulk_score.score_frame(frame)
+    assert scores['probability'].isna().tolist() == [False, True, False, False]
+    assert scores.loc[1, 'risk_level'] is None or pd.isna(scores.loc[1, 'risk_level'])
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match='austim'):
+        bulk_score.score_frame(pd.DataFrame({'A1_Score': [1.0]}))
+
+
+def test_parallel_output_matches_single_process(tmp_path):
+    single, parallel = tmp_path / 'single.csv', tmp_path / 'parallel.csv'
+    counts = bulk_score.bulk_score(DATASET_PATH, single, chunk_size=100, workers=1)
+    assert bulk_score.bulk_score(DATASET_PATH, parallel, chunk_size=100, workers=2) == counts
+    assert counts['rows'] == counts['scored'] == 704
+    assert single.read_bytes() == parallel.read_bytes()
+    output = pd.read_csv(single)
+    assert list(output.columns) == list(pd.read_csv(DATASET_PATH, nrows=1).columns) + bulk_score.SCORE_COLUMNS
+
+
+def test_store_inserts_valid_assessments(tmp_path):
+    database = SQLiteDatabase(tmp_path / 'asd.sqlite3')
+    counts = bulk_score.bulk_score(DATASET_PATH, tmp_path / 'scored.csv', chunk_size=300,
+                                   workers=1, database=database)
+    assert counts['stored'] == 704
+    documents = asyncio.run(database.assessments.find({}, {'_id': 0}).to_list(None))
+    assert len(documents) == 704
+    server = pytest.importorskip('backend.server')
+    result = server.AssessmentResult.model_validate(documents[0])
+    assert result.demographic['name'] == 'Bulk import Autism_Data_processed.csv'
+    assert result.model_version == production_version_name()
+
+
+def test_bulk_scoring(benchmark, dataset):
+    scores = benchmark(bulk_score.score_frame, dataset, rounds=20)
+    assert scores['probability'].notna().all()
+
+
+def test_fractional_features_are_scored(dataset):
+    frame = dataset.head(3).copy()
+    frame['age'] = frame['age'].astype(np.float64)
+    frame.loc[1, 'age'] = frame.loc[1, 'age'] + 0.5
+    scores = bulk_score.score_frame(frame)
+    assert scores['probability'].notna().all()
+    model, scaler = ml_model.get_model()
+    row = frame[ml_model.FEATURE_COLUMNS].to_numpy(dtype=np.float64)[1:2]
+    assert scores.loc[1, 'probability'] == pytest.approx(model.predict_proba(scaler.transform(row))[0, 1])
+
+
+def test_store_rejects_rows_outside_the_api_bounds(tmp_path):
+    rows = pd.read_csv(DATASET_PATH, nrows=4)
+    rows['age'] = rows['age'].astype(np.float64)
+    rows.loc[1, 'age'] = 130
+    rows.loc[2, 'A3_Score'] = 2
+    rows.loc[3, 'age'] = 4.5
+    csv_path = tmp_path / 'screenings.csv'
+    rows.to_csv(csv_path, index=False)
+    database = SQLiteDatabase(tmp_path / 'asd.sqlite3')
+    counts = bulk_score.bulk_score(csv_path, tmp_path / 'scored.csv', workers=1, database=database)
+    assert (counts['scored'], counts['stored'], counts['rejected']) == (4, 1, 3)
+    _, rejected = bulk_score.assessment_documents(
+        pd.concat([rows, bulk_score.score_frame(rows)], axis=1), 'v', 'test'
+    )
+    assert [line for line, _ in rejected] == [3, 4, 5]
+    assert 'demographic.age' in rejected[0][1] and 'behavioral.a3_score' in rejected[1][1]
+
+
+def test_inputs_are_not_cached_by_default(tmp_path, monkeypatch):
+    from backend import dataset
+    monkeypatch.setattr(dataset, 'DATASET_CACHE_DIR', tmp_path / 'cache')
+    csv_path = tmp_path / 'screenings.csv'
+    pd.read_csv(DATASET_PATH, nrows=10).to_csv(csv_path, index=False)
+    bulk_score.bulk_score(csv_path, tmp_path / 'scored.csv', workers=1)
+    assert not (tmp_path / 'cache').exists()
+    bulk_score.bulk_score(csv_path, tmp_path / 'scored.csv', workers=1, use_cache=True)
+    assert any((tmp_path / 'cache').iterdir())
@@ -0,0 +1,119 @@
+"""Tests for probability calibration and configurable risk thresholds."""
+
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from backend import ml_model
+from backend.assessment_store import CompactAssessmentStore
+from backend.calibration import (
+    CalibrationTable, fit_calibration, load_calibration, parse_risk_thresholds, risk_level, save_calibration
+)
+
+
+@pytest.mark.parametrize('probability,expected', [
+    (0.0, 'Low'), (0.299, 'Low'), (0.3, 'Moderate'), (0.599, 'Moderate'), (0.6, 'High'), (1.0, 'High'),
+])
+def test_default_thresholds_match_previous_cutoffs(probability, expected):
+    assert risk_level(probability, (0.3, 0.6)) == expected
+
+
+def test_custom_thresholds():
+    thresholds = parse_risk_thresholds('0.2,0.8')
+    assert [risk_level(p, thresholds) for p in (0.1, 0.5, 0.9)] == ['Low', 'Moderate', 'High']
+
+
+@pytest.mark.parametrize('value', ['0.6,0.3', '0.3', '0,0.5', '0.3,1', 'low,high'])
+def test_invalid_thresholds(value):
+    with pytest.raises(ValueError):
+        parse_risk_thresholds(value)
+
+
+@pytest.mark.parametrize('method', ['isotonic', 'sigmoid'])
+def test_lookup_matches_vectorized_transform(method):
+    rng = np.random.default_rng(0)
+    raw = rng.random(2000)
+    y = (rng.random(2000) < raw ** 2).astype(int)
+    table = fit_calibration(raw, y, method)
+    probes = np.concatenate([rng.random(500), table.x, [-0.1, 1.1]])
+    expected = table.transform(probes)
+    assert [table(float(p)) for p in probes] == pytest.approx(expected.tolist(), abs=1e-12)
+    assert np.all(np.diff(table.transform(np.linspace(0, 1, 1001))) >= 0)
+
+
+def test_round_trip(tmp_path):
+    table = CalibrationTable([0.0, 0.5, 1.0], [0.1, 0.2, 0.9], {'method': 'isotonic'})
+    loaded = load_calibration(save_calibration(table, tmp_path / 'calibration.json'))
+    assert (loaded.x, loaded.y, loaded.method) == (table.x, table.y, 'isotonic')
+
+
+def test_rejects_non_monotone_table():
+    with pytest.raises(ValueError):
+        CalibrationTable([0.0, 0.5, 1.0], [0.0, 0.6, 0.4])
+
+
+@pytest.mark.skipif(not ml_model.CALIBRATION_PATH.exists(), reason='calibration.json not available')
+def test_committed_calibration_is_current():
+    calibrator = ml_model.get_calibrator()
+    assert calibrator.method != 'identity'
+    with open(ml_model.METRICS_PATH, 'r', encoding='utf-8') as f:
+        report = json.load(f)['calibration']
+    assert report['method'] == calibrator.method
+    assert report['calibrated']['brier_score'] <= report['raw']['brier_score']
+    assert len(report['raw']['prob_true']) == len(report['raw']['prob_pred'])
+
+
+def test_stale_calibration_falls_back_to_identity(tmp_path, monkeypatch):
+    table = CalibrationTable([0.0, 1.0], [0.2, 0.8], {'method': 'sigmoid', 'source_fingerprint': 'other'})
+    monkeypatch.setattr(ml_model, 'CALIBRATION_PATH', save_calibration(table, tmp_path / 'calibration.json'))
+    ml_model.clear_model_cache()
+    try:
+        assert ml_model.get_calibrator().method == 'identity'
+    finally:
+        ml_model.clear_model_cache()
+
+
+def test_predict_asd_returns_calibrated_probability(feature_rows):
+    calibrator = ml_model.get_calibrator()
+    for features in feature_rows[:10]:
+        result = ml_model.predict_asd(features)
+        assert result['calibrated_probability'] == calibrator(result['probability'])
+
+
+def test_store_packs_calibrated_probability(make_assessment):
+    store = CompactAssessmentStore()
+    assessment = make_assessment('Moderate', 0.45)
+    assessment['timestamp'] = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assessment['calibrated_probability'] = 0.375
+    store[assessment['id']] = assessment
+    assert store.record(assessment['id']) is not None
+    assert store._extras[0] is None
+    assert store[assessment['id']] == assessment
+
+
+def test_assessment_uses_configured_thresholds(monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    client = TestClient(server.app)
+    body = {
+        'demographic': {'name': 'Test', 'age': 6, 'gender': 1, 'country': 'India', 'jaundice': 0,
+                        'family_history': 0, 'respondent': 'Parent', 'ethnicity': 2},
+        'behavioral': {f'a{i}_score': 1 for i in range(1, 11)},
+    }
+    monkeypatch.setattr(server, 'RISK_THRESHOLDS', (0.98, 0.99))
+    result = client.post('/api/assess', json=body).json()
+    assert result['risk_level'] == risk_level(result['calibrated_probability'], (0.98, 0.99))
+
+    monkeypatch.setattr(server, 'RISK_THRESHOLDS', (0.01, 0.02))
+    assert client.post('/api/assess', json=body).json()['risk_level'] == 'High'
+
+
+def test_calibration_lookup(benchmark):
+    table = ml_model.get_calibrator()
+    calibrated = benchmark(table, 0.4321, rounds=1000)
+    assert 0.0 <= calibrated <= 1.0
@@ -0,0 +1,98 @@
+"""
+Parity and speed checks for the compact memory-mapped model.
+"""
+
+import numpy as np
+import pytest
+
+from backend import ml_model
+from backend.compact_model import (
+    build_compact_forest, check_metrics_parity, check_parity, load_compact_model, save_compact_model
+)
+
+pytestmark = pytest.mark.skipif(
+    not ml_model.COMPACT_MODEL_PATH.exists() or not ml_model.MODEL_PATH.exists(),
+    reason='Model files not available'
+)
+
+
+@pytest.fixture(scope='module')
+def sklearn_model():
+    return ml_model.load_model()
+
+
+@pytest.fixture(scope='module')
+def compact():
+    return load_compact_model(ml_model.COMPACT_MODEL_PATH)
+
+
+def test_committed_file_matches_pickled_model(compact):
+    assert compact.metadata['source_fingerprint'] == ml_model.model_fingerprint()
+    assert compact.feature_names == ml_model.FEATURE_COLUMNS
+
+
+def test_loads_memory_mapped(compact):
+    assert isinstance(compact.nodes, np.memmap)
+    assert load_compact_model(ml_model.COMPACT_MODEL_PATH, mmap=False).nodes.dtype == compact.nodes.dtype
+
+
+def test_parity_on_dataset(compact, sklearn_model, dataset):
+    model, scaler = sklearn_model
+    X = dataset[ml_model.FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    parity = check_parity(compact, model, scaler, X)
+    assert parity['ok'], parity
+    assert parity['predictions_match']
+
+
+def test_parity_on_random_questionnaires(compact, sklearn_model):
+    model, scaler = sklearn_model
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(0, 2, size=(5000, 10)),
+        rng.integers(-5, 120, size=5000),
+        rng.integers(0, 2, size=5000),
+        rng.integers(-1, 15, size=5000),
+        rng.integers(0, 2, size=(5000, 2)),
+    ]).astype(np.float64)
+    parity = check_parity(compact, model, scaler, X)
+    assert parity['ok'], parity
+
+
+def test_accuracy_matches_recorded_metrics(compact):
+    metrics_path = ml_model.MODELS_DIR / 'questionnaire_metrics.json'
+    if not metrics_path.exists():
+        pytest.skip('questionnaire_metrics.json not available')
+    result = check_metrics_parity(compact, ml_model.DATASET_PATH, metrics_path)
+    assert result['ok'], result
+
+
+def test_round_trip(tmp_path, sklearn_model, compact):
+    model, scaler = sklearn_model
+    forest = build_compact_forest(model, scaler, ml_model.FEATURE_COLUMNS)
+    path = save_compact_model(forest, tmp_path / 'model.npy')
+    loaded = load_compact_model(path)
+    assert np.array_equal(np.asarray(loaded.nodes), np.asarray(compact.nodes))
+
+
+def test_rejects_fractional_features(compact):
+    row = np.zeros((1, len(ml_model.FEATURE_COLUMNS)))
+    row[0, 10] = 4.5
+    with pytest.raises(ValueError):
+        compact.predict_proba(row)
+
+
+def test_compact_predict_single_row(benchmark, compact, feature_rows):
+    row = np.array([list(feature_rows[0].values())], dtype=np.float64)
+    probability = benchmark(compact.predict_proba, row, rounds=100, warmup=5)
+    assert probability.shape == (1,)
+
+
+def test_compact_predict_batch(benchmark, compact, feature_rows):
+    batch = np.array([list(f.values()) for f in feature_rows], dtype=np.float64)
+    probabilities = benchmark(compact.predict_proba, batch, rounds=50, warmup=3)
+    assert probabilities.shape == (len(feature_rows),)
+
+
+def test_compact_load(benchmark):
+    forest = benchmark(load_compact_model, ml_model.COMPACT_MODEL_PATH, rounds=20)
+    assert forest.n_trees == 100
@@ -0,0 +1,99 @@
+"""Tests for the typed, memory-mapped dataset cache."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import dataset
+from tests.conftest import DATASET_PATH
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / 'cache'
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'rows.csv'
+    pd.DataFrame({
+        'A1_Score': [1.0, 0.0, 1.0],
+        'age': [4, 300, 17],
+        'delta': [-1, 0, 1],
+        'score': [0.5, 1.25, np.nan],
+        'Class/ASD': [1, 0, 1],
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_smallest_types(csv_path, cache_dir):
+    data = dataset.load_dataset(csv_path, cache_dir)
+    assert isinstance(data, np.memmap)
+    assert [data.dtype[name] for name in data.dtype.names] == [
+        np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.int8), np.dtype(np.float64), np.dtype(np.uint8)
+    ]
+    frame = dataset.load_frame(csv_path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(frame, pd.read_csv(csv_path), check_dtype=False)
+
+
+@pytest.mark.skipif(not DATASET_PATH.exists(), reason='Dataset not available')
+def test_training_csv_is_all_uint8(cache_dir):
+    data = dataset.load_dataset(DATASET_PATH, cache_dir)
+    assert data.dtype.itemsize == len(data.dtype.names) == 21
+    X, y = dataset.feature_matrix(DATASET_PATH, ['A1_Score', 'age'], cache_dir=cache_dir)
+    expected = pd.read_csv(DATASET_PATH)
+    assert X.dtype == np.float64
+    assert np.array_equal(X, expected[['A1_Score', 'age']].to_numpy())
+    assert np.array_equal(y, expected['Class/ASD'].to_numpy())
+
+
+def test_cache_is_reused_and_invalidated(csv_path, cache_dir, monkeypatch):
+    dataset.load_dataset(csv_path, cache_dir)
+    conversions = []
+    original = dataset.convert
+    monkeypatch.setattr(dataset, 'convert', lambda *args: conversions.append(1) or original(*args))
+
+    dataset.load_dataset(csv_path, cache_dir)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    dataset.load_dataset(csv_path, cache_dir)
+    assert conversions == []
+
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('0.0,5,2,0.0,0\n')
+    data = dataset.load_dataset(csv_path, cache_dir)
+    assert conversions == [1]
+    assert len(data) == 4
+
+
+def test_non_numeric_csv_falls_back_to_pandas(tmp_path, cache_dir, caplog):
+    path = tmp_path / 'names.csv'
+    pd.DataFrame({'name': ['a', 'b'], 'age': [3, 4]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        dataset.load_dataset(path, cache_dir)
+    with caplog.at_level('WARNING', logger=dataset.__name__):
+        assert dataset.load_frame(path, cache_dir=cache_dir)['name'].tolist() == ['a', 'b']
+    assert 'Dataset cache not used' in caplog.text
+    assert [len(chunk) for chunk in dataset.iter_frames(path, 1, cache_dir)] == [1, 1]
+
+
+def test_iter_frames_keeps_row_index(csv_path, cache_dir):
+    chunks = list(dataset.iter_frames(csv_path, 2, cache_dir))
+    assert [chunk.index.tolist() for chunk in chunks] == [[0, 1], [2]]
+
+
+def test_chunked_conversion_matches_single_pass(csv_path, tmp_path):
+    dtype, rows = dataset.infer_dtype(csv_path, chunk_size=1)
+    assert rows == 3
+    dataset.convert(csv_path, tmp_path / 'chunked.npy', chunk_size=1)
+    dataset.convert(csv_path, tmp_path / 'whole.npy')
+    assert np.load(tmp_path / 'chunked.npy').tobytes() == np.load(tmp_path / 'whole.npy').tobytes()
+
+
+@pytest.mark.skipif(not DATASET_PATH.exists(), reason='Dataset not available')
+def test_cached_dataset_load(benchmark, cache_dir):
+    dataset.load_dataset(DATASET_PATH, cache_dir)
+    frame = benchmark(dataset.load_frame, DATASET_PATH, cache_dir=cache_dir, rounds=50)
+    assert len(frame) == 704
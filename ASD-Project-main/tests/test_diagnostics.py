@@ -0,0 +1,71 @@
+"""Tests for event-loop lag monitoring and the sampling profiler."""
+
+import asyncio
+import re
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.diagnostics import LoopMonitor, collapsed, sample_stacks
+
+
+def blocking_handler():
+    time.sleep(0.3)
+
+
+def test_blocked_loop_is_reported_with_its_stack():
+    monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        blocking_handler()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    snapshot = monitor.snapshot()
+    assert snapshot['stalls'] == 1 and not snapshot['running']
+    assert 'blocking_handler' in snapshot['last_stall']['stack']
+    assert snapshot['lag_ms']['max'] >= 200
+    assert snapshot['lag_ms']['p50'] < 50
+
+
+def test_sample_stacks_in_collapsed_format():
+    stop = threading.Event()
+
+    def spin_target():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin_target, name='spinner')
+    worker.start()
+    try:
+        counts = sample_stacks(0.2, hz=200, thread_ids=[worker.ident])
+    finally:
+        stop.set()
+        worker.join()
+
+    text = collapsed(counts)
+    lines = text.splitlines()
+    assert lines and all(re.match(r'^spinner;.+ \d+$', line) for line in lines)
+    assert all('spin_target (test_diagnostics.py:' in line for line in lines)
+    assert 15 <= sum(counts.values()) <= 40
+
+
+def test_profile_endpoint_is_opt_in(monkeypatch):
+    server = pytest.importorskip('backend.server')
+    with TestClient(server.app) as client:
+        assert client.get('/api/debug/profile', params={'seconds': 0.1}).status_code == 404
+
+        monkeypatch.setattr(server, 'PROFILER_ENABLED', True)
+        assert client.get('/api/debug/profile', params={'seconds': 600}).status_code == 400
+        assert client.get('/api/debug/profile', params={'hz': 0}).status_code == 400
+        response = client.get('/api/debug/profile', params={'seconds': 0.2, 'hz': 50})
+        assert response.status_code == 200
+        assert response.headers['content-disposition'] == 'attachment; filename="profile.folded"'
+        assert response.text and all(re.match(r'^.+ \d+$', line) for line in response.text.splitlines())
+
+        assert client.get('/api/metrics').json()['event_loop']['running']
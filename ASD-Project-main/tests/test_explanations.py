@@ -0,0 +1,123 @@
+"""Per-prediction feature contributions: correctness, storage, report and latency budget."""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from backend import ml_model
+from backend.assessment_store import CompactAssessmentStore
+from backend.report_generator import generate_pdf_report
+
+pytestmark = pytest.mark.skipif(
+    not ml_model.MODEL_PATH.exists() or not ml_model.SCALER_PATH.exists(),
+    reason='Model files not available'
+)
+
+# Extra time an explained prediction may take over a plain one
+LATENCY_BUDGET_SECONDS = 0.003
+
+
+def _median_seconds(func, *args, rounds=200):
+    func(*args)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+@pytest.fixture
+def explained(monkeypatch):
+    monkeypatch.setattr(ml_model, 'EXPLAIN_PREDICTIONS', True)
+
+
+def test_contributions_add_up_to_probability(explained, feature_rows):
+    for features in feature_rows:
+        result = ml_model.predict_asd(features)
+        contributions = result['feature_contributions']
+        assert list(contributions) == list(ml_model.EXPLANATION_KEYS)
+        total = result['base_probability'] + sum(contributions.values())
+        assert total == pytest.approx(result['probability'], abs=1e-9)
+
+
+def test_explanation_does_not_change_prediction(monkeypatch, feature_rows):
+    monkeypatch.setattr(ml_model, 'EXPLAIN_PREDICTIONS', False)
+    plain = [ml_model.predict_asd(features) for features in feature_rows]
+    assert all('feature_contributions' not in result for result in plain)
+    monkeypatch.setattr(ml_model, 'EXPLAIN_PREDICTIONS', True)
+    for features, expected in zip(feature_rows, plain):
+        result = ml_model.predict_asd(features)
+        assert result['probability'] == pytest.approx(expected['probability'], abs=1e-12)
+        assert result['prediction'] == expected['prediction']
+
+
+def test_fractional_features_are_predicted_unexplained(explained, feature_rows):
+    features = dict(feature_rows[0], age=4.5)
+    result = ml_model.predict_asd(features)
+    assert 'feature_contributions' not in result
+    model, scaler = ml_model.get_model()
+    expected = model.predict_proba(scaler.transform(ml_model.features_to_array(features)))[0, 1]
+    assert result['probability'] == pytest.approx(expected)
+
+
+def test_sklearn_format_explains_with_in_memory_forest(explained, monkeypatch, feature_rows):
+    monkeypatch.setattr(ml_model, 'MODEL_FORMAT', 'sklearn')
+    ml_model.clear_model_cache()
+    try:
+        model, scaler = ml_model.get_model()
+        features = feature_rows[3]
+        result = ml_model.predict_asd(features)
+        row = np.array([[features[key] for key in features]], dtype=np.float64)
+        expected = model.predict_proba(scaler.transform(row))[0, 1]
+        assert result['probability'] == pytest.approx(expected, abs=1e-12)
+        total = result['base_probability'] + sum(result['feature_contributions'].values())
+        assert total == pytest.approx(expected, abs=1e-9)
+    finally:
+        ml_model.clear_model_cache()
+
+
+def test_store_packs_contributions(explained, make_assessment, feature_rows):
+    store = CompactAssessmentStore()
+    assessment = make_assessment('High', 0.87)
+    assessment['timestamp'] = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    result = ml_model.predict_asd(feature_rows[0])
+    assessment['base_probability'] = result['base_probability']
+    assessment['feature_contributions'] = result['feature_contributions']
+    store[assessment['id']] = assessment
+    assert store.record(assessment['id']) is not None
+    assert store._extras[0] is None
+    assert store[assessment['id']] == assessment
+
+    assessment = dict(assessment, id='unexplained', base_probability=None, feature_contributions=None)
+    store[assessment['id']] = assessment
+    assert store._extras[1] is None
+    assert store[assessment['id']] == assessment
+
+
+def test_report_draws_contributions(explained, make_assessment, feature_rows, tmp_path):
+    assessment = make_assessment('High', 0.87)
+    result = ml_model.predict_asd(feature_rows[0])
+    assessment.update(base_probability=result['base_probability'],
+                      feature_contributions=result['feature_contributions'])
+    with_chart = tmp_path / 'explained.pdf'
+    without_chart = tmp_path / 'plain.pdf'
+    generate_pdf_report(assessment['id'], dict(assessment), str(with_chart))
+    generate_pdf_report(assessment['id'], make_assessment('High', 0.87), str(without_chart))
+    assert with_chart.stat().st_size > without_chart.stat().st_size
+
+
+def test_explanation_latency_budget(monkeypatch, feature_rows):
+    features = feature_rows[5]
+    monkeypatch.setattr(ml_model, 'EXPLAIN_PREDICTIONS', False)
+    plain = _median_seconds(ml_model.predict_asd, features)
+    monkeypatch.setattr(ml_model, 'EXPLAIN_PREDICTIONS', True)
+    explained = _median_seconds(ml_model.predict_asd, features)
+    assert explained - plain < LATENCY_BUDGET_SECONDS, (plain, explained)
+
+
+def test_predict_asd_explained(benchmark, explained, feature_rows):
+    result = benchmark(ml_model.predict_asd, feature_rows[2], rounds=50, warmup=3)
+    assert len(result['feature_contributions']) == 15
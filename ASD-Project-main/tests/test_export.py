@@ -0,0 +1,115 @@
+"""Tests for the streaming CSV/Parquet export of assessments."""
+
+import asyncio
+import io
+
+import pandas as pd
+import pytest
+
+from backend import export
+from backend.storage import SQLiteDatabase
+from tests.conftest import DATASET_PATH
+from tests.test_storage import _document
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = SQLiteDatabase(tmp_path / 'asd.sqlite3')
+    asyncio.run(database.assessments.insert_many([_document(i) for i in range(10)]))
+    return database
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+def test_columns_start_with_dataset_header():
+    with open(DATASET_PATH, 'r', encoding='utf-8') as f:
+        header = f.readline().strip().split(',')
+    assert export.DATASET_COLUMNS == header
+    assert export.COLUMNS[:len(header)] == header
+
+
+def test_row_maps_fields_to_dataset_columns():
+    document = _document(6)
+    row = dict(zip(export.COLUMNS, export.assessment_to_row(document)))
+    behavioral = document['behavioral']
+    assert [row[f'A{i}_Score'] for i in range(1, 11)] == [float(behavioral[f'a{i}_score']) for i in range(1, 11)]
+    assert row['result'] == float(sum(behavioral.values()))
+    assert row['jundice'] == document['demographic']['jaundice']
+    assert row['austim'] == document['demographic']['family_history']
+    assert row['contry_of_res'] == 'India'
+    assert row['relation'] == 'Parent'
+    assert row['Class/ASD'] is None
+    assert row['assessment_id'] == document['id']
+    assert row['timestamp'].isoformat() == document['timestamp']
+
+
+def test_database_is_read_in_batches(database):
+    batches = asyncio.run(_collect(export.database_batches(database, batch_size=3)))
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+
+def test_csv_export(database):
+    batches = export.database_batches(database, batch_size=4)
+    chunks = asyncio.run(_collect(export.export_chunks(batches, 'csv')))
+    assert len(chunks) == 4
+    df = pd.read_csv(io.BytesIO(b''.join(chunks)))
+    assert list(df.columns) == export.COLUMNS
+    assert len(df) == 10
+    assert df['A1_Score'].dtype == float
+    assert df['Class/ASD'].isna().all()
+    assert df['ethnicity'].isna().sum() == 2
+
+
+def test_parquet_export_writes_one_row_group_per_batch(database, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'assessments.parquet'
+    rows = asyncio.run(export.export_to_file(database, str(path), 'parquet', batch_size=4))
+    assert rows == 10
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    df = parquet_file.read().to_pandas()
+    assert list(df.columns) == export.COLUMNS
+    expected = pd.read_csv(io.BytesIO(b''.join(asyncio.run(_collect(
+        export.export_chunks(export.database_batches(database), 'csv'))))))
+    pd.testing.assert_series_equal(df['probability'], expected['probability'])
+    assert df['contry_of_res'].tolist() == expected['contry_of_res'].tolist()
+
+
+def test_empty_parquet_export_is_readable(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'empty.parquet'
+    assert asyncio.run(export.export_to_file(SQLiteDatabase(tmp_path / 'empty.sqlite3'), str(path), 'parquet')) == 0
+    assert pq.read_table(path).num_rows == 0
+
+
+def test_unreadable_database_falls_back_to_cache():
+    class Broken:
+        class assessments:
+            @staticmethod
+            def find(*args):
+                raise ConnectionError('down')
+
+    cache = {document['id']: document for document in (_document(i) for i in range(3))}
+    batches = asyncio.run(export.open_batches(Broken(), cache))
+    rows = [row for batch in asyncio.run(_collect(batches)) for row in batch]
+    assert [row[export.COLUMNS.index('assessment_id')] for row in rows] == list(cache)
+
+
+def test_export_endpoint(monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+
+    cache = {document['id']: document for document in (_document(i) for i in range(5))}
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', cache)
+    client = TestClient(server.app)
+
+    response = client.get('/api/assessments/export', params={'format': 'csv', 'batch_size': 2})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'attachment' in response.headers['content-disposition']
+    assert len(pd.read_csv(io.BytesIO(response.content))) == 5
+
+    assert client.get('/api/assessments/export', params={'format': 'xlsx'}).status_code == 400
@@ -0,0 +1,156 @@
+"""Tests for response compression and conditional GETs."""
+
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend import http_cache
+from backend.http_cache import CompressionMiddleware, negotiate_encoding
+from tests.test_jobs import ASSESSMENT_BODY
+
+LARGE = {'values': list(range(2000))}
+
+
+def _app(**kwargs):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **kwargs)
+
+    @app.get('/large')
+    async def large():
+        return LARGE
+
+    @app.get('/small')
+    async def small():
+        return {'ok': True}
+
+    @app.get('/stream')
+    async def stream():
+        return StreamingResponse((f'{i},row\n' for i in range(5000)), media_type='text/csv')
+
+    @app.get('/events')
+    async def events():
+        return PlainTextResponse('data: x\n\n' * 500, media_type='text/event-stream')
+
+    @app.get('/tagged')
+    async def tagged():
+        return PlainTextResponse('x' * 5000, headers={'ETag': '"abc"'})
+
+    return app
+
+
+def _raw_get(client, path, accept_encoding):
+    with client.stream('GET', path, headers={'Accept-Encoding': accept_encoding}) as response:
+        return response, b''.join(response.iter_raw())
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding('gzip, br', ('br', 'gzip')) == 'br'
+    assert negotiate_encoding('gzip;q=0.5, br;q=0', ('br', 'gzip')) == 'gzip'
+    assert negotiate_encoding('*', ('gzip',)) == 'gzip'
+    assert negotiate_encoding('identity', ('br', 'gzip')) is None
+    assert negotiate_encoding('', ('gzip',)) is None
+
+
+def test_gzip_compresses_large_json_only():
+    client = TestClient(_app(encodings=['gzip']))
+    response, raw = _raw_get(client, '/large', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert int(response.headers['content-length']) == len(raw)
+    assert gzip.decompress(raw) == client.get('/large', headers={'Accept-Encoding': 'identity'}).content
+
+    response, raw = _raw_get(client, '/small', 'gzip')
+    assert 'content-encoding' not in response.headers and raw == b'{"ok":true}'
+    response, _ = _raw_get(client, '/events', 'gzip')
+    assert 'content-encoding' not in response.headers
+
+
+def test_streamed_body_is_compressed_incrementally():
+    client = TestClient(_app(encodings=['gzip']))
+    response, raw = _raw_get(client, '/stream', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert gzip.decompress(raw) == ''.join(f'{i},row\n' for i in range(5000)).encode()
+
+
+def test_compressed_etag_is_weak():
+    client = TestClient(_app(encodings=['gzip']))
+    assert _raw_get(client, '/tagged', 'gzip')[0].headers['etag'] == 'W/"abc"'
+    assert _raw_get(client, '/tagged', 'identity')[0].headers['etag'] == '"abc"'
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip('brotli')
+    client = TestClient(_app())
+    response, raw = _raw_get(client, '/large', 'gzip, br')
+    assert response.headers['content-encoding'] == 'br'
+    assert brotli.decompress(raw) == client.get('/large', headers={'Accept-Encoding': 'identity'}).content
+
+
+def test_brotli_is_skipped_without_the_package(monkeypatch):
+    monkeypatch.setattr(http_cache, 'brotli', None)
+    client = TestClient(_app())
+    assert _raw_get(client, '/large', 'br, gzip')[0].headers['content-encoding'] == 'gzip'
+
+
+def test_is_not_modified():
+    headers = {'if-modified-since': 'Mon, 19 Oct 2026 10:00:00 GMT'}
+    assert http_cache.is_not_modified(headers, '"a"', last_modified=1792404000.5)
+    assert not http_cache.is_not_modified(headers, '"a"', last_modified=1792404001.0)
+    # If-None-Match wins over If-Modified-Since
+    assert not http_cache.is_not_modified({**headers, 'if-none-match': '"b"'}, '"a"', last_modified=0)
+    assert not http_cache.is_not_modified({'if-modified-since': 'garbage'}, '"a"', last_modified=0)
+
+
+@pytest.fixture
+def server_client(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'REPORTS_DIR', tmp_path)
+    monkeypatch.setattr(server.admission, 'policies', [])
+    with TestClient(server.app) as client:
+        yield server, client
+
+
+def test_assessment_revalidation_skips_lookups(server_client, monkeypatch):
+    server, client = server_client
+    assessment_id = client.post('/api/assess', json=ASSESSMENT_BODY).json()['id']
+    first = client.get(f'/api/assessments/{assessment_id}')
+    # Weakened by compression; If-None-Match compares weakly
+    assert first.headers['etag'] == 'W/' + server._assessment_etag(assessment_id)
+    assert first.headers['content-encoding'] == 'gzip'
+    assert 'immutable' in first.headers['cache-control']
+
+    # Neither the cache nor the database may be consulted for a matching ETag
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'get_db', lambda: pytest.fail('database was queried'))
+    revalidated = client.get(f'/api/assessments/{assessment_id}', headers={'If-None-Match': first.headers['etag']})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+
+
+def test_report_conditional_get(server_client, monkeypatch):
+    server, client = server_client
+    assessment_id = client.post('/api/assess', json=ASSESSMENT_BODY).json()['id']
+    renders = []
+    monkeypatch.setattr(server, 'generate_pdf_report',
+                        lambda *args, **kwargs: renders.append(args) or open(args[2], 'wb').write(b'%PDF-1.4 test'))
+
+    first = client.get(f'/api/assessments/{assessment_id}/report')
+    assert first.status_code == 200 and first.content == b'%PDF-1.4 test'
+    assert 'content-encoding' not in first.headers
+
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    by_etag = client.get(f'/api/assessments/{assessment_id}/report', headers={'If-None-Match': first.headers['etag']})
+    by_date = client.get(f'/api/assessments/{assessment_id}/report',
+                         headers={'If-Modified-Since': first.headers['last-modified']})
+    assert by_etag.status_code == by_date.status_code == 304
+    # Served from the rendered file although the assessment is no longer cached; a changed file gets a new ETag
+    os.utime(server._report_path(assessment_id), (0, 0))
+    assert client.get(f'/api/assessments/{assessment_id}/report',
+                      headers={'If-None-Match': first.headers['etag']}).status_code == 200
+    assert len(renders) == 1
@@ -0,0 +1,73 @@
+"""Tests for the constrained assessment input models and their feature row."""
+
+import copy
+import json
+
+import pytest
+
+server = pytest.importorskip('backend.server')
+from fastapi.testclient import TestClient
+
+from backend import ml_model
+from tests.test_jobs import ASSESSMENT_BODY
+
+
+def _body(section, field, value):
+    body = copy.deepcopy(ASSESSMENT_BODY)
+    body[section][field] = value
+    return body
+
+
+@pytest.mark.parametrize('section, field, value', [
+    ('behavioral', 'a3_score', 7),
+    ('behavioral', 'a3_score', -1),
+    ('behavioral', 'a3_score', '1'),
+    ('behavioral', 'a3_score', 1.0),
+    ('behavioral', 'a3_score', True),
+    ('demographic', 'age', 121),
+    ('demographic', 'age', '6'),
+    ('demographic', 'gender', 2),
+    ('demographic', 'jaundice', 3),
+    ('demographic', 'family_history', -1),
+    ('demographic', 'ethnicity', server.ETHNICITY_CODES),
+    ('demographic', 'name', 'x' * (server.MAX_TEXT_LENGTH + 1)),
+])
+def test_out_of_range_input_is_rejected(monkeypatch, section, field, value):
+    monkeypatch.setattr(server.admission, 'policies', [])
+    scored = []
+    monkeypatch.setattr(server, '_score_assessment', lambda *args: scored.append(args))
+    response = TestClient(server.app).post('/api/assess', json=_body(section, field, value))
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'] == ['body', section, field]
+    assert not scored
+
+
+def test_feature_row_matches_the_feature_dict():
+    request = server.AssessmentRequest.model_validate(ASSESSMENT_BODY)
+    demographic, behavioral = ASSESSMENT_BODY['demographic'], ASSESSMENT_BODY['behavioral']
+    features = {**behavioral, 'age': demographic['age'], 'gender': demographic['gender'],
+                'ethnicity': demographic['ethnicity'], 'jaundice': demographic['jaundice'],
+                'austim': demographic['family_history']}
+    row = request.feature_row()
+    assert row.shape == (1, len(ml_model.FEATURE_COLUMNS))
+    assert (row == ml_model.features_to_array(features)).all()
+    assert ml_model.features_to_array(row) is row
+
+    # A missing ethnicity is scored as 0
+    without = server.AssessmentRequest.model_validate(_body('demographic', 'ethnicity', None))
+    assert without.feature_row()[0, ml_model.FEATURE_COLUMNS.index('ethnicity')] == 0
+
+
+def test_predict_asd_accepts_a_feature_row(feature_rows):
+    for features in feature_rows[:8]:
+        assert ml_model.predict_asd(ml_model.features_to_array(features)) == ml_model.predict_asd(features)
+
+
+def test_validate_request_to_feature_row(benchmark):
+    raw = json.dumps(ASSESSMENT_BODY)
+
+    def parse():
+        return server.AssessmentRequest.model_validate_json(raw).feature_row()
+
+    row = benchmark(parse, rounds=200, warmup=20)
+    assert row.shape == (1, len(ml_model.FEATURE_COLUMNS))
@@ -0,0 +1,181 @@
+"""Tests for the durable job queue and async assessments."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from backend import jobs
+from backend.jobs import JobQueue, JobRunner
+
+ASSESSMENT_BODY = {
+    'demographic': {'name': 'Test', 'age': 6, 'gender': 1, 'country': 'India', 'jaundice': 0,
+                    'family_history': 1, 'respondent': 'Parent', 'ethnicity': 2},
+    'behavioral': {f'a{i}_score': i % 2 for i in range(1, 11)},
+}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / 'jobs.sqlite3')
+
+
+def test_claim_checkpoint_finish(queue):
+    job = queue.enqueue('demo', {'x': 1}, stage_count=2)
+    assert (job['status'], job['seq']) == ('queued', 0)
+    claimed = queue.claim('worker-a', ['demo'])
+    assert claimed['id'] == job['id'] and claimed['attempts'] == 1
+    assert queue.claim('worker-b', ['demo']) is None
+
+    assert queue.checkpoint(job['id'], 'worker-a', 1, {'half': True})
+    assert not queue.checkpoint(job['id'], 'worker-b', 2, {})
+    assert queue.finish(job['id'], 'worker-a')
+    view = jobs.public_view(queue.get(job['id']))
+    assert view['status'] == 'done'
+    assert view['progress'] == 0.5
+    assert view['result'] == {'half': True}
+    assert view['seq'] == 3
+
+
+def test_expired_lease_is_reclaimed_then_abandoned(queue, monkeypatch):
+    monkeypatch.setattr(jobs, 'LEASE_SECONDS', -1)
+    job = queue.enqueue('demo', {}, stage_count=1)
+    owners = [queue.claim(f'worker-{i}', ['demo']) for i in range(jobs.MAX_ATTEMPTS)]
+    assert [owner['lease_owner'] for owner in owners] == [f'worker-{i}' for i in range(jobs.MAX_ATTEMPTS)]
+    assert queue.claim('worker-last', ['demo']) is None
+    assert queue.get(job['id'])['status'] == 'failed'
+
+
+def test_release_keeps_progress(queue):
+    job = queue.enqueue('demo', {}, stage_count=3)
+    queue.claim('worker-a', ['demo'])
+    queue.checkpoint(job['id'], 'worker-a', 2, {'step': 2})
+    assert queue.release('worker-a') == 1
+    released = queue.get(job['id'])
+    assert (released['status'], released['stages_done'], released['attempts']) == ('queued', 2, 0)
+
+
+def test_prune_removes_only_jobs_that_ended_long_ago(queue):
+    for i in range(4):
+        queue.enqueue('demo', {'answers': i}, stage_count=1)
+    done, failed, running = (queue.claim('worker-a', ['demo']) for _ in range(3))
+    queue.finish(done['id'], 'worker-a')
+    queue.fail(failed['id'], 'worker-a', 'boom')
+    assert queue.prune(ttl=3600) == 0
+    assert queue.prune(ttl=-1) == 2
+    assert queue.get(done['id']) is None and queue.get(failed['id']) is None
+    assert queue.counts() == {'queued': 1, 'running': 1, 'done': 0, 'failed': 0}
+
+
+def test_restarted_runner_resumes_at_interrupted_stage(queue):
+    calls = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def first(job_id, payload, state):
+            calls.append('first')
+            return {'value': payload['value'] + 1}
+
+        async def second(job_id, payload, state):
+            calls.append('second')
+            await gate.wait()
+            return {'value': state['value'] * 10}
+
+        pipelines = {'demo': [('first', first), ('second', second)]}
+        runner = JobRunner(queue, pipelines, workers=1)
+        job = await runner.submit('demo', {'value': 1})
+        waited = await runner.wait(job['id'], since=-1, timeout=5)
+        while waited['stage'] != 'second':
+            waited = await runner.wait(job['id'], since=waited['seq'], timeout=5)
+        await runner.stop()
+
+        gate.set()
+        restarted = JobRunner(queue, pipelines, workers=1)
+        restarted.start()
+        done = await restarted.wait(job['id'], since=waited['seq'], timeout=5)
+        while done['status'] != 'done':
+            done = await restarted.wait(job['id'], since=done['seq'], timeout=5)
+        await restarted.stop()
+        return done
+
+    done = asyncio.run(scenario())
+    assert done['state'] == {'value': 20}
+    assert calls == ['first', 'second', 'second']
+
+
+def test_stage_error_fails_job(queue):
+    async def broken(job_id, payload, state):
+        raise RuntimeError('boom')
+
+    async def scenario():
+        runner = JobRunner(queue, {'demo': [('broken', broken)]}, workers=1)
+        job = await runner.submit('demo', {})
+        result = await runner.wait(job['id'], timeout=5)
+        while result['status'] not in jobs.TERMINAL_STATUSES:
+            result = await runner.wait(job['id'], since=result['seq'], timeout=5)
+        await runner.stop()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['status'] == 'failed'
+    assert result['error'] == 'RuntimeError: boom'
+
+
+def test_async_assessment_endpoints(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'REPORTS_DIR', tmp_path / 'reports')
+    runner = JobRunner(JobQueue(tmp_path / 'jobs.sqlite3'), {'assessment': server.ASSESSMENT_PIPELINE})
+    monkeypatch.setitem(server._job_runner, 'runner', runner)
+
+    with TestClient(server.app) as client:
+        response = client.post('/api/assess', params={'mode': 'async'}, json=ASSESSMENT_BODY)
+        assert response.status_code == 202
+        job = response.json()
+        assert job['status'] == 'queued'
+
+        while job['status'] not in jobs.TERMINAL_STATUSES:
+            job = client.get(job['links']['self'], params={'since': job['seq'], 'wait': 10}).json()
+        assert job['status'] == 'done', job['error']
+        assert job['progress'] == 1.0
+        assessment = job['result']['assessment']
+        assert assessment['id'] == job['id']
+        assert client.get(f"/api/assessments/{job['id']}").json()['risk_level'] == assessment['risk_level']
+
+        report = client.get(job['result']['report_url'])
+        assert report.status_code == 200
+        assert report.content == (tmp_path / 'reports' / f"assessment_{job['id']}.pdf").read_bytes()
+
+        with client.stream('GET', job['links']['events']) as events:
+            lines = [line for line in events.iter_lines() if line]
+        assert lines[1] == 'event: done'
+        assert json.loads(lines[2][len('data: '):])['result']['assessment']['id'] == job['id']
+
+        assert client.get('/api/jobs/missing').status_code == 404
+        assert client.post('/api/assess', params={'mode': 'later'}, json=ASSESSMENT_BODY).status_code == 400
+
+
+def test_score_stage_predicts_off_the_event_loop(monkeypatch):
+    server = pytest.importorskip('backend.server')
+
+    threads = []
+    predict = server._predict_assessment
+
+    def recording_predict(*args):
+        threads.append(threading.get_ident())
+        return predict(*args)
+
+    monkeypatch.setattr(server, '_predict_assessment', recording_predict)
+
+    async def scenario():
+        state = await server._score_stage('job-1', ASSESSMENT_BODY, None)
+        return threading.get_ident(), state
+
+    loop_thread, state = asyncio.run(scenario())
+    assert state['assessment']['id'] == 'job-1'
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,65 @@
+"""Tests for the cached /api/model-metrics response."""
+
+import json
+import math
+import os
+
+import pytest
+
+server = pytest.importorskip('backend.server')
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def metrics_files(tmp_path, monkeypatch):
+    questionnaire = tmp_path / 'questionnaire_metrics.json'
+    image = tmp_path / 'image_metrics.json'
+    questionnaire.write_text(json.dumps({'model_type': 'questionnaire', 'roc_auc': float('nan')}))
+    image.write_text(json.dumps({'model_type': 'image', 'threshold': float('inf')}))
+    monkeypatch.setattr(server, 'QUESTIONNAIRE_METRICS_PATH', questionnaire)
+    monkeypatch.setattr(server, 'IMAGE_METRICS_PATH', image)
+    server.invalidate_metrics_cache()
+    yield questionnaire, image
+    server.invalidate_metrics_cache()
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_metrics_non_finite_values_become_null(client, metrics_files):
+    response = client.get('/api/model-metrics')
+    assert response.status_code == 200
+    data = response.json()
+    assert data['questionnaire'] == {'model_type': 'questionnaire', 'roc_auc': None}
+    assert data['image'] == {'model_type': 'image', 'threshold': None}
+    assert response.headers['etag']
+    assert 'max-age' in response.headers['cache-control']
+
+
+def test_metrics_conditional_get_returns_304(client, metrics_files):
+    etag = client.get('/api/model-metrics').headers['etag']
+    response = client.get('/api/model-metrics', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_metrics_cache_invalidated_by_file_change(client, metrics_files):
+    questionnaire, _ = metrics_files
+    first = client.get('/api/model-metrics')
+
+    questionnaire.write_text(json.dumps({'model_type': 'questionnaire', 'roc_auc': 0.99}))
+    stat = questionnaire.stat()
+    os.utime(questionnaire, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = client.get('/api/model-metrics', headers={'If-None-Match': first.headers['etag']})
+    assert second.status_code == 200
+    assert second.headers['etag'] != first.headers['etag']
+    assert math.isclose(second.json()['questionnaire']['roc_auc'], 0.99)
+
+
+def test_metrics_served_from_cache(client, metrics_files, monkeypatch):
+    client.get('/api/model-metrics')
+    monkeypatch.setattr(server, '_load_metrics_json', lambda path: pytest.fail('metrics re-read'))
+    assert client.get('/api/model-metrics').status_code == 200
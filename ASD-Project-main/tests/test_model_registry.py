@@ -0,0 +1,169 @@
+"""Tests for versioned models, A/B routing and shadow inference."""
+
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from backend import ml_model, model_registry
+from backend.assessment_store import CompactAssessmentStore
+from backend.model_registry import ModelRouter, ModelVersion
+
+pytestmark = pytest.mark.skipif(
+    not ml_model.COMPACT_MODEL_PATH.exists() or not ml_model.MODEL_PATH.exists(),
+    reason='Model files not available'
+)
+
+ASSESSMENT_BODY = {
+    'demographic': {'name': 'Test', 'age': 6, 'gender': 1, 'country': 'India', 'jaundice': 0,
+                    'family_history': 1, 'respondent': 'Parent', 'ethnicity': 2},
+    'behavioral': {f'a{i}_score': i % 2 for i in range(1, 11)},
+}
+
+
+@pytest.fixture
+def versions_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'versions'
+    monkeypatch.setattr(model_registry, 'VERSIONS_DIR', directory)
+    return directory
+
+
+@pytest.fixture
+def snapshot(versions_dir):
+    model_registry.snapshot_production('baseline')
+    return ModelVersion.from_directory('baseline')
+
+
+def _stub_version(name, probability=0.2):
+    def predict(features):
+        return ml_model.prediction_result(probability, lambda p: p)
+    return ModelVersion(name, predict)
+
+
+def test_routing_is_deterministic_and_proportional():
+    router = ModelRouter(_stub_version('prod'), _stub_version('cand'), candidate_traffic=0.3, shadow_traffic=0.5)
+    ids = [str(uuid.UUID(int=i)) for i in range(20000)]
+    routes = [router.route(assessment_id) for assessment_id in ids]
+    assert routes == [router.route(assessment_id) for assessment_id in ids]
+
+    served_by_candidate = sum(served.name == 'cand' for served, _ in routes) / len(ids)
+    shadowed = [shadow for served, shadow in routes if served.name == 'prod']
+    assert served_by_candidate == pytest.approx(0.3, abs=0.02)
+    assert sum(shadow is not None for shadow in shadowed) / len(shadowed) == pytest.approx(0.5, abs=0.02)
+    assert all(shadow is None for served, shadow in routes if served.name == 'cand')
+
+
+def test_router_without_candidate_serves_production_only():
+    router = ModelRouter(_stub_version('prod'), None, candidate_traffic=1.0)
+    assert router.route('anything') == (router.production, None)
+
+
+def test_invalid_traffic_share():
+    with pytest.raises(ValueError):
+        ModelRouter(_stub_version('prod'), _stub_version('cand'), candidate_traffic=1.5)
+
+
+def test_invalid_version_name():
+    with pytest.raises(ValueError):
+        model_registry.version_dir('../escape')
+
+
+def test_snapshot_serves_same_predictions_as_production(snapshot, feature_rows):
+    manifest = model_registry.list_versions()[0]
+    assert manifest['version'] == 'baseline'
+    assert manifest['source_fingerprint'] == ml_model.model_fingerprint()
+    assert manifest['test_accuracy'] == pytest.approx(0.9929078014184397)
+    production = ModelVersion.production()
+    for features in feature_rows[:20]:
+        assert snapshot.timed_predict(features)[0] == production.timed_predict(features)[0]
+
+
+def test_train_version_leaves_production_untouched(versions_dir):
+    fingerprint = ml_model.model_fingerprint()
+    manifest = model_registry.train_version('small', n_estimators=10, max_depth=4)
+    assert ml_model.model_fingerprint() == fingerprint
+    assert manifest['params'] == {'n_estimators': 10, 'max_depth': 4}
+    assert 0.8 < manifest['test_accuracy'] <= 1.0
+    candidate = ModelVersion.from_directory('small')
+    result, milliseconds = candidate.timed_predict(
+        {**ASSESSMENT_BODY['behavioral'], 'age': 6, 'gender': 1, 'ethnicity': 2, 'jaundice': 0, 'austim': 1}
+    )
+    assert 0.0 <= result['calibrated_probability'] <= 1.0
+    assert milliseconds > 0
+
+
+def test_failed_training_leaves_no_version_behind(versions_dir, monkeypatch):
+    def broken_train(csv_path, models_dir=None, **params):
+        (models_dir / 'partial.pkl').write_bytes(b'x')
+        raise MemoryError('out of memory')
+
+    monkeypatch.setattr(ml_model, 'train_model', broken_train)
+    with pytest.raises(MemoryError):
+        model_registry.train_version('retry')
+    assert list(versions_dir.iterdir()) == []
+    monkeypatch.undo()
+    monkeypatch.setattr(model_registry, 'VERSIONS_DIR', versions_dir)
+    assert model_registry.train_version('retry', n_estimators=5, max_depth=3)['version'] == 'retry'
+    assert [path.name for path in versions_dir.iterdir()] == ['retry']
+
+
+def test_shadow_comparison_stats(feature_rows):
+    router = ModelRouter(_stub_version('prod', 0.2), _stub_version('cand', 0.7), shadow_traffic=1.0)
+    risk = lambda p: 'High' if p >= 0.6 else 'Low'
+    for i, features in enumerate(feature_rows[:10]):
+        result, served, _, shadow = router.predict(str(i), features)
+        router._run_shadow(shadow, features, result, risk)
+    comparison = router.describe()['comparison']
+    assert comparison['served']['prod']['count'] == 10
+    assert comparison['shadow']['compared'] == 10
+    assert comparison['shadow']['prediction_agreement'] == 0.0
+    assert comparison['shadow']['risk_level_agreement'] == 0.0
+    assert comparison['shadow']['mean_abs_probability_difference'] == pytest.approx(0.5)
+
+
+def test_shadow_errors_are_counted(feature_rows):
+    def broken(features):
+        raise RuntimeError('boom')
+    router = ModelRouter(_stub_version('prod'), ModelVersion('broken', broken), shadow_traffic=1.0)
+    result, _, _, shadow = router.predict('x', feature_rows[0])
+    router._run_shadow(shadow, feature_rows[0], result, lambda p: 'Low')
+    assert router.stats.snapshot()['shadow']['errors'] == 1
+
+
+def test_store_packs_version_and_latency(make_assessment):
+    store = CompactAssessmentStore()
+    assessment = make_assessment('Low', 0.1)
+    assessment['timestamp'] = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assessment.update(model_version='production@abc', inference_ms=0.25, calibrated_probability=0.05)
+    store[assessment['id']] = assessment
+    legacy = dict(assessment, id='legacy', model_version=None, inference_ms=None)
+    store[legacy['id']] = legacy
+    assert store._extras == [None, None]
+    assert store[assessment['id']] == assessment
+    assert store[legacy['id']] == legacy
+    assert store.decode('model_version', store.columns()['model_version'][:1]) == ['production@abc']
+
+
+def test_assessment_records_version_and_shadows_candidate(snapshot, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+
+    router = ModelRouter(ModelVersion.production(), snapshot, candidate_traffic=0.0, shadow_traffic=1.0)
+    monkeypatch.setattr(server, 'get_model_router', lambda: router)
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    client = TestClient(server.app)
+
+    result = client.post('/api/assess', json=ASSESSMENT_BODY).json()
+    assert result['model_version'] == router.production.name
+    assert result['inference_ms'] > 0
+
+    deadline = time.monotonic() + 5
+    while router.stats.snapshot()['shadow']['compared'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    models = client.get('/api/models').json()
+    assert models['candidate'] == 'baseline'
+    assert models['comparison']['shadow']['compared'] == 1
+    assert models['comparison']['shadow']['prediction_agreement'] == 1.0
+    assert [version['version'] for version in models['versions']] == ['baseline']
@@ -0,0 +1,99 @@
+"""Tests for background report prerendering."""
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.prerender import Prerenderer
+from backend.single_flight import SingleFlight
+
+
+def test_queue_is_bounded_and_downloads_join_running_prerenders(tmp_path):
+    release = threading.Event()
+    renders = []
+
+    def render(assessment, assessment_id):
+        release.wait(5)
+        renders.append(assessment_id)
+        return tmp_path / f'{assessment_id}.pdf'
+
+    flight = SingleFlight('report')
+    prerenderer = Prerenderer(render, flight, workers=1, max_pending=2, enabled=True)
+
+    async def scenario():
+        assert prerenderer.submit('a', {}) and prerenderer.submit('b', {})
+        assert not prerenderer.submit('a', {})
+        assert not prerenderer.submit('c', {})
+
+        # A download of "a" while it is still rendering waits for the same render
+        await asyncio.sleep(0.01)
+        prerenderer.record_render('a')
+        download = asyncio.ensure_future(flight.do('a', lambda: asyncio.sleep(0, 'not used')))
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await download == tmp_path / 'a.pdf'
+        while prerenderer.snapshot()['pending']:
+            await asyncio.sleep(0.01)
+
+        prerenderer.record_ready('a')  # already counted as joined
+        prerenderer.record_ready('b')
+        prerenderer.record_ready('b')  # a repeat download is neither a hit nor a miss
+        prerenderer.record_render('c')
+        await prerenderer.stop()
+
+    asyncio.run(scenario())
+    assert sorted(renders) == ['a', 'b']
+    snapshot = prerenderer.snapshot()
+    assert (snapshot['submitted'], snapshot['dropped'], snapshot['rendered']) == (2, 1, 2)
+    assert (snapshot['hits'], snapshot['joined'], snapshot['misses']) == (1, 1, 1)
+    assert snapshot['hit_rate'] == 2 / 3
+    assert flight.executions == 2 and flight.coalesced == 1
+
+
+def test_disabled_prerenderer_only_counts_misses():
+    prerenderer = Prerenderer(lambda assessment, assessment_id: None, SingleFlight('report'), enabled=False)
+    assert not prerenderer.submit('a', {})
+    prerenderer.record_render('a')
+    snapshot = prerenderer.snapshot()
+    assert not snapshot['enabled'] and snapshot['misses'] == 1 and snapshot['hit_rate'] == 0.0
+
+
+def test_report_is_ready_after_create(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    httpx = pytest.importorskip('httpx')
+    from tests.test_jobs import ASSESSMENT_BODY
+
+    flight = SingleFlight('report')
+    prerenderer = Prerenderer(server._render_report, flight, enabled=True)
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'REPORTS_DIR', tmp_path)
+    monkeypatch.setattr(server, 'report_flight', flight)
+    monkeypatch.setattr(server, 'report_prerenderer', prerenderer)
+    monkeypatch.setattr(server.admission, 'policies', [])
+
+    renders = []
+
+    def render(assessment_id, assessment, output_path, locale='en'):
+        renders.append(threading.current_thread().name)
+        with open(output_path, 'wb') as handle:
+            handle.write(b'%PDF-1.4 test')
+
+    monkeypatch.setattr(server, 'generate_pdf_report', render)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            created = (await client.post('/api/assess', json=ASSESSMENT_BODY)).json()
+            while prerenderer.snapshot()['pending']:
+                await asyncio.sleep(0.01)
+            report = await client.get(f"/api/assessments/{created['id']}/report")
+            metrics = (await client.get('/api/metrics')).json()
+        await prerenderer.stop()
+        return report, metrics
+
+    report, metrics = asyncio.run(scenario())
+    assert report.status_code == 200 and report.content == b'%PDF-1.4 test'
+    assert len(renders) == 1 and renders[0].startswith('prerender')
+    assert metrics['report_prerender']['hits'] == 1 and metrics['report_prerender']['hit_rate'] == 1.0
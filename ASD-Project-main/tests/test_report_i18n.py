@@ -0,0 +1,126 @@
+"""Tests for localized reports: catalogs, cached fonts and per-locale rendering."""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+import reportlab
+
+from backend import report_i18n
+from backend.report_generator import generate_pdf_report, get_recommendations
+
+TRANSLATED = ('hi', 'mr')
+
+
+def _catalog(code):
+    with open(report_i18n.LOCALES_DIR / f'{code}.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def stand_in_fonts(tmp_path, monkeypatch):
+    """Vera, shipped with ReportLab, under Noto Devanagari's file names (it has no Devanagari glyphs)."""
+    pytest.importorskip('uharfbuzz')
+    fonts = Path(reportlab.__file__).parent / 'fonts'
+    shutil.copy(fonts / 'Vera.ttf', tmp_path / 'NotoSansDevanagari-Regular.ttf')
+    shutil.copy(fonts / 'VeraBd.ttf', tmp_path / 'NotoSansDevanagari-Bold.ttf')
+    monkeypatch.setattr(report_i18n, 'FONT_DIRS', [tmp_path])
+    report_i18n.clear_locale_cache()
+    yield tmp_path
+    report_i18n.clear_locale_cache()
+
+
+@pytest.mark.parametrize('code', TRANSLATED)
+def test_translations_cover_the_english_catalog(code):
+    english, translated = _catalog('en'), _catalog(code)
+    assert set(translated['text']) == set(english['text'])
+    assert set(translated['demographic_labels']) == set(english['demographic_labels'])
+    assert len(translated['questions']) == len(english['questions'])
+    for level, sections in english['recommendations'].items():
+        assert {s: len(items) for s, items in translated['recommendations'][level].items()} == \
+            {s: len(items) for s, items in sections.items()}
+
+
+def test_english_recommendations():
+    high = get_recommendations('High', {}, {})
+    assert high['medical'][0].startswith('Consult with a developmental pediatrician')
+    assert get_recommendations('Unknown', {}, {}) == get_recommendations('Low', {}, {})
+    # Callers get their own lists, never the cached catalog's
+    high['medical'].clear()
+    assert get_recommendations('High', {}, {})['medical']
+
+
+def test_locales_without_fonts_are_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_i18n, 'FONT_DIRS', [tmp_path])
+    report_i18n.clear_locale_cache()
+    try:
+        with pytest.raises(report_i18n.LocaleUnavailable):
+            report_i18n.get_report_locale('zz')
+        if report_i18n.uharfbuzz is not None:
+            with pytest.raises(report_i18n.LocaleUnavailable, match='font'):
+                report_i18n.get_report_locale('hi')
+        assert report_i18n.available_locales() == ['en']
+    finally:
+        report_i18n.clear_locale_cache()
+
+
+def test_bundled_fonts_are_searched_before_system_fonts():
+    bundled = Path(report_i18n.__file__).parent / 'fonts'
+    assert report_i18n.BUNDLED_FONT_DIR == bundled
+    assert report_i18n.FONT_DIRS.index(bundled) <= 1
+
+
+def test_locales_are_loaded_once(stand_in_fonts, monkeypatch):
+    loads = []
+    load = report_i18n.load_report_locale
+    monkeypatch.setattr(report_i18n, 'load_report_locale', lambda code: loads.append(code) or load(code))
+    first = report_i18n.get_report_locale('hi')
+    assert report_i18n.get_report_locale('hi') is first and loads == ['hi']
+    assert first.font == 'NotoSansDevanagari-Regular' and first.bold_font == 'NotoSansDevanagari-Bold'
+    assert first.shaping and first.risk_level('High') == 'उच्च'
+    assert get_recommendations('Moderate', {}, {}, locale='mr') == _catalog('mr')['recommendations']['Moderate']
+
+
+@pytest.mark.parametrize('code', TRANSLATED)
+def test_translated_report_embeds_the_font(stand_in_fonts, make_assessment, tmp_path, code):
+    assessment = make_assessment('High', 0.87)
+    assessment['feature_contributions'] = {'a1_score': 0.2, 'age': -0.05, 'family_history': 0.1}
+    assessment['base_probability'] = 0.3
+    output_path = tmp_path / f'report.{code}.pdf'
+    generate_pdf_report(assessment['id'], assessment, str(output_path), locale=code)
+    data = output_path.read_bytes()
+    # The stand-in font is embedded under its own PostScript name
+    assert data.startswith(b'%PDF') and b'+BitstreamVeraSans-Bold' in data
+
+
+def test_report_endpoint_languages(stand_in_fonts, tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+    from tests.test_jobs import ASSESSMENT_BODY
+
+    reports = tmp_path / 'reports'
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'REPORTS_DIR', reports)
+    monkeypatch.setattr(server.admission, 'policies', [])
+    with TestClient(server.app) as client:
+        assessment_id = client.post('/api/assess', json=ASSESSMENT_BODY).json()['id']
+        url = f'/api/assessments/{assessment_id}/report'
+        assert client.get(url, params={'lang': 'zz'}).status_code == 400
+
+        hindi = client.get(url, params={'lang': 'hi'})
+        english = client.get(url)
+    assert hindi.status_code == 200 and english.status_code == 200
+    assert f'ASD_Assessment_Report_{assessment_id}_hi.pdf' in hindi.headers['content-disposition']
+    assert b'+BitstreamVeraSans' in hindi.content and b'+BitstreamVeraSans' not in english.content
+    assert sorted(p.name for p in reports.iterdir()) == [f'assessment_{assessment_id}.hi.pdf',
+                                                         f'assessment_{assessment_id}.pdf']
+
+
+@pytest.mark.parametrize('code', ('en',) + TRANSLATED)
+def test_render_throughput(benchmark, stand_in_fonts, make_assessment, tmp_path, code):
+    assessment = make_assessment('High', 0.87)
+    report_i18n.get_report_locale(code)
+    output_path = tmp_path / 'report.pdf'
+    benchmark(generate_pdf_report, assessment['id'], assessment, str(output_path), locale=code, rounds=5)
+    assert output_path.stat().st_size > 0
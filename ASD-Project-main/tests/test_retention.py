@@ -0,0 +1,117 @@
+"""Tests for the reports/uploads retention sweep."""
+
+import asyncio
+import os
+import time
+
+from backend.assessment_store import CompactAssessmentStore
+from backend.retention import GarbageCollector, referenced_uploads
+from backend.storage import SQLiteDatabase
+from backend.uploads import VariantStore
+from tests.test_storage import _document
+
+DAY = 24 * 3600
+
+
+def _file(path, size=100, age=0.0):
+    path.write_bytes(b'x' * size)
+    if age:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_sweep_removes_expired_and_orphaned_files(tmp_path):
+    reports, uploads = tmp_path / 'reports', tmp_path / 'uploads'
+    reports.mkdir()
+    uploads.mkdir()
+    variants = VariantStore(uploads / '.variants')
+
+    old_report = _file(reports / 'assessment_old.pdf', 300, age=8 * DAY)
+    new_report = _file(reports / 'assessment_new.pdf', age=DAY)
+    stale_tmp = _file(reports / 'assessment_x.pdf.abc.tmp', age=2 * 3600)
+    other = _file(reports / 'notes.txt', age=30 * DAY)
+    kept_upload = _file(uploads / 'kept.jpg', age=30 * DAY)
+    orphan = _file(uploads / 'orphan.jpg', 500, age=2 * DAY)
+    fresh_orphan = _file(uploads / 'fresh.jpg', age=3600)
+    orphan_variant = _file(uploads / '.variants' / 'orphan.w256.jpg', 50)
+    kept_variant = _file(uploads / '.variants' / 'kept.w256.jpg', 50)
+    variants._add(orphan_variant)
+    variants._add(kept_variant)
+
+    async def references():
+        return {'kept.jpg'}
+
+    collector = GarbageCollector(reports, uploads, variants, references, batch_size=2, batch_pause=0)
+    totals = asyncio.run(collector.sweep())
+
+    assert not old_report.exists() and not stale_tmp.exists() and not orphan.exists() and not orphan_variant.exists()
+    assert new_report.exists() and other.exists() and kept_upload.exists() and fresh_orphan.exists()
+    assert kept_variant.exists()
+    assert (totals['reports'], totals['uploads'], totals['variants'], totals['tmp']) == (1, 1, 1, 1)
+    assert totals['bytes'] == 300 + 500 + 50 + 100
+    assert variants.snapshot()['variants'] == 1 and variants.total_bytes == 50
+    assert collector.snapshot()['reclaimed_bytes'] == totals['bytes']
+
+
+def test_uploads_are_kept_when_references_are_unknown(tmp_path):
+    orphan = _file(tmp_path / 'orphan.jpg', age=30 * DAY)
+
+    async def references():
+        return None
+
+    collector = GarbageCollector(tmp_path / 'reports', tmp_path, references=references, batch_pause=0)
+    assert asyncio.run(collector.sweep())['uploads_skipped']
+    assert orphan.exists() and collector.snapshot()['uploads_skipped'] == 1
+
+
+def test_sweep_prunes_finished_jobs(tmp_path):
+    pruned = []
+
+    def prune_jobs():
+        pruned.append(1)
+        return 3
+
+    collector = GarbageCollector(tmp_path / 'reports', tmp_path, prune_jobs=prune_jobs, batch_pause=0)
+    totals = asyncio.run(collector.sweep())
+    assert pruned and totals['jobs'] == 3
+    assert collector.snapshot()['removed']['jobs'] == 3 and totals['bytes'] == 0
+
+
+def test_referenced_uploads(tmp_path):
+    cache = CompactAssessmentStore()
+    cache['a'] = {**_document(1), 'id': 'a', 'image_filename': 'cached.jpg'}
+    database = SQLiteDatabase(tmp_path / 'asd.sqlite3')
+    documents = [_document(i) for i in range(3)]
+    documents[0]['image_filename'] = 'stored.png'
+    asyncio.run(database.assessments.insert_many(documents))
+
+    assert asyncio.run(referenced_uploads(database, cache)) == {'cached.jpg', 'stored.png'}
+    assert asyncio.run(referenced_uploads(None, {'b': {'image_filename': 'plain.jpg'}})) == {'plain.jpg'}
+
+    class BrokenDatabase:
+        class assessments:
+            @staticmethod
+            def find(*args):
+                raise ConnectionError('down')
+
+    assert asyncio.run(referenced_uploads(BrokenDatabase(), cache)) is None
+
+
+def test_periodic_sweeps_run_in_background(tmp_path):
+    orphan = _file(tmp_path / 'orphan.jpg', age=30 * DAY)
+
+    async def references():
+        return set()
+
+    async def scenario():
+        collector = GarbageCollector(tmp_path / 'reports', tmp_path, references=references, batch_pause=0)
+        collector.start(interval=0.01)
+        while collector.sweeps == 0:
+            await asyncio.sleep(0.01)
+        await collector.stop()
+        return collector.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert not orphan.exists()
+    assert snapshot['removed']['uploads'] == 1 and not snapshot['running']
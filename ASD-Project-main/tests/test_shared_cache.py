@@ -0,0 +1,141 @@
+"""Tests for the cross-process assessment cache backends."""
+
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+
+from backend.assessment_store import CompactAssessmentStore
+from backend.shared_cache import SharedAssessmentCache, SQLiteAssessmentCache, create_assessment_cache
+from tests.test_assessment_store import _assessment
+
+real_time = time.time
+
+
+def _write_from_child(path, index):
+    cache = SQLiteAssessmentCache(path)
+    assessment = _assessment(index)
+    cache[assessment['id']] = assessment
+
+
+def test_create_assessment_cache_from_url(tmp_path):
+    assert isinstance(create_assessment_cache('memory'), CompactAssessmentStore)
+    cache = create_assessment_cache(f'sqlite:///{tmp_path}/cache.sqlite3')
+    assert isinstance(cache, SQLiteAssessmentCache)
+    with pytest.raises(ValueError):
+        create_assessment_cache('memcached://localhost')
+
+
+def test_incomplete_backend_fails_when_created():
+    class PartialCache(SharedAssessmentCache):
+        __getitem__ = __setitem__ = __delitem__ = __iter__ = __len__ = None
+
+        def recent(self, limit):
+            return []
+
+    with pytest.raises(TypeError, match='get_many'):
+        PartialCache()
+
+
+def test_sqlite_cache_round_trip(tmp_path):
+    cache = SQLiteAssessmentCache(tmp_path / 'cache.sqlite3')
+    assessments = [_assessment(i) for i in range(5)]
+    for assessment in assessments:
+        cache[assessment['id']] = assessment
+    assert len(cache) == 5
+    assert cache[assessments[2]['id']] == assessments[2]
+    assert sorted(cache.values(), key=lambda a: a['id']) == assessments
+    del cache[assessments[0]['id']]
+    assert assessments[0]['id'] not in cache
+
+
+def test_sqlite_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    parent = SQLiteAssessmentCache(path)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_write_from_child, args=(path, i)) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+        assert worker.exitcode == 0
+    assert len(parent) == 3
+    assert parent[_assessment(1)['id']] == _assessment(1)
+
+
+def test_sqlite_cache_lists_newest_without_reading_everything(tmp_path):
+    cache = SQLiteAssessmentCache(tmp_path / 'cache.sqlite3')
+    assessments = [_assessment(i) for i in range(8)]
+    for assessment in assessments:
+        cache[assessment['id']] = assessment
+    assert [a['id'] for a in cache.recent(3)] == [a['id'] for a in assessments[:-4:-1]]
+    ids = [assessments[1]['id'], assessments[5]['id'], 'missing']
+    assert sorted(a['id'] for a in cache.get_many(ids)) == sorted(ids[:2])
+    assert cache.image_filenames() == {'0.jpg', '4.jpg'}
+
+
+def test_sqlite_cache_migrates_older_files(tmp_path):
+    path = tmp_path / 'cache.sqlite3'
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE assessment_cache (id TEXT PRIMARY KEY, doc BLOB NOT NULL)')
+    cache = SQLiteAssessmentCache(path)
+    cache['a'] = _assessment(4)
+    assert cache.recent(1)[0]['id'] == _assessment(4)['id'] and cache.image_filenames() == {'4.jpg'}
+
+
+class _LoopCheckingCache(SQLiteAssessmentCache):
+    """Records whether each read or write ran on a thread with a running event loop."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.on_loop = []
+
+    def _record(self):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+
+    def get(self, assessment_id, default=None):
+        self._record()
+        return super().get(assessment_id, default)
+
+    def __setitem__(self, assessment_id, assessment):
+        self._record()
+        super().__setitem__(assessment_id, assessment)
+
+    def recent(self, limit):
+        self._record()
+        return super().recent(limit)
+
+
+def test_server_uses_the_shared_cache_off_the_event_loop(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    from fastapi.testclient import TestClient
+    from tests.test_jobs import ASSESSMENT_BODY
+
+    cache = _LoopCheckingCache(tmp_path / 'cache.sqlite3')
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', cache)
+    monkeypatch.setattr(server.admission, 'policies', [])
+    with TestClient(server.app) as client:
+        created = client.post('/api/assess', json=ASSESSMENT_BODY).json()
+        assert client.get(f"/api/assessments/{created['id']}").json()['id'] == created['id']
+        assert [a['id'] for a in client.get('/api/assessments').json()] == [created['id']]
+    assert cache.on_loop and not any(cache.on_loop)
+
+
+def test_sqlite_cache_is_bounded(tmp_path, monkeypatch):
+    cache = SQLiteAssessmentCache(tmp_path / 'cache.sqlite3', max_entries=3, ttl=3600)
+    assessments = [_assessment(i) for i in range(5)]
+    for assessment in assessments:
+        cache[assessment['id']] = assessment
+    assert cache.prune() == 2
+    assert sorted(cache) == sorted(a['id'] for a in assessments[2:])
+
+    # A file left over from an earlier run loses entries past the TTL when it is opened
+    monkeypatch.setattr(time, 'time', lambda: real_time() + 7200)
+    assert len(SQLiteAssessmentCache(tmp_path / 'cache.sqlite3', ttl=3600)) == 0
@@ -0,0 +1,114 @@
+"""Tests for single-flight coalescing of concurrent reads and report renders."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('demo')
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return 'value'
+
+    async def scenario():
+        first = await asyncio.gather(*(flight.do('key', work) for _ in range(10)))
+        second = await flight.do('key', work)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ['value'] * 10 and second == 'value'
+    assert len(runs) == 2
+    assert flight.snapshot() == {'calls': 11, 'executions': 2, 'coalesced': 9,
+                                 'coalesced_ratio': 9 / 11, 'in_flight': 0}
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight('demo')
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do('key', broken) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert flight.executions == 1 and flight.in_flight == 0
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight('demo')
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do('key', work))
+        follower = asyncio.ensure_future(flight.do('key', work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == 42
+
+
+@pytest.mark.parametrize('admission_control', [False, True])
+def test_report_burst_renders_once(tmp_path, monkeypatch, admission_control):
+    server = pytest.importorskip('backend.server')
+    httpx = pytest.importorskip('httpx')
+    from backend.admission import DEFAULT_POLICIES, AdmissionController, MemoryBucketStore
+    from tests.test_jobs import ASSESSMENT_BODY
+
+    monkeypatch.setattr(server, 'get_db', lambda: None)
+    monkeypatch.setattr(server, 'assessment_cache', {})
+    monkeypatch.setattr(server, 'REPORTS_DIR', tmp_path)
+    monkeypatch.setattr(server, 'report_flight', SingleFlight('report'))
+    # The default policies (a fresh bucket store), or none at all
+    policies = list(DEFAULT_POLICIES) if admission_control else []
+    monkeypatch.setattr(server, 'admission', AdmissionController(policies, MemoryBucketStore()))
+
+    renders = []
+    lock = threading.Lock()
+
+    def slow_render(assessment_id, assessment, output_path, locale='en'):
+        with lock:
+            renders.append(assessment_id)
+        time.sleep(0.2)
+        with open(output_path, 'wb') as handle:
+            handle.write(b'%PDF-1.4 test')
+
+    monkeypatch.setattr(server, 'generate_pdf_report', slow_render)
+
+    def client(address):
+        transport = httpx.ASGITransport(app=server.app, client=(address, 123))
+        return httpx.AsyncClient(transport=transport, base_url='http://test')
+
+    async def scenario():
+        # 20 downloads from 8 different clients
+        clients = [client(f'10.0.0.{i}') for i in range(8)]
+        try:
+            created = (await clients[0].post('/api/assess', json=ASSESSMENT_BODY)).json()
+            url = f"/api/assessments/{created['id']}/report"
+            responses = await asyncio.gather(*(clients[i % 8].get(url) for i in range(20)))
+            metrics = (await clients[0].get('/api/metrics')).json()
+        finally:
+            for each in clients:
+                await each.aclose()
+        return responses, metrics
+
+    responses, metrics = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * 20
+    assert all(response.content == b'%PDF-1.4 test' for response in responses)
+    assert len(renders) == 1
+    report = metrics['coalescing']['report']
+    assert report['executions'] == 1 and report['coalesced'] == 19
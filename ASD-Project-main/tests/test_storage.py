@@ -0,0 +1,175 @@
+"""Tests and throughput benchmarks for the embedded SQLite storage backend."""
+
+import asyncio
+import os
+
+import pytest
+
+from backend.assessment_stats import format_pipeline_result, stats_from_assessments
+from backend.storage import SQLiteDatabase
+from tests.test_assessment_store import _assessment
+
+BENCH_DOCS = 2000
+
+# Set ASD_BENCH_MONGO_URL (e.g. mongodb://localhost:27017) to benchmark Motor too
+MONGO_URL = os.environ.get('ASD_BENCH_MONGO_URL')
+
+
+def _document(i, **overrides):
+    document = _assessment(i, probability=(i % 10) / 10)
+    document['timestamp'] = document['timestamp'].isoformat()
+    document['risk_level'] = ('Low', 'Moderate', 'High')[i % 3]
+    document.update(overrides)
+    return document
+
+
+@pytest.fixture
+def database(tmp_path):
+    return SQLiteDatabase(tmp_path / 'asd.sqlite3')
+
+
+def test_insert_find_and_count(database):
+    async def scenario():
+        collection = database.assessments
+        await collection.insert_one(_document(0))
+        await collection.insert_many([_document(i) for i in range(1, 10)])
+        assert await collection.count_documents({}) == 10
+        assert await collection.count_documents({'risk_level': 'High'}) == 3
+        found = await collection.find_one({'id': _document(4)['id']}, {'_id': 0})
+        assert found == _document(4)
+        assert await collection.find_one({'id': 'missing'}) is None
+        newest = await collection.find({}, {'_id': 0}).sort('timestamp', -1).to_list(3)
+        assert [d['id'] for d in newest] == [_document(i)['id'] for i in (9, 8, 7)]
+
+    asyncio.run(scenario())
+
+
+def test_async_iteration_in_batches(database):
+    async def scenario():
+        await database.assessments.insert_many([_document(i) for i in range(25)])
+        ids = [d['id'] async for d in database.assessments.find({}).batch_size(4)]
+        assert ids == [_document(i)['id'] for i in range(25)]
+        newest = [d['id'] async for d in database.assessments.find({}).sort('timestamp', -1).batch_size(4).limit(6)]
+        assert newest == [_document(i)['id'] for i in range(24, 18, -1)]
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_inserts_are_group_committed(database, monkeypatch):
+    collection = database.assessments
+    transactions = []
+    insert_rows = collection._insert_rows
+    monkeypatch.setattr(collection, '_insert_rows', lambda docs: (transactions.append(len(docs)), insert_rows(docs)))
+
+    async def scenario():
+        await asyncio.gather(*(collection.insert_one(_document(i)) for i in range(50)))
+        duplicate = collection.insert_one(_document(3))
+        fresh = collection.insert_one(_document(99))
+        results = await asyncio.gather(duplicate, fresh, return_exceptions=True)
+        assert isinstance(results[0], Exception)
+        assert results[1].inserted_id == _document(99)['id']
+        assert await collection.count_documents() == 51
+
+    asyncio.run(scenario())
+    assert len(transactions) < 50
+
+
+def test_group_commit_holds_its_flush_task(database):
+    writer = database.assessments._writer
+
+    async def scenario():
+        insert = asyncio.ensure_future(database.assessments.insert_one(_document(0)))
+        await asyncio.sleep(0)
+        assert isinstance(writer._flush_task, asyncio.Task) and not writer._flush_task.done()
+        await insert
+
+    asyncio.run(scenario())
+    assert writer._flush_task is None
+
+
+def test_stats_match_in_memory_aggregation(database):
+    documents = [_document(i) for i in range(60)]
+
+    async def scenario():
+        await database.assessments.insert_many(documents)
+        return await database.assessments.stats_facets()
+
+    stats = format_pipeline_result(asyncio.run(scenario()))
+    assert stats == stats_from_assessments(documents)
+
+
+def _insert_one_by_one(collection, documents):
+    async def run():
+        await asyncio.gather(*(collection.insert_one(dict(document)) for document in documents))
+    asyncio.run(run())
+
+
+def _list_all(collection):
+    return asyncio.run(collection.find({}, {'_id': 0}).to_list(None))
+
+
+def _get_each(collection, ids):
+    async def run():
+        for assessment_id in ids:
+            await collection.find_one({'id': assessment_id}, {'_id': 0})
+    asyncio.run(run())
+
+
+class _Backends:
+    """Fresh collection per benchmark round for each backend."""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.rounds = 0
+
+    def sqlite(self):
+        self.rounds += 1
+        return SQLiteDatabase(self.tmp_path / f'bench-{self.rounds}.sqlite3').assessments
+
+    def mongo(self):
+        motor = pytest.importorskip('motor.motor_asyncio')
+        self.rounds += 1
+        client = motor.AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+        return client['asd_bench'][f'assessments_{os.getpid()}_{self.rounds}']
+
+
+BACKENDS = ['sqlite', pytest.param('mongo', marks=pytest.mark.skipif(not MONGO_URL, reason='ASD_BENCH_MONGO_URL not set'))]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_insert_throughput(benchmark, tmp_path, backend):
+    backends = _Backends(tmp_path)
+    documents = [_document(i) for i in range(BENCH_DOCS)]
+    collections = []
+    benchmark(lambda: _insert_one_by_one(collections[-1], documents),
+              setup=lambda: collections.append(getattr(backends, backend)()), rounds=3, warmup=0)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_insert_many_throughput(benchmark, tmp_path, backend):
+    backends = _Backends(tmp_path)
+    documents = [_document(i) for i in range(BENCH_DOCS)]
+    collections = []
+    benchmark(lambda: asyncio.run(collections[-1].insert_many([dict(d) for d in documents])),
+              setup=lambda: collections.append(getattr(backends, backend)()), rounds=3, warmup=0)
+
+
+@pytest.fixture
+def filled_collection(tmp_path, request):
+    collection = getattr(_Backends(tmp_path), request.param)()
+    documents = [_document(i) for i in range(BENCH_DOCS)]
+    asyncio.run(collection.insert_many([dict(d) for d in documents]))
+    return collection, documents
+
+
+@pytest.mark.parametrize('filled_collection', BACKENDS, indirect=True)
+def test_list_throughput(benchmark, filled_collection):
+    collection, _ = filled_collection
+    listed = benchmark(_list_all, collection, rounds=5)
+    assert len(listed) == BENCH_DOCS
+
+
+@pytest.mark.parametrize('filled_collection', BACKENDS, indirect=True)
+def test_get_throughput(benchmark, filled_collection):
+    collection, documents = filled_collection
+    benchmark(_get_each, collection, [d['id'] for d in documents[:200]], rounds=5)
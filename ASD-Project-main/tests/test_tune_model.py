@@ -0,0 +1,60 @@
+"""Tests for the cross-validated hyperparameter search."""
+
+import pytest
+
+from backend import tune_model
+from tests.conftest import DATASET_PATH
+
+pytestmark = pytest.mark.skipif(not DATASET_PATH.exists(), reason='Dataset not available')
+
+SMALL_SPACES = {
+    'random_forest': {'n_estimators': [5, 10], 'max_depth': [3]},
+    'gradient_boosting': {'n_estimators': [10], 'max_depth': [2], 'learning_rate': [0.1]},
+}
+
+
+def _tune(cache_dir, **kwargs):
+    return tune_model.tune(DATASET_PATH, folds=3, n_jobs=1, cache_dir=cache_dir,
+                           search_spaces=SMALL_SPACES, latency_samples=50, **kwargs)
+
+
+def test_candidates_expand_grid():
+    names = [tune_model.candidate_name(c) for c in tune_model.candidates(['random_forest'], SMALL_SPACES)]
+    assert names == ['random_forest(max_depth=3,n_estimators=5)', 'random_forest(max_depth=3,n_estimators=10)']
+    with pytest.raises(ValueError):
+        tune_model.candidates(['svm'])
+
+
+def test_report_and_selection(tmp_path):
+    report = _tune(tmp_path)
+    assert len(report['results']) == 3
+    assert report['selected'] in report['pareto_front']
+    for result in report['results']:
+        assert 0.5 < result['cv_accuracy'] <= 1.0
+        assert result['latency']['p99_ms'] >= result['latency']['p50_ms'] > 0
+    served = {result['model']: result['latency']['served_as'] for result in report['results']}
+    assert served == {'random_forest': 'compact', 'gradient_boosting': 'sklearn'}
+
+
+def test_interrupted_search_resumes_from_cache(tmp_path, monkeypatch):
+    _tune(tmp_path)
+    fold_files = sorted(tmp_path.glob('*.json'))
+    assert len(fold_files) == 3 * 3
+    fold_files[0].unlink()
+
+    fits = []
+    original = tune_model.evaluate_fold
+    monkeypatch.setattr(tune_model, 'evaluate_fold', lambda *args: fits.append(1) or original(*args))
+    _tune(tmp_path)
+    assert fits == [1]
+
+
+def test_latency_budget_is_respected():
+    def result(name, f1, p99):
+        return {'name': name, 'cv_f1': f1, 'cv_accuracy': f1, 'latency': {'p99_ms': p99}}
+
+    results = [result('slow', 0.95, 2.0), result('fast', 0.90, 0.2), result('faster', 0.85, 0.1)]
+    assert tune_model.select(results, latency_budget_ms=5.0)['name'] == 'slow'
+    assert tune_model.select(results, latency_budget_ms=1.0)['name'] == 'fast'
+    assert tune_model.select(results, latency_budget_ms=0.01)['name'] == 'faster'
+    assert tune_model.pareto_front(results + [result('dominated', 0.80, 0.5)]) == ['slow', 'fast', 'faster']
@@ -0,0 +1,114 @@
+"""Tests for serving uploaded images, byte ranges and resized variants."""
+
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import http_cache
+from backend.uploads import VariantStore, resolve_upload
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _write_image(path, size=(800, 600), image_format='JPEG'):
+    Image.new('RGB', size, (200, 30, 30)).save(path, format=image_format)
+    return path
+
+
+def test_resolve_upload_rejects_traversal(tmp_path):
+    (tmp_path / 'photo.jpg').write_bytes(b'x')
+    assert resolve_upload('photo.jpg', tmp_path) == (tmp_path / 'photo.jpg').resolve()
+    outside = tmp_path.parent / 'secret.png'
+    outside.write_bytes(b'x')
+    os.symlink(outside, tmp_path / 'link.png')
+    for name in ('../secret.png', '..', '.variants', 'a/b.jpg', 'page.html', 'photo', 'link.png'):
+        with pytest.raises(ValueError):
+            resolve_upload(name, tmp_path)
+
+
+def test_parse_range():
+    assert http_cache.parse_range('bytes=0-99', 1000) == (0, 99)
+    assert http_cache.parse_range('bytes=900-', 1000) == (900, 999)
+    assert http_cache.parse_range('bytes=-100', 1000) == (900, 999)
+    assert http_cache.parse_range('bytes=990-2000', 1000) == (990, 999)
+    for ignored in ('bytes=0-1,5-6', 'items=0-1', 'bytes=5-1', 'bytes=x-1', 'bytes=-'):
+        assert http_cache.parse_range(ignored, 1000) is None
+    for unsatisfiable in ('bytes=1000-', 'bytes=-0'):
+        with pytest.raises(http_cache.RangeNotSatisfiable):
+            http_cache.parse_range(unsatisfiable, 1000)
+
+
+def test_variants_are_rendered_once_and_evicted(tmp_path):
+    source = _write_image(tmp_path / 'photo.jpg')
+    small = _write_image(tmp_path / 'small.png', size=(50, 40), image_format='PNG')
+    store = VariantStore(tmp_path / 'variants', max_bytes=10 ** 9)
+
+    async def scenario():
+        paths = await asyncio.gather(*(store.get(source, 256) for _ in range(5)))
+        return paths, await store.get(source, 256), await store.get(small, 256)
+
+    paths, again, copied = asyncio.run(scenario())
+    assert len(set(paths)) == 1 and again == paths[0]
+    with Image.open(paths[0]) as variant:
+        assert variant.size == (256, 192) and variant.format == 'JPEG'
+    # Never scaled up: a small image's variant is a copy of it
+    assert copied.read_bytes() == small.read_bytes()
+    snapshot = store.snapshot()
+    assert snapshot['renders']['executions'] == 2 and snapshot['renders']['coalesced'] == 4
+    assert snapshot['hits'] == 1
+
+    # A fresh store picks up the files on disk, oldest first, and evicts down to its budget
+    os.utime(copied, (0, 0))
+    bounded = VariantStore(tmp_path / 'variants', max_bytes=paths[0].stat().st_size + 1)
+    asyncio.run(bounded.get(source, 128))
+    assert not copied.exists() and not paths[0].exists()
+    assert bounded.snapshot()['variants'] == 1 and bounded.evictions == 2
+    store.close()
+    bounded.close()
+
+
+@pytest.fixture
+def server_client(tmp_path, monkeypatch):
+    server = pytest.importorskip('backend.server')
+    monkeypatch.setattr(server, 'UPLOADS_DIR', tmp_path)
+    monkeypatch.setattr(server, 'upload_variants', VariantStore(tmp_path / '.variants'))
+    monkeypatch.setattr(server.admission, 'policies', [])
+    with TestClient(server.app) as client:
+        yield server, client
+
+
+def test_upload_endpoint(server_client, tmp_path):
+    server, client = server_client
+    source = _write_image(tmp_path / 'a1b2.jpg')
+    data = source.read_bytes()
+
+    full = client.get('/api/uploads/a1b2.jpg')
+    assert full.status_code == 200 and full.content == data
+    assert full.headers['content-type'] == 'image/jpeg'
+    assert full.headers['accept-ranges'] == 'bytes'
+    assert full.headers['x-content-type-options'] == 'nosniff'
+
+    part = client.get('/api/uploads/a1b2.jpg', headers={'Range': 'bytes=10-19'})
+    assert part.status_code == 206 and part.content == data[10:20]
+    assert part.headers['content-range'] == f'bytes 10-19/{len(data)}'
+    tail = client.get('/api/uploads/a1b2.jpg', headers={'Range': 'bytes=-5', 'If-Range': full.headers['etag']})
+    assert tail.status_code == 206 and tail.content == data[-5:]
+    stale = client.get('/api/uploads/a1b2.jpg', headers={'Range': 'bytes=0-0', 'If-Range': '"old"'})
+    assert stale.status_code == 200 and stale.content == data
+    unsatisfiable = client.get('/api/uploads/a1b2.jpg', headers={'Range': f'bytes={len(data)}-'})
+    assert unsatisfiable.status_code == 416
+    assert client.get('/api/uploads/a1b2.jpg', headers={'If-None-Match': full.headers['etag']}).status_code == 304
+
+    variant = client.get('/api/uploads/a1b2.jpg', params={'w': 256})
+    assert variant.status_code == 200
+    assert Image.open(io.BytesIO(variant.content)).size == (256, 192)
+    assert client.get('/api/metrics').json()['upload_variants']['variants'] == 1
+
+    assert client.get('/api/uploads/a1b2.jpg', params={'w': 300}).status_code == 400
+    assert client.get('/api/uploads/missing.jpg').status_code == 404
+    assert client.get('/api/uploads/..%2Fserver.py').status_code == 404
+    (tmp_path / 'broken.png').write_bytes(b'not an image')
+    assert client.get('/api/uploads/broken.png', params={'w': 64}).status_code == 415